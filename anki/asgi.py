@@ -3,14 +3,32 @@ ASGI config for anki project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Под ASGI маршруты берутся из anki.async_urls: каталог, страница карточки,
+теги и JSON API обслуживаются асинхронными представлениями (cards.async_views).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anki.settings')
 
-application = get_asgi_application()
+ASYNC_URLCONF = 'anki.async_urls'
+
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """
+    Обработчик ASGI, который разрешает URL по ASYNC_URLCONF вместо ROOT_URLCONF
+    """
+
+    async def get_response_async(self, request):
+        request.urlconf = ASYNC_URLCONF
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = AsyncViewsASGIHandler()
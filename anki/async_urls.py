@@ -0,0 +1,10 @@
+"""
+Корневые маршруты под ASGI (см. anki.asgi): приложение карточек подключено
+с асинхронными представлениями, остальное - как в anki.urls
+"""
+from django.urls import path, include
+from anki import urls
+
+urlpatterns = [
+    path('cards/', include('cards.async_urls')),
+] + urls.urlpatterns
@@ -0,0 +1,165 @@
+"""
+Чтение карточек, тегов и категорий с реплик, запись - в основную БД.
+
+Реплики перечислены в settings.DATABASE_REPLICAS (алиасы из DATABASES).
+Запрос читает с одной случайно выбранной реплики. Чтобы пользователь
+видел свои изменения, несмотря на отставание реплик, запрос, который
+что-то записал, ставит cookie, и следующие REPLICA_STICKY_SECONDS секунд
+запросы этого браузера читают с основной БД. Запросы, кроме GET/HEAD/OPTIONS,
+всегда работают с основной БД.
+
+Вне HTTP-запроса (команды, фоновые потоки) чтение тоже идет с реплик,
+основную БД можно выбрать явно через use_primary(). Если же в текущей
+транзакции основной БД уже была запись (например, импорт создал теги и
+перечитывает их), до конца транзакции чтение идет с основной БД: реплика
+этих строк еще не видела.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Модели, которые можно читать с реплик (остальные, включая пользователей и сессии, - с основной БД)
+REPLICA_MODELS = {'cards.card', 'cards.tag', 'cards.categories', 'cards.cardtag', 'cards.relatedcard'}
+STICKY_COOKIE = 'use_primary_until'
+
+_forced_primary = ContextVar('db_forced_primary', default=False)
+# Состояние текущего HTTP-запроса: {'pinned': bool, 'written': bool, 'replica': алиас или None}
+_request_state = ContextVar('db_request_state', default=None)
+# Внешний блок atomic() основной БД, в котором вне HTTP-запроса уже была запись
+_written_transaction = ContextVar('db_written_transaction', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """
+    Все чтения внутри блока идут в основную БД
+    """
+    token = _forced_primary.set(True)
+    try:
+        yield
+    finally:
+        _forced_primary.reset(token)
+
+
+def _current_transaction():
+    """
+    Внешний блок atomic() основной БД или None вне транзакции
+    """
+    connection = transaction.get_connection(DEFAULT_DB_ALIAS)
+    return connection.atomic_blocks[0] if connection.in_atomic_block else None
+
+
+def _written_in_transaction():
+    written = _written_transaction.get()
+    return written is not None and written is _current_transaction()
+
+
+def reads_from_replica():
+    """
+    Будут ли чтения карточек сейчас идти с реплики
+    """
+    if not get_replicas() or _forced_primary.get():
+        return False
+    state = _request_state.get()
+    if state is not None:
+        return not (state['pinned'] or state['written'])
+    return not _written_in_transaction()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in REPLICA_MODELS or not reads_from_replica():
+            return None
+        replicas = get_replicas()
+        state = _request_state.get()
+        if state is None:
+            return random.choice(replicas)
+        # Весь запрос читает с одной реплики, чтобы не смешивать данные с разным отставанием
+        if state['replica'] not in replicas:
+            state['replica'] = random.choice(replicas)
+        return state['replica']
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['written'] = True
+        elif get_replicas():
+            block = _current_transaction()
+            if block is not None:
+                _written_transaction.set(block)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплик переносит репликация, а не migrate
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Выбирает для запроса основную БД или реплику и ставит cookie после записи
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def start(request):
+        try:
+            sticky_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            sticky_until = 0
+        return {
+            'pinned': request.method not in ('GET', 'HEAD', 'OPTIONS') or sticky_until > time.time(),
+            'written': False,
+            'replica': None,
+        }
+
+    @staticmethod
+    def finish(response, state):
+        if state['written'] and get_replicas():
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        # Состояние - изменяемый словарь, поэтому запись из потока sync_to_async
+        # (копия контекста) видна здесь
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(response, state)
@@ -0,0 +1,291 @@
+"""
+Метрики запросов: время ответа, SQL, рендеринг шаблонов и попадания в кеш.
+
+MetricsMiddleware собирает для каждого запроса число и время SQL-запросов
+(connection.execute_wrapper), время рендеринга шаблонов (бэкенд
+TimedDjangoTemplates) и попадания/промахи кешей (record_cache), а затем
+складывает их в гистограммы процесса с меткой view - именем маршрута.
+metrics_view отдает гистограммы в текстовом формате Prometheus (только staff).
+
+METRICS_SAMPLE_RATE - доля запросов, которые замеряются: для остальных
+middleware только вызывает random() и сразу передает запрос дальше.
+METRICS_SLOW_REQUEST_MS - порог медленного запроса: такие запросы пишутся
+в лог вместе с самыми долгими SQL-запросами (0 - не писать).
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SLOW_QUERIES_IN_LOG = 5
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Гистограммы и счетчики процесса: {имя: {метки: значение}}
+    """
+    HISTOGRAMS = {
+        'django_request_seconds': ('Время обработки запроса', TIME_BUCKETS),
+        'django_request_sql_queries': ('Число SQL-запросов на запрос', COUNT_BUCKETS),
+        'django_request_sql_seconds': ('Время SQL-запросов на запрос', TIME_BUCKETS),
+        'django_request_template_seconds': ('Время рендеринга шаблонов на запрос', TIME_BUCKETS),
+    }
+    COUNTERS = {
+        'django_responses_total': 'Ответы по статусу',
+        'django_cache_hits_total': 'Попадания в кеш',
+        'django_cache_misses_total': 'Промахи кеша',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {name: {} for name in self.HISTOGRAMS}
+            self.counters = {name: {} for name in self.COUNTERS}
+
+    def observe(self, name, labels, value):
+        histograms = self.histograms[name]
+        with self._lock:
+            histogram = histograms.get(labels)
+            if histogram is None:
+                histogram = histograms[labels] = Histogram(self.HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        counters = self.counters[name]
+        with self._lock:
+            counters[labels] = counters.get(labels, 0) + amount
+
+    def render(self):
+        """
+        Текстовый формат Prometheus
+        """
+        lines = []
+        with self._lock:
+            for name, series in self.histograms.items():
+                lines += [f'# HELP {name} {self.HISTOGRAMS[name][0]}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(series.items()):
+                    label_text = format_labels(labels)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+            for name, series in self.counters.items():
+                lines += [f'# HELP {name} {self.COUNTERS[name]}', f'# TYPE {name} counter']
+                for labels, value in sorted(series.items()):
+                    lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    # labels - кортеж пар (имя, значение)
+    return ','.join(f'{key}="{escape_label(value)}"' for key, value in labels)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """
+    Замеры одного запроса
+    """
+    __slots__ = ('sql_count', 'sql_seconds', 'template_seconds', 'template_depth', 'cache', 'queries')
+
+    def __init__(self, keep_queries):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache = {}
+        # (время, SQL) для лога медленных запросов, None - не сохранять
+        self.queries = [] if keep_queries else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_seconds += elapsed
+            if self.queries is not None:
+                self.queries.append((elapsed, sql))
+
+
+def record_cache(name, hit):
+    """
+    Отмечает попадание или промах кеша name в текущем замеряемом запросе
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        hits, misses = metrics.cache.get(name, (0, 0))
+        metrics.cache[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+
+class TimedTemplate:
+    """
+    Обертка шаблона бэкенда: время рендеринга добавляется к замерам запроса.
+    Вложенные рендеринги (шаблон, отрисованный внутри другого) не считаются повторно
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд шаблонов Django, который замеряет рендеринг (см. TEMPLATES в settings)
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class MetricsMiddleware:
+    """
+    Работает и под WSGI, и под ASGI (см. anki.asgi): в асинхронном режиме
+    обертки execute ставятся в потоке, где асинхронный ORM выполняет SQL запроса
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 0) / 1000
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def is_sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    @staticmethod
+    def wrap_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics(keep_queries=bool(self.slow_seconds))
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        metrics = RequestMetrics(keep_queries=bool(self.slow_seconds))
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Синхронный код запроса (ORM, шаблоны) выполняется в одном потоке
+            # (ThreadSensitiveContext обработчика ASGI) - обертки ставим там же
+            await sync_to_async(self.wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, metrics, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        labels = (('view', view),)
+        registry.observe('django_request_seconds', labels, elapsed)
+        registry.observe('django_request_sql_queries', labels, metrics.sql_count)
+        registry.observe('django_request_sql_seconds', labels, metrics.sql_seconds)
+        registry.observe('django_request_template_seconds', labels, metrics.template_seconds)
+        registry.increment('django_responses_total', labels + (('status', response.status_code),))
+        for name, (hits, misses) in metrics.cache.items():
+            cache_labels = labels + (('cache', name),)
+            if hits:
+                registry.increment('django_cache_hits_total', cache_labels, hits)
+            if misses:
+                registry.increment('django_cache_misses_total', cache_labels, misses)
+
+        if self.slow_seconds and elapsed >= self.slow_seconds:
+            slowest = sorted(metrics.queries, reverse=True)[:SLOW_QUERIES_IN_LOG]
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.0f мс, SQL %s за %.0f мс, шаблоны %.0f мс\n%s',
+                request.method, request.get_full_path(), view, elapsed * 1000, metrics.sql_count,
+                metrics.sql_seconds * 1000, metrics.template_seconds * 1000,
+                '\n'.join(f'{seconds * 1000:.1f} мс: {sql}' for seconds, sql in slowest),
+            )
+
+
+def metrics_view(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -44,7 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'anki.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'anki.db_router.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,7 +59,8 @@ ROOT_URLCONF = 'anki.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Бэкенд Django с замером времени рендеринга (см. anki/metrics.py)
+        'BACKEND': 'anki.metrics.TimedDjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates'  # Подключаем шаблоны
         ],
@@ -85,6 +88,41 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую в DATABASE_REPLICAS
+# (для локальной проверки достаточно копии lesson_47.db). См. anki/db_router.py
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['anki.db_router.ReplicaRouter']
+
+# PRAGMA для каждого соединения SQLite (см. anki/sqlite_setup.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),
+    'temp_store': 'memory',
+}
+# Сколько раз повторять транзакцию, если SQLite ответил "database is locked", и первая пауза в секундах
+SQLITE_BUSY_RETRIES = int(os.getenv('SQLITE_BUSY_RETRIES', 5))
+SQLITE_BUSY_RETRY_DELAY = float(os.getenv('SQLITE_BUSY_RETRY_DELAY', 0.05))
+
+# Метрики запросов (см. anki/metrics.py): доля замеряемых запросов и порог
+# медленного запроса в миллисекундах для лога (0 - не писать)
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 1.0))
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', 0))
+
+# Сколько секунд после записи браузер пользователя читает с основной БД
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -117,6 +155,17 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Сюда collectstatic собирает статику: имена с хешем и сжатые копии .gz/.br (см. anki.static_files)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'anki.static_files.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -142,5 +191,24 @@ DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
 SERVER_EMAIL = os.getenv('EMAIL_HOST_USER')
 EMAIL_ADMIN = os.getenv('EMAIL_HOST_USER')
 
+# Как часто (в секундах) буферизованные просмотры карточек записываются в БД.
+# 0 - без буфера, каждый просмотр сразу пишется отдельным UPDATE
+CARD_VIEWS_FLUSH_INTERVAL = int(os.getenv('CARD_VIEWS_FLUSH_INTERVAL', 5))
+
+# Сколько секунд хранить отрендеренные превью карточек (см. cards.fragment_cache)
+CARD_PREVIEW_CACHE_TIMEOUT = int(os.getenv('CARD_PREVIEW_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Сколько секунд хранить страницы для анонимных посетителей (см. cards.page_cache)
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 10 * 60))
+
+# Индекс автодополнения тегов (см. cards.tag_index): сколько тегов держать в памяти
+# и через сколько секунд пересчитывать число карточек у тегов
+TAG_INDEX_MAX_TAGS = int(os.getenv('TAG_INDEX_MAX_TAGS', 100_000))
+TAG_INDEX_MAX_AGE = int(os.getenv('TAG_INDEX_MAX_AGE', 5 * 60))
+
+# Сколько секунд хранить списки карточек тегов (см. cards.tag_postings).
+# Списки сбрасываются при изменении связей, срок жизни - страховка от расхождений
+TAG_POSTINGS_TIMEOUT = int(os.getenv('TAG_POSTINGS_TIMEOUT', 24 * 60 * 60))
+
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 YOUR_PERSONAL_CHAT_ID = os.getenv("YOUR_PERSONAL_CHAT_ID")
\ No newline at end of file
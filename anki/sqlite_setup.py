@@ -0,0 +1,88 @@
+"""
+Настройка соединений SQLite для одновременной работы читателей и писателей.
+
+configure_connection вызывается по сигналу connection_created (подключается
+в cards.apps) и выполняет PRAGMA из settings.SQLITE_PRAGMAS: WAL позволяет
+читать во время записи, synchronous=NORMAL в режиме WAL не теряет
+целостность, busy_timeout заставляет ждать блокировку вместо ошибки.
+
+busy_timeout не помогает, когда транзакция начата как чтение и потом
+пытается писать: SQLite сразу возвращает "database is locked", чтобы
+не было взаимной блокировки. Такие транзакции нужно повторять целиком -
+для этого retry_on_busy.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+
+def get_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+
+
+def apply_pragmas(cursor, pragmas):
+    """
+    Выполняет PRAGMA на курсоре DB-API (Django или модуля sqlite3)
+    """
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_pragmas())
+
+
+def is_busy(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_busy(func=None, *, attempts=None, delay=None, using=None, atomic=True):
+    """
+    Выполняет функцию в транзакции и повторяет ее, если SQLite ответил
+    "database is locked". Паузы растут вдвое с каждой попыткой.
+    Внутри внешней транзакции повтор невозможен, функция выполняется один раз.
+    С atomic=False транзакцией управляет сама функция
+    """
+    if func is None:
+        return functools.partial(retry_on_busy, attempts=attempts, delay=delay, using=using, atomic=atomic)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if atomic and transaction.get_connection(using).in_atomic_block:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        max_attempts = attempts or getattr(settings, 'SQLITE_BUSY_RETRIES', 5)
+        pause = delay if delay is not None else getattr(settings, 'SQLITE_BUSY_RETRY_DELAY', 0.05)
+        for attempt in range(1, max_attempts + 1):
+            try:
+                if not atomic:
+                    return func(*args, **kwargs)
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except Exception as error:
+                if not is_busy(error) or attempt == max_attempts:
+                    raise
+                logger.debug('БД занята, попытка %s из %s', attempt, max_attempts)
+                # Случайная добавка, чтобы повторы разных потоков не совпадали
+                time.sleep(pause * 2 ** (attempt - 1) * random.uniform(1, 1.5))
+
+    return wrapper
@@ -0,0 +1,177 @@
+"""
+Статика с хешем в имени, заранее сжатыми копиями и вечным кешированием.
+
+CompressedManifestStaticFilesStorage (STORAGES['staticfiles']) при
+collectstatic пишет файлы с хешем содержимого в имени (style.3f2a1c.css)
+и рядом их сжатые копии: .gz и, если установлен пакет brotli, .br.
+Шаблонный тег {% static %} подставляет имя с хешем, поэтому после
+изменения файла меняется и его URL.
+
+serve отдает файлы из STATIC_ROOT: выбирает по Accept-Encoding готовую
+сжатую копию (на запрос ничего не сжимается), а файлы с хешем помечает
+Cache-Control: immutable на год - браузер не перепроверяет их совсем.
+Перед приложением может стоять nginx, тогда эта функция не вызывается.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import posixpath
+import stat
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Текстовые форматы, которые имеет смысл сжимать (картинки и шрифты уже сжаты)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico')
+# Меньше этого размера сжатие не окупает лишний файл и заголовок
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Файлы без хеша (например, запрошенные по старому имени) могут измениться
+MUTABLE_MAX_AGE = 60 * 60
+
+# Кодировка -> расширение сжатой копии, в порядке предпочтения
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(data):
+    """
+    {расширение: сжатые данные} - только варианты, которые меньше исходного файла
+    """
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {extension: content for extension, content in variants.items() if len(content) < len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, которая после collectstatic сжимает файлы с хешем
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._immutable_names = None
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        self._immutable_names = None
+        if dry_run:
+            return
+        if brotli is None:
+            logger.info('Пакет brotli не установлен - создаются только .gz')
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for extension, content in compress(data).items():
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            self._save(name + extension, ContentFile(content))
+
+    def stored_name(self, name):
+        # collectstatic еще не запускали (разработка, тесты) - ссылаемся на файл без хеша
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def is_immutable(self, name):
+        """
+        Имя с хешем содержимого: такой файл никогда не меняется
+        """
+        if self._immutable_names is None:
+            self._immutable_names = frozenset(self.hashed_files.values())
+        return name in self._immutable_names
+
+
+@lru_cache(maxsize=4096)
+def find_variants(path):
+    """
+    [(кодировка или None, полный путь, размер, время изменения)] - сжатые копии и сам файл.
+    Файлы в STATIC_ROOT меняются только при collectstatic (после него процесс
+    перезапускают), поэтому результат кешируется
+    """
+    variants = []
+    for encoding, extension in ENCODINGS + ((None, ''),):
+        try:
+            result = os.stat(path + extension)
+        except OSError:
+            continue
+        if stat.S_ISREG(result.st_mode):
+            variants.append((encoding, path + extension, result.st_size, result.st_mtime))
+    return variants
+
+
+def accepted_encodings(header):
+    """
+    Кодировки из Accept-Encoding, кроме явно запрещенных (q=0)
+    """
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = params.strip().partition('=')[2] if params.strip().startswith('q=') else '1'
+        try:
+            if float(quality) > 0:
+                accepted.add(encoding.strip().lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def serve(request, path):
+    """
+    Отдает файл STATIC_ROOT/path или его заранее сжатую копию
+    """
+    if not settings.STATIC_ROOT or path.endswith(tuple(extension for _, extension in ENCODINGS)):
+        raise Http404('Файл не найден')
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except (ValueError, SuspiciousFileOperation):
+        raise Http404('Файл не найден')
+    variants = find_variants(full_path)
+    # Последний вариант - сам файл, без него сжатые копии не отдаем
+    if not variants or variants[-1][0] is not None:
+        raise Http404('Файл не найден')
+
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding, file_path, size, mtime = next(variant for variant in variants
+                                            if variant[0] is None or variant[0] in accepted)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        response['Last-Modified'] = http_date(mtime)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    storage_immutable = getattr(staticfiles_storage, 'is_immutable', None)
+    if storage_immutable is not None and storage_immutable(path):
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={MUTABLE_MAX_AGE}'
+    if len(variants) > 1:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
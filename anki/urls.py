@@ -15,7 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
+from django.conf import settings
+from django.conf.urls.static import static
 from django.urls import path, include
+from anki import metrics, static_files
 from cards import views
 
 urlpatterns = [
@@ -28,4 +31,11 @@ urlpatterns = [
     # Маршрут к приложению карт
     path('cards/', include('cards.urls')),
     path('users/', include('users.urls')),
+    # Метрики в формате Prometheus (только для staff)
+    path('metrics/', metrics.metrics_view, name='metrics'),
+    # Статика из STATIC_ROOT с готовыми сжатыми копиями (если перед приложением нет nginx)
+    path(f'{settings.STATIC_URL.lstrip("/")}<path:path>', static_files.serve, name='static'),
 ]
+
+# Загруженные файлы (фотографии пользователей) в режиме отладки
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,28 +1,71 @@
+import logging
+
 from django.contrib import admin
-from .models import Card
+from django.db import transaction
+from . import counters, fragment_cache, page_cache
+from .forms import CardAdminForm
+from .models import Card, Notification, Tag
+from .pagination import CappedCountPaginator
 from django.contrib.admin import SimpleListFilter
 
+logger = logging.getLogger(__name__)
+
+# Сколько карточек обновлять одним UPDATE в массовых действиях
+ACTION_CHUNK_SIZE = 1000
+
+
+class CardPaginator(CappedCountPaginator):
+    # Без фильтров - счетчик карточек из кеша вместо COUNT(*)
+    count_without_filters = staticmethod(counters.total)
+
+
+def update_check_status(queryset, check_status, chunk_size=ACTION_CHUNK_SIZE):
+    """
+    Меняет статус проверки пачками по chunk_size карточек, каждая пачка в своей
+    транзакции, чтобы не держать блокировку на все время действия.
+    Пачки выбираются по id (keyset), возвращает число измененных карточек
+    """
+    ids = queryset.filter(check_status=not check_status).order_by('pk').values_list('pk', flat=True)
+    updated = 0
+    last_id = 0
+    while chunk := list(ids.filter(pk__gt=last_id)[:chunk_size]):
+        with transaction.atomic():
+            count = Card.objects.filter(pk__in=chunk, check_status=not check_status).update(check_status=check_status)
+            # update() не вызывает сигналы, поэтому счетчики и кеши страниц и превью правим сами
+            counters.adjust({counters.status_key(check_status): count, counters.status_key(not check_status): -count})
+            if count:
+                fragment_cache.bump(chunk)
+                page_cache.bump()
+        updated += count
+        last_id = chunk[-1]
+        logger.info('Статус проверки: обновлено %s карточек (до id %s)', updated, last_id)
+    return updated
+
 
 class CardCodeFilter(SimpleListFilter):
     title = 'Cтатус проверки'
     parameter_name = 'status_check'
 
     def lookups(self, request, model_admin):
+        # Число карточек по всей таблице из счетчиков в кеше, без COUNT(*)
         return (
-            ('check', 'Проверено'),
-            ('not check', 'Не проверено'),
+            ('check', f'Проверено ({counters.checked()})'),
+            ('not check', f'Не проверено ({counters.unchecked()})'),
         )
 
     def queryset(self, request, queryset):
+        # Фильтр по колонке CheckStatus (индекс cards_check_status_id_idx), а не по тексту ответа
         if self.value() == 'check':
-            return queryset.filter(answer__contains='Проверено')
+            return queryset.filter(check_status=True)
         elif self.value() == 'not check':
-            return queryset.exclude(answer__contains='Не проверено')
+            return queryset.filter(check_status=False)
 
 
 @admin.register(Card)
 class CardAdmin(admin.ModelAdmin):
 
+    form = CardAdminForm
+
     list_display = ('id', 'question', 'category', 'views', 'check_status', 'upload_date')
 
     list_display_links = ('id',)
@@ -33,14 +76,42 @@ class CardAdmin(admin.ModelAdmin):
 
     list_per_page = 10
 
+    list_select_related = ('category',)
+
+    # Режим больших таблиц: число карточек без COUNT(*) по всей таблице
+    paginator = CardPaginator
+
+    show_full_result_count = False
+
     actions = ['make_checked', 'make_unchecked']
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.save_tags()
+
     @admin.action(description='Отметить выбранные карточки как проверенные')
     def make_checked(self, request, queryset):
-        updated_count = queryset.update(check_status=True)
+        # Обновляем только карточки, у которых статус действительно меняется
+        updated_count = update_check_status(queryset, True)
         self.message_user(request, f"{updated_count} записей было помечено как проверенное")
 
     @admin.action(description='Отметить выбранные карточки как непроверенные')
     def make_unchecked(self, request, queryset):
-        updated_count = queryset.update(check_status=False)
-        self.message_user(request, f"{updated_count} записей было помечено как непроверенные")
\ No newline at end of file
+        updated_count = update_check_status(queryset, False)
+        self.message_user(request, f"{updated_count} записей было помечено как непроверенные")
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+
+    list_display = ('id', 'name')
+
+    search_fields = ('name',)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+
+    list_display = ('id', 'message', 'created_at', 'attempts', 'next_attempt_at', 'sent_at')
+
+    list_filter = ('sent_at',)
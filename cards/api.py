@@ -0,0 +1,222 @@
+"""
+JSON API только для чтения: карточки, теги и категории.
+
+Строки берутся прямо из .values() без создания моделей и рендеринга шаблонов.
+Параметр fields=id,question,... оставляет в ответе только нужные поля,
+по ним же строится SELECT. Страницы выбираются курсором (cards.pagination),
+фильтры карточек те же, что в каталоге (cards.search.filter_cards).
+Ответы кешируются вместе с ETag через PageCacheMixin: данные не зависят
+от пользователя, поэтому кешируются и запросы с сессией.
+
+Ответ: {"results": [...], "next": курсор или null, "previous": курсор или null}
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+
+from . import counters, search
+from .models import Card, CardTag, Categories, Tag
+from .page_cache import PageCacheMixin
+from .pagination import CursorPaginator, InvalidCursor
+from .tag_index import tag_index
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ApiError(ValueError):
+    """
+    Ошибка в параметрах запроса, отдается клиенту со статусом 400
+    """
+
+
+class ApiListView(PageCacheMixin, View):
+    """
+    Базовый список: разбор fields и limit, курсорная пагинация по values()
+    """
+    # Поле API -> путь для values(); None - поле заполняется отдельно (см. add_extra_fields)
+    fields = {}
+    # Источник строк: queryset или model, как в generic-представлениях Django
+    queryset = None
+    model = None
+    ordering_field = 'id'
+    descending = False
+    datetime_fields = ()
+    page_cache_params = ('fields', 'limit', 'cursor')
+
+    def is_page_cacheable(self, request):
+        return request.method in ('GET', 'HEAD')
+
+    def get_fields(self):
+        value = self.request.GET.get('fields', '')
+        if not value.strip():
+            return list(self.fields)
+        names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(self.fields)}')
+        return names
+
+    def get_limit(self):
+        limit = search.parse_id(self.request.GET.get('limit')) or DEFAULT_LIMIT
+        return max(1, min(limit, MAX_LIMIT))
+
+    def get_queryset(self):
+        if self.queryset is not None:
+            return self.queryset.all()
+        if self.model is not None:
+            return self.model._default_manager.all()
+        raise ImproperlyConfigured(f'{type(self).__name__}: укажите queryset, model или переопределите get_queryset()')
+
+    def get_ordering(self):
+        return self.ordering_field, self.descending
+
+    def add_extra_fields(self, rows, fields):
+        """
+        Дополняет строки полями, которых нет в values() (например, списком тегов)
+        """
+
+    def get_page_query(self):
+        """
+        (поля ответа, {поле: путь values()}, пагинатор, queryset со строками values())
+        """
+        fields = self.get_fields()
+        ordering_field, descending = self.get_ordering()
+        paths = {name: self.fields[name] for name in fields if self.fields[name]}
+        # id и поле сортировки нужны курсору, даже если клиент их не просил
+        values = set(paths.values()) | {'id', ordering_field}
+        paginator = CursorPaginator(self.get_limit(), ordering_field, descending=descending,
+                                    datetime_fields=self.datetime_fields)
+        return fields, paths, paginator, self.get_queryset().values(*values)
+
+    @staticmethod
+    def error_response(error):
+        return JsonResponse({'error': str(error) or 'Неверный курсор'}, status=400)
+
+    @staticmethod
+    def page_response(page, fields, paths):
+        results = [{name: row[paths[name]] if name in paths else row[name] for name in fields}
+                   for row in page.object_list]
+        return JsonResponse(
+            {'results': results, 'next': page.next_cursor, 'previous': page.previous_cursor},
+            json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+        )
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields, paths, paginator, queryset = self.get_page_query()
+            page = paginator.paginate(queryset, request.GET.get('cursor'))
+        except (ApiError, InvalidCursor) as error:
+            return self.error_response(error)
+        self.add_extra_fields(page.object_list, fields)
+        return self.page_response(page, fields, paths)
+
+
+class CardListApiView(ApiListView):
+    """
+    Карточки. Параметры как у каталога: search_query, category, tag, sort, order
+    """
+    fields = {
+        'id': 'id',
+        'question': 'question',
+        'answer': 'answer',
+        'category': 'category_id',
+        'category_name': 'category__name',
+        'author': 'author__username',
+        'upload_date': 'upload_date',
+        'views': 'views',
+        'adds': 'adds',
+        'tags': None,
+    }
+    sort_fields = {
+        'upload_date': 'upload_date',
+        'views': 'views',
+        'adds': 'adds',
+        'favorites': 'adds',
+    }
+    model = Card
+    datetime_fields = ('upload_date',)
+    page_cache_params = ApiListView.page_cache_params + ('search_query', 'category', 'tag', 'sort', 'order')
+
+    def get_search_query(self):
+        return self.request.GET.get('search_query', '').strip()
+
+    def get_queryset(self):
+        # Тег из пути (/api/tags/<id>/cards/) важнее параметра ?tag=
+        return search.filter_cards(
+            super().get_queryset(),
+            search_query=self.get_search_query(),
+            category=search.parse_id(self.request.GET.get('category')),
+            tag=self.kwargs.get('tag_id') or search.parse_id(self.request.GET.get('tag')),
+        )
+
+    def get_ordering(self):
+        sort = self.request.GET.get('sort')
+        descending = self.request.GET.get('order') != 'asc'
+        if self.get_search_query() and search.is_available() and sort in (None, 'relevance'):
+            return 'search_rank', descending
+        return self.sort_fields.get(sort, 'upload_date'), descending
+
+    @staticmethod
+    def get_tag_rows(card_ids):
+        return CardTag.objects.filter(card_id__in=card_ids).order_by('tag__name').values_list('card_id', 'tag__name')
+
+    def add_extra_fields(self, rows, fields):
+        if 'tags' not in fields:
+            return
+        tags = {row['id']: [] for row in rows}
+        for card_id, name in self.get_tag_rows(tags):
+            tags[card_id].append(name)
+        for row in rows:
+            row['tags'] = tags[row['id']]
+
+
+class CountedApiListView(ApiListView):
+    """
+    Список с полем cards - число карточек из счетчиков в кеше (cards.counters)
+    """
+    count_function = None
+
+    def add_extra_fields(self, rows, fields):
+        if 'cards' not in fields:
+            return
+        counts = self.count_function([row['id'] for row in rows])
+        for row in rows:
+            row['cards'] = counts[row['id']]
+
+
+class TagListApiView(CountedApiListView):
+    """
+    Теги по алфавиту
+    """
+    fields = {'id': 'id', 'name': 'name', 'cards': None}
+    ordering_field = 'name'
+    model = Tag
+    count_function = staticmethod(counters.tag_counts)
+
+
+class CategoryListApiView(CountedApiListView):
+    """
+    Категории по алфавиту
+    """
+    fields = {'id': 'id', 'name': 'name', 'cards': None}
+    ordering_field = 'name'
+    model = Categories
+    count_function = staticmethod(counters.category_counts)
+
+
+class TagAutocompleteView(View):
+    """
+    Подсказки тегов по префиксу: ?q=py&limit=10. Отвечает из индекса в памяти без запросов к БД
+    """
+
+    def get(self, request):
+        limit = search.parse_id(request.GET.get('limit')) or 10
+        suggestions = tag_index.complete(request.GET.get('q', ''), limit)
+        response = JsonResponse(
+            {'results': [suggestion._asdict() for suggestion in suggestions]},
+            json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+        )
+        patch_cache_control(response, max_age=60)
+        return response
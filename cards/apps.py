@@ -9,3 +9,6 @@ class CardsConfig(AppConfig):
 
     def ready(self):
         import cards.signals
+        from django.db.backends.signals import connection_created
+        from anki.sqlite_setup import configure_connection
+        connection_created.connect(configure_connection)
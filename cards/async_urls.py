@@ -0,0 +1,17 @@
+"""
+Маршруты приложения карточек под ASGI: горячие страницы отдают асинхронные
+представления (cards.async_views), остальные - те же, что в cards.urls
+"""
+from django.urls import path
+from cards import async_views, urls
+
+urlpatterns = [
+    path('catalog/', async_views.AsyncCatalogView.as_view(), name='catalog'),
+    path('<int:pk>/detail/', async_views.AsyncCardDetailView.as_view(), name='detail_card_by_id'),
+    path('tags/', async_views.AsyncTagCardsView.as_view(), name='cards_by_tags'),
+    path('tags/<int:tag_id>/', async_views.AsyncTagCardsView.as_view(), name='cards_by_tag'),
+    path('api/cards/', async_views.AsyncCardListApiView.as_view(), name='api_cards'),
+    path('api/tags/', async_views.AsyncTagListApiView.as_view(), name='api_tags'),
+    path('api/tags/<int:tag_id>/cards/', async_views.AsyncCardListApiView.as_view(), name='api_tag_cards'),
+    path('api/categories/', async_views.AsyncCategoryListApiView.as_view(), name='api_categories'),
+] + urls.urlpatterns
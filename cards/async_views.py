@@ -0,0 +1,145 @@
+"""
+Асинхронные версии горячих представлений для запуска под ASGI (anki.asgi).
+
+Страницы те же, что в cards.views и cards.api, и параметры разбираются теми же
+миксинами, но запросы к БД и кешу идут через асинхронный ORM и cache.aget,
+поэтому ожидающий ответа БД запрос не занимает поток воркера. Под ASGI эти
+представления подключаются через anki.async_urls, под WSGI по-прежнему
+работают синхронные.
+
+Рендеринг шаблона остается синхронным (sync_to_async): контекстные процессоры
+обращаются к ленивым request.user и сессии, а это синхронный ORM.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+
+from anki import db_router
+from . import api, counters, related, tag_postings
+from .models import Card, Tag
+from .page_cache import AsyncPageCacheMixin
+from .pagination import InvalidCursor
+from .view_counter import view_counter
+from .views import CardDetailView, CatalogQueryMixin, TagBrowseMixin, info
+
+arender = sync_to_async(render)
+
+
+class AsyncCatalogView(CatalogQueryMixin, AsyncPageCacheMixin, View):
+    """
+    Каталог карточек (cards.views.CatalogView)
+    """
+    template_name = 'cards/catalog.html'
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        paginator = self.get_cursor_paginator(self.paginate_by)
+        try:
+            page = await paginator.apaginate(queryset, request.GET.get('cursor'))
+        except InvalidCursor:
+            page = await paginator.apaginate(queryset)
+        self.prepare_page(page, [row async for row in self.get_snippets(page.object_list)])
+        context = {
+            **info,
+            'cards_count': await counters.atotal(),
+            'cards': page.object_list,
+            'object_list': page.object_list,
+            'page_obj': page,
+            'paginator': paginator,
+            'is_paginated': page.has_other_pages(),
+            **self.get_catalog_context(),
+        }
+        return await arender(request, self.template_name, context)
+
+
+class AsyncCardDetailView(AsyncPageCacheMixin, View):
+    """
+    Страница карточки (cards.views.CardDetailView)
+    """
+    template_name = CardDetailView.template_name
+    queryset = CardDetailView.queryset
+
+    async def get_object(self, pk):
+        try:
+            return await self.queryset.aget(pk=pk)
+        except Card.DoesNotExist:
+            # Новая карточка могла еще не дойти до реплики - проверяем основную БД
+            if not db_router.reads_from_replica():
+                raise Http404('Карточка не найдена')
+        with db_router.use_primary():
+            try:
+                return await self.queryset.aget(pk=pk)
+            except Card.DoesNotExist:
+                raise Http404('Карточка не найдена')
+
+    async def get(self, request, pk):
+        card = await self.get_object(pk)
+        await view_counter.aincrement(card.pk)
+        view_counter.apply_pending([card])
+        context = {
+            'menu': info['menu'],
+            'card': card,
+            'object': card,
+            'title': f'Карточка: {card.question}',
+            'related_cards': await related.aget_related(card),
+        }
+        return await arender(request, self.template_name, context)
+
+    async def page_cache_hit(self, request, *args, **kwargs):
+        await view_counter.aincrement(kwargs['pk'])
+
+
+class AsyncTagCardsView(TagBrowseMixin, AsyncPageCacheMixin, View):
+    """
+    Карточки по тегам (cards.views.TagCardsView)
+    """
+
+    async def get(self, request, *args, **kwargs):
+        tag_ids = self.get_tag_ids()
+        mode = self.get_mode()
+        found = await tag_postings.afind_cards(tag_ids, mode)
+        page = self.paginate_ids(found)
+        # Теги карточек подгружаются prefetch_related внутри ain_bulk
+        cards = await self.queryset.prefetch_related('tags').ain_bulk(page.object_list)
+        tags = await Tag.objects.ain_bulk(tag_ids)
+        context = self.get_tag_context(found, page, cards, tags, tag_ids, mode)
+        return await arender(request, self.template_name, context)
+
+
+class AsyncApiMixin:
+    """
+    Асинхронный get для списков API (cards.api.ApiListView)
+    """
+
+    async def aadd_extra_fields(self, rows, fields):
+        await sync_to_async(self.add_extra_fields)(rows, fields)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            fields, paths, paginator, queryset = self.get_page_query()
+            page = await paginator.apaginate(queryset, request.GET.get('cursor'))
+        except (api.ApiError, InvalidCursor) as error:
+            return self.error_response(error)
+        await self.aadd_extra_fields(page.object_list, fields)
+        return self.page_response(page, fields, paths)
+
+
+class AsyncCardListApiView(AsyncApiMixin, AsyncPageCacheMixin, api.CardListApiView):
+
+    async def aadd_extra_fields(self, rows, fields):
+        if 'tags' not in fields:
+            return
+        tags = {row['id']: [] for row in rows}
+        async for card_id, name in self.get_tag_rows(tags):
+            tags[card_id].append(name)
+        for row in rows:
+            row['tags'] = tags[row['id']]
+
+
+class AsyncTagListApiView(AsyncApiMixin, AsyncPageCacheMixin, api.TagListApiView):
+    pass
+
+
+class AsyncCategoryListApiView(AsyncApiMixin, AsyncPageCacheMixin, api.CategoryListApiView):
+    pass
@@ -0,0 +1,338 @@
+"""
+Синтетические данные и замеры горячих путей для команды bench.
+
+generate_dataset заполняет БД пользователями, категориями, тегами и
+карточками. Популярность тегов и просмотры карточек распределены по
+степенному закону: несколько тегов встречаются на большинстве карточек,
+а у остальных - единицы карточек, как в живом каталоге.
+
+run_scenarios прогоняет запросы через тестовый клиент Django и для каждого
+сценария считает перцентили задержки, пропускную способность, число и
+время SQL-запросов.
+
+run_concurrency сравнивает точки входа WSGI и ASGI (anki.wsgi, anki.asgi) при
+N одновременных соединениях: запросы идут через httpx прямо в приложение,
+без сети, WSGI - из пула потоков, ASGI - задачами в одном цикле событий.
+"""
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
+
+import httpx
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from . import counters, search
+from .models import Card, CardTag, Categories, Tag
+from .pagination import CursorPaginator
+from .view_counter import view_counter
+from .views import CatalogView
+
+WORDS = ('python', 'django', 'модель', 'запрос', 'индекс', 'шаблон', 'форма', 'тест', 'кеш', 'сигнал',
+         'транзакция', 'миграция', 'представление', 'маршрут', 'сессия', 'поток', 'генератор', 'класс',
+         'функция', 'словарь', 'список', 'кортеж', 'исключение', 'декоратор', 'итератор', 'строка')
+
+CHUNK_SIZE = 2000
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Веса по степенному закону: у элемента с рангом r вес 1 / r^exponent
+    """
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def _chunks(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def generate_dataset(users=50, categories=20, tags=500, cards=10000, max_tags_per_card=5, seed=1):
+    """
+    Создает синтетические данные, возвращает их описание для отчета
+    """
+    rng = random.Random(seed)
+    password = make_password('bench-password')
+    with transaction.atomic():
+        user_objects = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'bench_user_{i}', password=password) for i in range(users))
+        category_objects = Categories.objects.bulk_create(
+            Categories(name=f'Категория {i}') for i in range(categories))
+        tag_objects = Tag.objects.bulk_create(Tag(name=f'{rng.choice(WORDS)}-{i}') for i in range(tags))
+
+    tag_weights = zipf_weights(len(tag_objects))
+    category_weights = zipf_weights(len(category_objects), exponent=0.8)
+    for chunk in _chunks(range(cards)):
+        card_objects = []
+        card_tags = []
+        for _ in chunk:
+            question = ' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize() + '?'
+            card_objects.append(Card(
+                question=question,
+                answer=' '.join(rng.choices(WORDS, k=rng.randint(10, 40))),
+                category=rng.choices(category_objects, category_weights)[0],
+                author=rng.choice(user_objects),
+                views=int(rng.paretovariate(1.2)) - 1,
+                adds=int(rng.paretovariate(2)) - 1,
+                check_status=rng.random() < 0.7,
+            ))
+            card_tags.append({tag.id for tag in rng.choices(tag_objects, tag_weights,
+                                                            k=rng.randint(0, max_tags_per_card))})
+        with transaction.atomic():
+            Card.objects.bulk_create(card_objects)
+            CardTag.objects.bulk_create(CardTag(card_id=card.pk, tag_id=tag_id)
+                                        for card, tag_ids in zip(card_objects, card_tags) for tag_id in tag_ids)
+
+    search.rebuild()
+    counters.reconcile()
+    return {'users': users, 'categories': categories, 'tags': tags, 'cards': cards,
+            'max_tags_per_card': max_tags_per_card, 'seed': seed}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class QueryTimer:
+    """
+    Обертка execute (connection.execute_wrapper): число и суммарное время SQL-запросов
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def measure(client, request, iterations, warmup=2):
+    """
+    Выполняет request(client, номер) iterations раз, возвращает статистику в миллисекундах
+    """
+    for number in range(warmup):
+        request(client, -1 - number)
+
+    latencies = []
+    query_counts = []
+    query_times = []
+    started = time.perf_counter()
+    for number in range(iterations):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            request_started = time.perf_counter()
+            response = request(client, number)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'Сценарий вернул {response.status_code}')
+        query_counts.append(timer.count)
+        query_times.append(timer.seconds * 1000)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'throughput_rps': round(iterations / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p90': round(percentile(latencies, 0.9), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries_per_request': round(statistics.fmean(query_counts), 2),
+        'sql_ms_per_request': round(statistics.fmean(query_times), 3),
+    }
+
+
+def deep_cursor(params, depth):
+    """
+    Курсор страницы каталога номер depth (как после depth - 1 переходов по "Следующая")
+    """
+    paginator = CursorPaginator(CatalogView.paginate_by, CatalogView.sort_fields[params['sort']],
+                                descending=params['order'] == 'desc', datetime_fields=('upload_date',))
+    cursor = None
+    for _ in range(depth - 1):
+        page = paginator.paginate(Card.objects.only('id', paginator.field), cursor)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    return cursor
+
+
+def build_scenarios(seed=1, deep_page=50):
+    """
+    {имя сценария: (функция запроса (client, номер итерации) -> response, пользователь или None)}
+    """
+    rng = random.Random(seed)
+    card_ids = list(Card.objects.values_list('id', flat=True)[:10000])
+    tag_ids = list(Tag.objects.annotate(usage=Count('cardtag')).filter(usage__gt=0)
+                   .order_by('-usage').values_list('id', flat=True))
+    author = get_user_model().objects.filter(cards__isnull=False).first()
+    category = Categories.objects.first()
+    catalog = reverse('catalog')
+
+    def get(url, params=None):
+        return lambda client, number: client.get(url, params or {})
+
+    scenarios = {}
+    for sort in ('upload_date', 'views', 'adds'):
+        for order in ('desc', 'asc'):
+            scenarios[f'catalog_{sort}_{order}'] = (get(catalog, {'sort': sort, 'order': order}), None)
+
+    deep_params = {'sort': 'views', 'order': 'desc'}
+    cursor = deep_cursor(deep_params, deep_page)
+    scenarios[f'catalog_views_desc_page_{deep_page}'] = (get(catalog, {**deep_params, 'cursor': cursor or ''}), None)
+    scenarios['catalog_search'] = (get(catalog, {'search_query': 'python индекс'}), None)
+    scenarios['catalog_search_rare'] = (get(catalog, {'search_query': 'декоратор итератор кортеж'}), None)
+    scenarios['card_detail'] = (lambda client, number: client.get(
+        reverse('detail_card_by_id', kwargs={'pk': rng.choice(card_ids)})), None)
+    # Самый популярный тег и тег из середины распределения
+    scenarios['tag_popular'] = (get(reverse('cards_by_tag', kwargs={'tag_id': tag_ids[0]})), None)
+    scenarios['tag_median'] = (get(reverse('cards_by_tag', kwargs={'tag_id': tag_ids[len(tag_ids) // 2]})), None)
+    scenarios['tags_and'] = (get(reverse('cards_by_tags'), {'tag': tag_ids[:3], 'mode': 'and'}), None)
+    scenarios['tags_or'] = (get(reverse('cards_by_tags'), {'tag': tag_ids[:3], 'mode': 'or'}), None)
+
+    def add_card(client, number):
+        return client.post(reverse('add_card'), {
+            'question': f'Новая карточка {number} {rng.random()}',
+            'answer': 'Ответ',
+            'category': category.id,
+            'tags': 'python, bench',
+        })
+
+    scenarios['add_card'] = (add_card, author)
+    scenarios['profile_cards'] = (get(reverse('users:profile_cards')), author)
+    return scenarios
+
+
+def run_scenarios(iterations=50, names=None, seed=1, deep_page=50):
+    """
+    Прогоняет сценарии, возвращает {имя: статистика}
+    """
+    client = Client()
+    results = {}
+    try:
+        for name, (request, user) in build_scenarios(seed=seed, deep_page=deep_page).items():
+            if names and name not in names:
+                continue
+            cache.clear()
+            client.logout()
+            if user:
+                client.force_login(user)
+            results[name] = measure(client, request, iterations)
+    finally:
+        view_counter.discard()
+    return results
+
+
+def build_http_paths(seed=1):
+    """
+    {имя: функция номер запроса -> URL} для сравнения WSGI и ASGI
+    """
+    rng = random.Random(seed)
+    card_ids = list(Card.objects.values_list('id', flat=True)[:10000])
+    tag_id = (Tag.objects.annotate(usage=Count('cardtag')).order_by('-usage').values_list('id', flat=True).first())
+    catalog = reverse('catalog')
+    return {
+        'catalog': lambda number: catalog,
+        'card_detail': lambda number: reverse('detail_card_by_id', kwargs={'pk': rng.choice(card_ids)}),
+        'tag': lambda number: reverse('cards_by_tag', kwargs={'tag_id': tag_id}),
+        'api_cards': lambda number: reverse('api_cards') + '?fields=id,question,tags',
+    }
+
+
+def summarize(latencies, elapsed):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+        },
+    }
+
+
+def measure_wsgi(app, make_url, concurrency, requests):
+    numbers = count()
+
+    def worker(client):
+        latencies = []
+        while (number := next(numbers)) < requests:
+            started = time.perf_counter()
+            response = client.get(make_url(number))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(f'WSGI: {response.status_code} для {response.url}')
+        return latencies
+
+    with httpx.Client(transport=httpx.WSGITransport(app=app), base_url='http://testserver') as client:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(worker, [client] * concurrency))
+        elapsed = time.perf_counter() - started
+    return summarize([latency for latencies in results for latency in latencies], elapsed)
+
+
+async def measure_asgi(app, make_url, concurrency, requests):
+    numbers = count()
+    latencies = []
+
+    async def worker(client):
+        while (number := next(numbers)) < requests:
+            started = time.perf_counter()
+            response = await client.get(make_url(number))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(f'ASGI: {response.status_code} для {response.url}')
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://testserver') as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed)
+
+
+def run_concurrency(concurrency_levels=(1, 10, 50), requests=200, names=None, seed=1):
+    """
+    {имя: {уровень: {'wsgi': статистика, 'asgi': статистика}}}
+    """
+    from anki.asgi import application as asgi_application
+    from anki.wsgi import application as wsgi_application
+
+    results = {}
+    try:
+        for name, make_url in build_http_paths(seed=seed).items():
+            if names and name not in names:
+                continue
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                cache.clear()
+                # Прогрев: шаблоны, списки тегов, соединения потоков
+                measure_wsgi(wsgi_application, make_url, concurrency, concurrency)
+                wsgi = measure_wsgi(wsgi_application, make_url, concurrency, requests)
+                cache.clear()
+                asyncio.run(measure_asgi(asgi_application, make_url, concurrency, concurrency))
+                asgi = asyncio.run(measure_asgi(asgi_application, make_url, concurrency, requests))
+                results[name][concurrency] = {'wsgi': wsgi, 'asgi': asgi}
+    finally:
+        view_counter.discard()
+    return results
@@ -0,0 +1,136 @@
+"""
+Счетчики карточек в кеше: всего, по категориям, по тегам, проверенные и непроверенные.
+
+Значения хранятся без срока жизни и меняются инкрементально из сигналов
+(cards.signals) и массовых действий админки, поэтому чтение не требует
+COUNT(*). Отсутствующий в кеше счетчик вычисляется при первом чтении,
+а команда reconcile_card_counters пересчитывает все счетчики, если они
+разошлись с БД (например, после нескольких процессов с локальным кешем).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Card, CardTag, Categories, Tag
+
+TOTAL_KEY = 'cards_count'
+CHECKED_KEY = 'cards_count:checked'
+UNCHECKED_KEY = 'cards_count:unchecked'
+
+
+def category_key(category_id):
+    return f'cards_count:category:{category_id}'
+
+
+def tag_key(tag_id):
+    return f'cards_count:tag:{tag_id}'
+
+
+def status_key(check_status):
+    return CHECKED_KEY if check_status else UNCHECKED_KEY
+
+
+def _get(key, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, None)
+    return value
+
+
+def total():
+    return _get(TOTAL_KEY, Card.objects.count)
+
+
+async def atotal():
+    """
+    total() для асинхронных представлений
+    """
+    value = await cache.aget(TOTAL_KEY)
+    if value is None:
+        value = await Card.objects.acount()
+        await cache.aset(TOTAL_KEY, value, None)
+    return value
+
+
+def checked():
+    return _get(CHECKED_KEY, Card.objects.filter(check_status=True).count)
+
+
+def unchecked():
+    return _get(UNCHECKED_KEY, Card.objects.filter(check_status=False).count)
+
+
+def _get_grouped(ids, make_key, queryset, field):
+    keys = {make_key(pk): pk for pk in ids}
+    values = cache.get_many(keys)
+    result = {keys[key]: value for key, value in values.items()}
+    missing = [pk for pk in ids if pk not in result]
+    if missing:
+        counted = dict(queryset.filter(**{f'{field}__in': missing}).values(field)
+                       .annotate(count=Count('pk')).values_list(field, 'count'))
+        computed = {pk: counted.get(pk, 0) for pk in missing}
+        cache.set_many({make_key(pk): value for pk, value in computed.items()}, None)
+        result.update(computed)
+    return result
+
+
+def category_counts(category_ids):
+    """
+    {id категории: число карточек}
+    """
+    return _get_grouped(category_ids, category_key, Card.objects.all(), 'category_id')
+
+
+def tag_counts(tag_ids):
+    """
+    {id тега: число карточек}
+    """
+    return _get_grouped(tag_ids, tag_key, CardTag.objects.all(), 'tag_id')
+
+
+def adjust(deltas):
+    """
+    Применяет приращения {ключ: delta} после фиксации транзакции.
+    Отсутствующие ключи пропускаются: их вычислит следующее чтение
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def apply():
+        for key, delta in deltas.items():
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                pass
+
+    transaction.on_commit(apply)
+
+
+def forget(keys):
+    """
+    Удаляет счетчики (например, удаленной категории или тега)
+    """
+    transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+
+def reconcile():
+    """
+    Пересчитывает все счетчики по БД, возвращает {ключ: (было, стало)} для разошедшихся
+    """
+    values = {
+        TOTAL_KEY: Card.objects.count(),
+        CHECKED_KEY: Card.objects.filter(check_status=True).count(),
+        UNCHECKED_KEY: Card.objects.filter(check_status=False).count(),
+    }
+    # Категории и теги без карточек тоже пересчитываем - в кеше у них мог остаться старый счетчик
+    for category_id, count in Categories.objects.annotate(count=Count('card')).values_list('id', 'count'):
+        values[category_key(category_id)] = count
+    for tag_id, count in Tag.objects.annotate(count=Count('cardtag')).values_list('id', 'count'):
+        values[tag_key(tag_id)] = count
+
+    cached = cache.get_many(list(values))
+    drift = {key: (cached.get(key), value) for key, value in values.items() if cached.get(key) != value}
+    cache.set_many(values, None)
+    return drift
@@ -0,0 +1,216 @@
+"""
+Поиск почти одинаковых вопросов карточек через MinHash и LSH.
+
+Вопрос приводится к нижнему регистру без знаков препинания и режется на
+символьные шинглы длины SHINGLE_SIZE. MinHash-подпись из BANDS * ROWS
+минимумов приблизительно сохраняет коэффициент Жаккара между наборами
+шинглов. Подпись делится на BANDS полос по ROWS значений, хеш каждой
+полосы - корзина LSH в таблице CardLshBuckets (cards.models.CardLshBucket).
+
+Похожие вопросы почти наверняка совпадают хотя бы в одной полосе, поэтому
+кандидаты в дубли находятся запросом WHERE bucket IN (...) по индексу,
+без просмотра всей таблицы, и затем проверяются точным сравнением шинглов.
+При BANDS=16 и ROWS=4 пара с сходством 0.7 становится кандидатом
+с вероятностью ~95%, а с сходством 0.3 - ~12%.
+
+Подпись считается одной хеш-функцией (см. signature): импорт индексирует
+вопросы пачками, и 64 хеш-функции на каждый шингл замедляли его в разы.
+
+Корзины обновляются при сохранении карточки (cards.signals) и при импорте.
+Для уже существующих карточек индекс строится командой
+find_duplicate_cards --rebuild.
+"""
+import hashlib
+import re
+import struct
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Card, CardLshBucket
+
+SHINGLE_SIZE = 4
+BANDS = 16
+ROWS = 4
+# Минимальное сходство (по Жаккару), начиная с которого вопросы считаются дублями
+THRESHOLD = 0.7
+MAX_CANDIDATES = 50
+# В больших корзинах (одинаковые шаблонные вопросы) сравниваем карточки только с первой
+MAX_BUCKET_PAIRS = 50
+CHUNK_SIZE = 2000
+
+SIGNATURE_SIZE = BANDS * ROWS
+# Хеш шингла: старшие 6 бит - номер ячейки подписи, остальные 58 - значение
+_INDEX_SHIFT = 64 - (SIGNATURE_SIZE - 1).bit_length()
+_VALUE_MASK = (1 << _INDEX_SHIFT) - 1
+_MIX = 0x9E3779B97F4A7C15
+_HASH_MASK = (1 << 64) - 1
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text):
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
+
+
+def signature(shingle_set):
+    """
+    MinHash-подпись одной хеш-функцией (one permutation hashing): хеш шингла
+    выбирает ячейку подписи, в ячейке остается минимальное значение. Это один
+    проход по шинглам вместо SIGNATURE_SIZE проходов с разными хеш-функциями.
+    Пустую ячейку заполняет ближайшая заполненная справа (по кругу) со сдвигом
+    на расстояние до нее - так у одинаковых наборов совпадают и пустые ячейки
+    """
+    # crc32 перемешивается умножением, чтобы номер ячейки брался из всех бит.
+    # По убыванию: в словаре у ячейки остается последнее, то есть минимальное значение
+    hashes = sorted(((zlib.crc32(shingle.encode()) * _MIX) & _HASH_MASK for shingle in shingle_set), reverse=True)
+    slots = {value >> _INDEX_SHIFT: value & _VALUE_MASK for value in hashes}
+    if not slots:
+        return []
+    result = [0] * SIGNATURE_SIZE
+    # Справа от последней заполненной ячейки по кругу - первая
+    source = min(slots) + SIGNATURE_SIZE
+    for index in range(SIGNATURE_SIZE - 1, -1, -1):
+        if index in slots:
+            source = index
+        result[index] = slots[source % SIGNATURE_SIZE] + ((source - index) << _INDEX_SHIFT)
+    return result
+
+
+def buckets(text):
+    """
+    Корзины LSH вопроса: по одной на полосу подписи (пусто для вопроса без букв и цифр)
+    """
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return []
+    values = signature(shingle_set)
+    result = []
+    for band in range(BANDS):
+        # Ячейки полосы берутся через BANDS: соседние ячейки после заполнения
+        # пустых совпадают чаще, и полоса из них давала бы лишних кандидатов
+        packed = struct.pack(f'>H{ROWS}Q', band, *values[band::BANDS])
+        digest = hashlib.blake2b(packed, digest_size=8).digest()
+        # BigIntegerField знаковый
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
+
+
+def index_cards(cards, created=False):
+    """
+    Записывает корзины карточек (нужны pk и question). created=True - старых корзин нет
+    """
+    if not created:
+        CardLshBucket.objects.filter(card_id__in=[card.pk for card in cards]).delete()
+    # BANDS строк на карточку: bulk_create создавал бы по объекту модели на каждую,
+    # а при импорте это дороже самого расчета корзин
+    rows = [(card.pk, bucket) for card in cards for bucket in buckets(card.question)]
+    table = CardLshBucket._meta.db_table
+    card_column = CardLshBucket._meta.get_field('card').column
+    bucket_column = CardLshBucket._meta.get_field('bucket').column
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO "{table}" ("{card_column}", "{bucket_column}") VALUES (%s, %s)', rows)
+
+
+def rebuild_index(chunk_size=CHUNK_SIZE):
+    """
+    Перестраивает корзины всех карточек, возвращает число карточек
+    """
+    CardLshBucket.objects.all().delete()
+    cards = Card.objects.only('id', 'question').order_by('pk').iterator(chunk_size=chunk_size)
+    count = 0
+    while chunk := list(islice(cards, chunk_size)):
+        with transaction.atomic():
+            index_cards(chunk, created=True)
+        count += len(chunk)
+    return count
+
+
+def find_similar(question, exclude=None, threshold=THRESHOLD, limit=5):
+    """
+    Карточки с похожим вопросом по убыванию сходства (сходство - в атрибуте similarity)
+    """
+    keys = buckets(question)
+    if not keys:
+        return []
+    # Больше общих корзин - выше вероятное сходство: при срезе до MAX_CANDIDATES
+    # отбрасываются карточки, совпавшие с вопросом в меньшем числе полос
+    candidates = (Card.objects.filter(lsh_buckets__bucket__in=keys).only('id', 'question')
+                  .annotate(matched=Count('lsh_buckets')).order_by('-matched', 'id'))
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+    question_shingles = shingles(question)
+    similar = []
+    for card in candidates[:MAX_CANDIDATES]:
+        card.similarity = jaccard(question_shingles, shingles(card.question))
+        if card.similarity >= threshold:
+            similar.append(card)
+    similar.sort(key=lambda card: (-card.similarity, card.pk))
+    return similar[:limit]
+
+
+def find_clusters(threshold=THRESHOLD):
+    """
+    Группы карточек-дублей по всей таблице: [[id, ...], ...], в группе больше одной карточки.
+    Кандидаты - карточки из общих корзин, дублями считаются пары со сходством не ниже threshold,
+    группы - компоненты связности таких пар
+    """
+    shared = CardLshBucket.objects.values('bucket').annotate(size=Count('id')).filter(size__gt=1).values('bucket')
+    rows = (CardLshBucket.objects.filter(bucket__in=shared).order_by('bucket', 'card_id')
+            .values_list('bucket', 'card_id', 'card__question'))
+
+    parent = {}
+
+    def find(pk):
+        parent.setdefault(pk, pk)
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    cached_shingles = {}
+    checked = set()
+
+    def compare(first, second):
+        pair = (first, second) if first < second else (second, first)
+        if pair in checked or find(first) == find(second):
+            return
+        checked.add(pair)
+        if jaccard(cached_shingles[first], cached_shingles[second]) >= threshold:
+            parent[find(first)] = find(second)
+
+    def process(members):
+        for index, pk in enumerate(members):
+            others = members[:index] if len(members) <= MAX_BUCKET_PAIRS else members[:min(index, 1)]
+            for other in others:
+                compare(other, pk)
+
+    current_bucket, members = None, []
+    for bucket, card_id, question in rows.iterator(chunk_size=CHUNK_SIZE):
+        if bucket != current_bucket:
+            process(members)
+            current_bucket, members = bucket, []
+        if card_id not in cached_shingles:
+            cached_shingles[card_id] = shingles(question)
+        members.append(card_id)
+    process(members)
+
+    clusters = defaultdict(list)
+    for pk in parent:
+        clusters[find(pk)].append(pk)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids))
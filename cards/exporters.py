@@ -0,0 +1,106 @@
+"""
+Потоковая выгрузка карточек в CSV, JSONL и TSV для импорта в Anki.
+
+Карточки читаются через QuerySet.iterator(chunk_size) с подгрузкой тегов
+на каждую пачку, а текст отдается кусками по мере чтения, поэтому память
+не зависит от размера колоды. Форматы совместимы с командой import_cards.
+"""
+import csv
+import io
+import json
+import zlib
+
+FORMATS = {
+    # формат: (content type, расширение файла)
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'tsv': ('text/tab-separated-values; charset=utf-8', 'txt'),
+}
+
+CHUNK_SIZE = 2000
+
+
+def export_queryset(queryset):
+    """
+    Все, что нужно выгрузке, одним запросом на пачку карточек плюс запрос тегов пачки
+    """
+    return (queryset.select_related('category').prefetch_related('tags')
+            .only('id', 'question', 'answer', 'upload_date', 'category__name').order_by('id'))
+
+
+def _csv_line(writer, buffer, row):
+    writer.writerow(row)
+    line = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return line
+
+
+def iter_csv(cards):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield _csv_line(writer, buffer, ['question', 'answer', 'category', 'tags'])
+    for card in cards:
+        yield _csv_line(writer, buffer, [card.question, card.answer, card.category.name,
+                                         ', '.join(tag.name for tag in card.tags.all())])
+
+
+def iter_jsonl(cards):
+    for card in cards:
+        yield json.dumps({
+            'id': card.id,
+            'question': card.question,
+            'answer': card.answer,
+            'category': card.category.name,
+            'tags': [tag.name for tag in card.tags.all()],
+            'upload_date': card.upload_date.isoformat(),
+        }, ensure_ascii=False) + '\n'
+
+
+def iter_tsv(cards):
+    # Заголовки формата Anki "Notes in Plain Text"; теги в Anki разделяются пробелом
+    yield '#separator:tab\n#html:false\n#tags column:3\n'
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter='\t', lineterminator='\n')
+    for card in cards:
+        tags = ' '.join(tag.name.replace(' ', '_') for tag in card.tags.all())
+        yield _csv_line(writer, buffer, [card.question, card.answer, tags])
+
+
+WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'tsv': iter_tsv,
+}
+
+
+def iter_export(queryset, export_format, chunk_size=CHUNK_SIZE, buffer_size=64 * 1024):
+    """
+    Генератор байтов выгрузки. Строки склеиваются в куски примерно по buffer_size,
+    чтобы не отправлять клиенту по строке за раз
+    """
+    cards = export_queryset(queryset).iterator(chunk_size=chunk_size)
+    parts = []
+    size = 0
+    for number, line in enumerate(WRITERS[export_format](cards)):
+        parts.append(line)
+        size += len(line)
+        # Первую строку отдаем сразу, чтобы клиент не ждал заполнения буфера
+        if size >= buffer_size or number == 0:
+            yield ''.join(parts).encode()
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def gzip_stream(chunks, level=6):
+    """
+    Сжимает поток байтов в gzip на лету, отдавая сжатые данные после каждого куска
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
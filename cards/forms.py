@@ -1,15 +1,30 @@
 from django import forms
+from django.db import transaction
+from django.urls import reverse_lazy
+from . import duplicates
 from .models import Categories, Card, Tag
 from django.core.exceptions import ValidationError
 import re
 
 
+def parse_tag_names(value):
+    # Валидация и преобразование строки тегов через запятую в список тегов без повторов
+    tag_list = list(dict.fromkeys(Tag.objects.normalize(tag) for tag in value.split(',') if tag.strip()))
+    too_long = [tag for tag in tag_list if len(tag) > Tag._meta.get_field('name').max_length]
+    if too_long:
+        raise ValidationError(f'Слишком длинный тег: {too_long[0]}')
+    return tag_list
+
+
 class CardForm(forms.ModelForm):
     # Теперь мы можем определить только те поля, которые нам нужно кастомизировать
     category = forms.ModelChoiceField(queryset=Categories.objects.all(), empty_label="Категория не выбрана",
                                       label='Категория', widget=forms.Select(attrs={'class': 'form-control'}))
     tags = forms.CharField(label='Теги', required=False, help_text='Перечислите теги через запятую',
-                           widget=forms.TextInput(attrs={'class': 'form-control'}))
+                           widget=forms.TextInput(attrs={'class': 'form-control',
+                                                         'data-autocomplete-url': reverse_lazy('tag_autocomplete')}))
+    # Показывается только вместе с предупреждением о похожих вопросах
+    confirm_duplicate = forms.BooleanField(label='Все равно добавить', required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Card  # Указываем модель, с которой работает форма
@@ -29,23 +44,55 @@ class CardForm(forms.ModelForm):
         }
 
     def clean_tags(self):
-        # Валидация и преобразование строки тегов в список тегов
-        tags_str = self.cleaned_data['tags']
-        tag_list = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-        return tag_list
+        return parse_tag_names(self.cleaned_data['tags'])
+
+    def clean(self):
+        cleaned_data = super().clean()
+        question = cleaned_data.get('question')
+        # Похожие вопросы ищутся по корзинам LSH (см. cards.duplicates), а не LIKE по всей таблице
+        self.duplicates = []
+        if question and not cleaned_data.get('confirm_duplicate'):
+            self.duplicates = duplicates.find_similar(question, exclude=self.instance.pk)
+        if self.duplicates:
+            self.fields['confirm_duplicate'].widget = forms.CheckboxInput()
+            self.add_error('question', ValidationError(
+                'Похожий вопрос уже есть. Проверьте карточки ниже или отметьте "Все равно добавить"',
+                code='duplicate'))
+        return cleaned_data
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        # Сохранение карточки вместе с тегами
+        # Сохранение карточки вместе с тегами и уведомлением в одной транзакции
         instance = super().save(commit=False)
         instance.save()  # Сначала сохраняем карточку, чтобы получить ее id
 
-        # Обрабатываем теги
-        for tag_name in self.cleaned_data['tags']:
-            tag, created = Tag.objects.get_or_create(name=tag_name)
-            instance.tags.add(tag)
+        # Находим или создаем все теги разом и привязываем их одной вставкой
+        Tag.objects.attach(instance, self.cleaned_data['tags'])
 
         return instance
 
 
 class SearchForm(forms.Form):
     query = forms.CharField()
+
+
+class CardAdminForm(forms.ModelForm):
+    # Теги в админке редактируются строкой через запятую, как в CardForm
+    tag_names = forms.CharField(label='Теги', required=False, help_text='Перечислите теги через запятую',
+                                widget=forms.TextInput(attrs={'size': 80}))
+
+    class Meta:
+        model = Card
+        fields = ['question', 'answer', 'category', 'check_status', 'author', 'views', 'adds']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['tag_names'].initial = ', '.join(tag.name for tag in self.instance.tags.all())
+
+    def clean_tag_names(self):
+        return parse_tag_names(self.cleaned_data['tag_names'])
+
+    def save_tags(self):
+        # Вызывается из CardAdmin.save_related, когда карточка уже сохранена
+        self.instance.tags.set(Tag.objects.resolve(self.cleaned_data['tag_names']))
@@ -0,0 +1,97 @@
+"""
+Кеш отрендеренных превью карточек (include/card_preview.html).
+
+Ключ фрагмента строится из id карточки и ее версии, плюс из показываемых
+значений, которые меняются без сохранения карточки: просмотров и избранного
+(их пишет буфер просмотров через update), имени категории и автора.
+Версия - случайная метка в кеше, она меняется при сохранении карточки
+и изменении ее тегов (см. cards.signals). Если метка вытеснена из кеша,
+создается новая, поэтому старый фрагмент не может быть использован повторно.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from anki import metrics
+
+VERSION_KEY = 'card_preview_version:{}'
+
+
+class FragmentStats:
+    """
+    Счетчики попаданий и промахов кеша превью в текущем процессе
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        metrics.record_cache('card_preview', hit)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / total if total else 0.0}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = FragmentStats()
+
+
+def get_timeout():
+    return getattr(settings, 'CARD_PREVIEW_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def get_versions(card_ids):
+    """
+    {id карточки: версия}, недостающие версии создаются
+    """
+    keys = {VERSION_KEY.format(card_id): card_id for card_id in card_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    missing = {VERSION_KEY.format(card_id): uuid.uuid4().hex for card_id in card_ids if card_id not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update((keys[key], version) for key, version in missing.items())
+    return versions
+
+
+def bump(card_ids):
+    """
+    Меняет версии карточек после фиксации транзакции, чтобы фрагмент
+    не успели закешировать со старыми данными под новой версией
+    """
+    card_ids = list(card_ids)
+    if card_ids:
+        transaction.on_commit(lambda: cache.delete_many([VERSION_KEY.format(card_id) for card_id in card_ids]))
+
+
+def fragment_key(card, version):
+    author = card.author.username if card.author_id else ''
+    raw = f'{card.pk}:{version}:{card.views}:{card.adds}:{card.category.name}:{author}'
+    return 'card_preview:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_or_render(card, render):
+    """
+    Возвращает фрагмент из кеша или рендерит его функцией render() и кладет в кеш
+    """
+    key = fragment_key(card, get_versions([card.pk])[card.pk])
+    html = cache.get(key)
+    stats.record(hit=html is not None)
+    if html is None:
+        html = render()
+        cache.set(key, html, get_timeout())
+    return html
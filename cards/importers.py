@@ -0,0 +1,208 @@
+"""
+Потоковый импорт карточек из CSV, JSONL и текстового экспорта Anki.
+
+Файл читается построчно и обрабатывается пачками: категории и теги
+пачки ищутся и создаются несколькими запросами, карточки и связи с
+тегами вставляются через bulk_create. bulk_create не отправляет
+post_save, поэтому поисковый индекс, корзины дублей, счетчики и списки
+карточек тегов обновляются для каждой пачки целиком.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from itertools import chain, islice
+
+from django.db import transaction
+
+from . import counters, duplicates, notifications, page_cache, search, tag_postings
+from .models import Card, CardTag, Categories, Tag
+
+FORMATS = ('csv', 'jsonl', 'anki')
+
+# Сколько имен тегов держать в памяти между пачками
+TAG_CACHE_SIZE = 100_000
+
+
+def detect_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'anki'
+
+
+def split_tags(value, separator=','):
+    if isinstance(value, (list, tuple)):
+        names = value
+    else:
+        names = (value or '').split(separator)
+    return [name.strip() for name in names if name and name.strip()]
+
+
+def read_csv(lines):
+    """
+    CSV с заголовком: question, answer, category, tags (теги через запятую)
+    """
+    for row in csv.DictReader(lines):
+        yield {
+            'question': row.get('question', ''),
+            'answer': row.get('answer', ''),
+            'category': row.get('category', ''),
+            'tags': split_tags(row.get('tags')),
+        }
+
+
+def read_jsonl(lines):
+    """
+    По объекту на строку: {"question", "answer", "category", "tags": [...] или "a, b"}
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        yield {
+            'question': row.get('question', ''),
+            'answer': row.get('answer', ''),
+            'category': row.get('category', ''),
+            'tags': split_tags(row.get('tags')),
+        }
+
+
+def read_anki(lines):
+    """
+    Экспорт Anki "Notes in Plain Text": поля через табуляцию (вопрос, ответ, теги через пробел).
+    Учитываются заголовки #separator и #tags column, поля в кавычках могут занимать несколько строк
+    """
+    separator = '\t'
+    tags_column = 3
+    lines = iter(lines)
+    first = None
+    for line in lines:
+        if not line.startswith('#'):
+            first = line
+            break
+        key, _, value = line[1:].rstrip('\r\n').partition(':')
+        if key == 'separator':
+            separator = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'space': ' ', 'pipe': '|'}.get(value, value)
+        elif key == 'tags column' and value.isdigit():
+            tags_column = int(value)
+    if first is None:
+        return
+
+    for fields in csv.reader(chain([first], lines), delimiter=separator):
+        if len(fields) < 2:
+            continue
+        tags = fields[tags_column - 1] if len(fields) >= tags_column else ''
+        yield {
+            'question': fields[0],
+            'answer': fields[1],
+            'category': '',
+            'tags': split_tags(tags, separator=' '),
+        }
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'anki': read_anki,
+}
+
+
+class CardImporter:
+    """
+    Импорт карточек пачками по chunk_size. default_category используется,
+    если у строки не указана категория. progress(imported, skipped, elapsed)
+    вызывается после каждой пачки
+    """
+
+    def __init__(self, chunk_size=1000, author=None, default_category='', progress=None):
+        self.chunk_size = chunk_size
+        self.author = author
+        self.default_category = default_category
+        self.progress = progress
+        self.category_ids = {}
+        self.tag_ids = {}
+        self.imported = 0
+        self.skipped = 0
+
+    def _resolve_categories(self, names):
+        """
+        Находит или создает категории по именам, дополняет словарь category_ids {имя: id}
+        """
+        missing = [name for name in names if name not in self.category_ids]
+        if not missing:
+            return
+        found = dict(Categories.objects.filter(name__in=missing).values_list('name', 'id'))
+        new = [name for name in missing if name not in found]
+        if new:
+            # ignore_conflicts: имя мог одновременно создать другой процесс
+            Categories.objects.bulk_create([Categories(name=name) for name in new], ignore_conflicts=True)
+            found.update(Categories.objects.filter(name__in=new).values_list('name', 'id'))
+        self.category_ids.update(found)
+
+    def import_chunk(self, rows):
+        cards = []
+        card_categories = []
+        card_tags = []
+        for row in rows:
+            question = (row['question'] or '').strip()
+            answer = (row['answer'] or '').strip()
+            if not question or not answer or len(question) > 255 or len(answer) > 5000:
+                self.skipped += 1
+                continue
+            category = (row['category'] or self.default_category).strip()
+            if not category:
+                self.skipped += 1
+                continue
+            cards.append(Card(question=question, answer=answer, author=self.author))
+            card_categories.append(category)
+            card_tags.append(list(dict.fromkeys(Tag.objects.normalize(name) for name in row['tags'])))
+        if not cards:
+            return
+
+        if len(self.tag_ids) > TAG_CACHE_SIZE:
+            self.tag_ids.clear()
+
+        with transaction.atomic():
+            self._resolve_categories(set(card_categories))
+            tag_names = [name for name in {name for names in card_tags for name in names} if name not in self.tag_ids]
+            self.tag_ids.update((tag.name, tag.id) for tag in Tag.objects.resolve(tag_names))
+            for card, category in zip(cards, card_categories):
+                card.category_id = self.category_ids[category]
+
+            Card.objects.bulk_create(cards, batch_size=self.chunk_size)
+            CardTag.objects.bulk_create(
+                [CardTag(card_id=card.pk, tag_id=self.tag_ids[name])
+                 for card, names in zip(cards, card_tags) for name in names],
+                batch_size=self.chunk_size,
+            )
+            search.index_cards([card.pk for card in cards])
+            duplicates.index_cards(cards, created=True)
+            counters.adjust(self._counter_deltas(cards, card_tags))
+            tag_postings.invalidate(self.tag_ids[name] for names in card_tags for name in names)
+            page_cache.bump()
+        self.imported += len(cards)
+
+    def _counter_deltas(self, cards, card_tags):
+        deltas = Counter({counters.TOTAL_KEY: len(cards), counters.UNCHECKED_KEY: len(cards)})
+        deltas.update(counters.category_key(card.category_id) for card in cards)
+        deltas.update(counters.tag_key(self.tag_ids[name]) for names in card_tags for name in names)
+        return deltas
+
+    def run(self, rows):
+        started = time.monotonic()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            if self.progress:
+                self.progress(self.imported, self.skipped, time.monotonic() - started)
+
+        if self.imported:
+            # Одно уведомление на весь импорт вместо уведомления на каждую карточку
+            notifications.enqueue(f'Импортировано карточек: {self.imported}.')
+        return self.imported
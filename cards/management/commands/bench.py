@@ -0,0 +1,77 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from cards.benchmark import generate_dataset, run_scenarios
+
+
+class Command(BaseCommand):
+    help = ('Замеряет горячие пути (каталог, поиск, карточка, теги, добавление, профиль) на синтетических '
+            'данных во временной тестовой БД и выводит результаты в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--cards', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=50, help='Запросов на сценарий')
+        parser.add_argument('--deep-page', type=int, default=50, help='Номер "глубокой" страницы каталога')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Запустить только этот сценарий (можно несколько раз)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Не отключать кеш страниц (по умолчанию замеряется рендеринг)')
+        parser.add_argument('-o', '--output', help='Файл для JSON, по умолчанию - stdout')
+
+    def handle(self, *args, **options):
+        # Данные создаются в отдельной тестовой БД, рабочая база не меняется
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            overrides = {} if options['page_cache'] else {'PAGE_CACHE_TIMEOUT': 0}
+            with override_settings(**overrides):
+                started = time.perf_counter()
+                dataset = generate_dataset(users=options['users'], categories=options['categories'],
+                                           tags=options['tags'], cards=options['cards'], seed=options['seed'])
+                generation_seconds = time.perf_counter() - started
+                results = run_scenarios(iterations=options['iterations'], names=options['scenarios'],
+                                        seed=options['seed'], deep_page=options['deep_page'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': self.get_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'page_cache': options['page_cache'],
+                'generation_seconds': round(generation_seconds, 2),
+            },
+            'dataset': dataset,
+            'scenarios': results,
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Результаты записаны в {options["output"]}'))
+        else:
+            self.stdout.write(data)
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,67 @@
+import json
+import os
+import platform
+import tempfile
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from cards.benchmark import generate_dataset, run_concurrency
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность точек входа WSGI и ASGI при нескольких одновременных '
+            'соединениях на синтетических данных во временной тестовой БД и выводит результаты в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий и уровень')
+        parser.add_argument('--concurrency', type=int, action='append',
+                            help='Число одновременных соединений (можно несколько раз), по умолчанию 1, 10, 50')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Запустить только этот сценарий: catalog, card_detail, tag, api_cards')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('-o', '--output', help='Файл для JSON, по умолчанию - stdout')
+
+    def handle(self, *args, **options):
+        # Данные создаются в отдельной тестовой БД, рабочая база не меняется.
+        # БД SQLite - во временном файле: общая БД в памяти не выдерживает записи
+        # (счетчик просмотров) параллельно с чтением из нескольких потоков
+        setup_test_environment()
+        directory = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Кеш страниц отключен: замеряется работа представлений, а не отдача из кеша
+            with override_settings(PAGE_CACHE_TIMEOUT=0):
+                dataset = generate_dataset(cards=options['cards'], tags=options['tags'], seed=options['seed'])
+                results = run_concurrency(concurrency_levels=options['concurrency'] or (1, 10, 50),
+                                          requests=options['requests'], names=options['scenarios'],
+                                          seed=options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            directory.cleanup()
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'dataset': dataset,
+            'scenarios': results,
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Результаты записаны в {options["output"]}'))
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from anki.sqlite_setup import apply_pragmas, get_pragmas, is_busy, retry_on_busy
+
+SCHEMA = '''
+    CREATE TABLE Cards (
+        CardId INTEGER PRIMARY KEY AUTOINCREMENT,
+        Question TEXT NOT NULL,
+        Answer TEXT NOT NULL,
+        Views INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX cards_views_id_idx ON Cards (Views, CardId);
+'''
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite при одновременных чтениях и записях: '
+            'настройки по умолчанию против SQLITE_PRAGMAS и повтора занятых транзакций')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Потоков чтения')
+        parser.add_argument('--writers', type=int, default=2, help='Потоков записи')
+        parser.add_argument('--seconds', type=float, default=5, help='Длительность каждого прогона')
+        parser.add_argument('--rows', type=int, default=20000, help='Карточек в тестовой БД')
+
+    def handle(self, *args, **options):
+        # Настройки "до": журнал по умолчанию (delete), ожидание блокировки драйвера sqlite3
+        # (Django его не меняет), без повтора транзакций
+        runs = [
+            ('по умолчанию', {}, False),
+            ('SQLITE_PRAGMAS + повтор', get_pragmas(), True),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            for number, (title, pragmas, retry) in enumerate(runs):
+                path = os.path.join(directory, f'bench_{number}.sqlite3')
+                self.create_database(path, options['rows'])
+                result = self.run(path, pragmas, retry, options)
+                self.stdout.write(
+                    f'{title}: чтений {result["reads"] / options["seconds"]:.0f}/с '
+                    f'(p50 {result["p50"]:.2f} мс, p99 {result["p99"]:.2f} мс), '
+                    f'записей {result["writes"] / options["seconds"]:.0f}/с, '
+                    f'ошибок "database is locked": {result["errors"]}'
+                )
+
+    def create_database(self, path, rows):
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        connection.executemany('INSERT INTO Cards (Question, Answer) VALUES (?, ?)',
+                               ((f'Вопрос {i}', f'Ответ {i}') for i in range(rows)))
+        connection.commit()
+        connection.close()
+
+    def connect(self, path, pragmas):
+        # isolation_level=None: транзакциями управляем сами, как Django в atomic()
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def run(self, path, pragmas, retry, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        result = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+        rows = options['rows']
+
+        def reader():
+            connection = self.connect(path, pragmas)
+            latencies = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute('SELECT CardId, Question FROM Cards '
+                                       'ORDER BY Views DESC, CardId DESC LIMIT 30').fetchall()
+                except sqlite3.OperationalError as error:
+                    if not is_busy(error):
+                        raise
+                    with lock:
+                        result['errors'] += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            with lock:
+                result['reads'] += len(latencies)
+                result['latencies'].extend(latencies)
+
+        def writer(number):
+            connection = self.connect(path, pragmas)
+
+            def transaction_body():
+                # Чтение, затем запись в одной транзакции - так работают save() и bulk-операции
+                connection.execute('BEGIN')
+                try:
+                    card_id = number * 7919 % rows + 1
+                    connection.execute('SELECT Views FROM Cards WHERE CardId = ?', (card_id,)).fetchone()
+                    connection.execute('UPDATE Cards SET Views = Views + 1 WHERE CardId = ?', (card_id,))
+                    connection.execute('INSERT INTO Cards (Question, Answer) VALUES (?, ?)', ('Вопрос', 'Ответ'))
+                    connection.execute('COMMIT')
+                except Exception:
+                    connection.execute('ROLLBACK')
+                    raise
+
+            body = retry_on_busy(transaction_body, atomic=False, delay=0.002) if retry else transaction_body
+            writes = 0
+            while not stop.is_set():
+                try:
+                    body()
+                    writes += 1
+                except sqlite3.OperationalError as error:
+                    if not is_busy(error):
+                        raise
+                    with lock:
+                        result['errors'] += 1
+                number += 1
+            connection.close()
+            with lock:
+                result['writes'] += writes
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(number,)) for number in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(result['latencies']) or [0]
+        result['p50'] = statistics.median(latencies)
+        result['p99'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return result
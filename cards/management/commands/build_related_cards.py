@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from cards import related
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие карточки (по общим тегам и категории) для страницы карточки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Только новые карточки (похожие еще не посчитаны), карточки из --card '
+                                 'и карточки с общими с ними тегами')
+        parser.add_argument('--card', type=int, action='append', dest='cards', help='id карточки (можно несколько)')
+        parser.add_argument('--top-k', type=int, default=related.TOP_K, help='Сколько похожих хранить на карточку')
+        parser.add_argument('--chunk-size', type=int, default=related.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        card_ids = options['cards']
+        if options['incremental']:
+            # Новая или измененная карточка меняет и соседей карточек с теми же тегами
+            card_ids = related.affected_card_ids((card_ids or []) + list(related.stale_card_ids()))
+        processed = related.build(card_ids, top_k=options['top_k'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обработано карточек: {processed}'))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from cards import exporters, search
+from cards.models import Card
+
+
+class Command(BaseCommand):
+    help = 'Выгружает карточки в CSV, JSONL или TSV для Anki (фильтры как в каталоге)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(exporters.FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='Файл для выгрузки, по умолчанию - stdout')
+        parser.add_argument('--search', default='', help='Поисковый запрос')
+        parser.add_argument('--category', type=int, help='id категории')
+        parser.add_argument('--tag', type=int, help='id тега')
+        parser.add_argument('--gzip', action='store_true', help='Сжать выгрузку в gzip')
+        parser.add_argument('--chunk-size', type=int, default=exporters.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = search.filter_cards(Card.objects.all(), search_query=options['search'],
+                                       category=options['category'], tag=options['tag'], ranked=False)
+        content = exporters.iter_export(queryset, options['format'], chunk_size=options['chunk_size'])
+        if options['gzip']:
+            content = exporters.gzip_stream(content)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in content:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
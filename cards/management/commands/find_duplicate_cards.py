@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from cards import duplicates
+from cards.models import Card
+
+
+class Command(BaseCommand):
+    help = 'Находит группы карточек с почти одинаковыми вопросами (MinHash + LSH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Сначала перестроить корзины LSH всех карточек')
+        parser.add_argument('--threshold', type=float, default=duplicates.THRESHOLD,
+                            help='Минимальное сходство вопросов (0..1)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = duplicates.rebuild_index()
+            self.stdout.write(f'Проиндексировано карточек: {count}')
+        clusters = duplicates.find_clusters(threshold=options['threshold'])
+        ids = [pk for cluster in clusters for pk in cluster]
+        questions = {}
+        for start in range(0, len(ids), 500):
+            questions.update(Card.objects.filter(pk__in=ids[start:start + 500]).values_list('id', 'question'))
+        for number, cluster in enumerate(clusters, 1):
+            self.stdout.write(f'Группа {number} ({len(cluster)} карточек):')
+            for pk in cluster:
+                self.stdout.write(f'  {pk}: {questions.get(pk, "")}')
+        self.stdout.write(self.style.SUCCESS(f'Найдено групп дублей: {len(clusters)}'))
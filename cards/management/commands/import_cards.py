@@ -0,0 +1,42 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from cards.importers import FORMATS, READERS, CardImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Потоковый импорт карточек из CSV, JSONL или текстового экспорта Anki'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу (можно .gz)')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла, по умолчанию - по расширению')
+        parser.add_argument('--category', default='', help='Категория для строк без категории')
+        parser.add_argument('--author', help='Имя пользователя - автора карточек')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Сколько карточек вставлять за раз')
+        parser.add_argument('--encoding', default='utf-8')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path.removesuffix('.gz'))
+
+        author = None
+        if options['author']:
+            try:
+                author = get_user_model().objects.get(username=options['author'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Пользователь {options["author"]} не найден')
+
+        def progress(imported, skipped, elapsed):
+            rate = imported / elapsed if elapsed else 0
+            self.stdout.write(f'Импортировано {imported}, пропущено {skipped}, {rate:.0f} карточек/с')
+
+        importer = CardImporter(chunk_size=options['chunk_size'], author=author,
+                                default_category=options['category'], progress=progress)
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding=options['encoding'], newline='') as lines:
+            importer.run(READERS[file_format](lines))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: импортировано {importer.imported}, пропущено {importer.skipped}'))
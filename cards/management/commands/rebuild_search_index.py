@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cards import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс карточек (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Полнотекстовый индекс поддерживается только на SQLite'))
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано карточек: {count}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from cards import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики карточек в кеше (всего, по категориям, по тегам, по статусу)'
+
+    def handle(self, *args, **options):
+        drift = counters.reconcile()
+        for key, (cached, actual) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {cached} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {len(drift)}'))
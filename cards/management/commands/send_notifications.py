@@ -0,0 +1,37 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from anki.settings import TELEGRAM_BOT_TOKEN, YOUR_PERSONAL_CHAT_ID
+from cards.notifications import adrain_outbox
+from cards.telegram_bot import AsyncTelegramNotifier
+
+
+class Command(BaseCommand):
+    help = 'Отправляет уведомления из очереди NotificationOutbox в Telegram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Отправить то, что есть, и завершиться')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между проверками очереди, с')
+        parser.add_argument('--batch-size', type=int, default=50, help='Сколько уведомлений объединять в дайджест')
+
+    def handle(self, *args, **options):
+        if not TELEGRAM_BOT_TOKEN or not YOUR_PERSONAL_CHAT_ID:
+            raise CommandError('Не заданы TELEGRAM_BOT_TOKEN и YOUR_PERSONAL_CHAT_ID')
+        try:
+            # Один цикл событий на все время работы: бот и запросы к БД не блокируют друг друга
+            asyncio.run(self.run(options))
+        except KeyboardInterrupt:
+            pass
+
+    async def run(self, options):
+        async with AsyncTelegramNotifier(TELEGRAM_BOT_TOKEN, YOUR_PERSONAL_CHAT_ID) as notifier:
+            while True:
+                sent = await adrain_outbox(notifier, batch_size=options['batch_size'])
+                if sent:
+                    self.stdout.write(f'Отправлено уведомлений: {sent}')
+                    # Возможно, в очереди осталось еще - забираем сразу
+                    continue
+                if options['once']:
+                    break
+                await asyncio.sleep(options['interval'])
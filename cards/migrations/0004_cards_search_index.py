@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс доступен только на SQLite (FTS5)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS CardsSearch USING fts5("
+        "question, answer, tags, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO CardsSearch (rowid, question, answer, tags) "
+        "SELECT c.CardId, c.Question, c.Answer, "
+        "COALESCE((SELECT group_concat(t.Name, ' ') FROM CardTags ct JOIN Tags t ON t.TagId = ct.TagId "
+        "WHERE ct.CardId = c.CardId), '') "
+        "FROM Cards c"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS CardsSearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0003_catalog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 10:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0004_cards_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(db_column='NotificationId', primary_key=True, serialize=False)),
+                ('message', models.TextField(db_column='Message', verbose_name='Сообщение')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='CreatedAt', verbose_name='Создано')),
+                ('next_attempt_at', models.DateTimeField(db_column='NextAttemptAt', default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('attempts', models.PositiveIntegerField(db_column='Attempts', default=0, verbose_name='Попытки')),
+                ('last_error', models.TextField(blank=True, db_column='LastError', default='', verbose_name='Последняя ошибка')),
+                ('sent_at', models.DateTimeField(blank=True, db_column='SentAt', null=True, verbose_name='Отправлено')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'db_table': 'NotificationOutbox',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['sent_at', 'next_attempt_at'], name='outbox_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def normalize(name):
+    return ' '.join(name.split()).lower()
+
+
+def normalize_tag_names(apps, schema_editor):
+    """
+    Приводит имена тегов к нижнему регистру и сливает теги, отличавшиеся только регистром
+    """
+    Tag = apps.get_model('cards', 'Tag')
+    CardTag = apps.get_model('cards', 'CardTag')
+
+    groups = {}
+    for tag in Tag.objects.order_by('id'):
+        groups.setdefault(normalize(tag.name), []).append(tag)
+
+    for name, (keeper, *duplicates) in groups.items():
+        for duplicate in duplicates:
+            # Карточки, у которых уже есть основной тег, просто теряют дубль
+            keeper_cards = CardTag.objects.filter(tag=keeper).values('card_id')
+            CardTag.objects.filter(tag=duplicate, card_id__in=keeper_cards).delete()
+            CardTag.objects.filter(tag=duplicate).update(tag=keeper)
+            duplicate.delete()
+        if keeper.name != name:
+            keeper.name = name
+            keeper.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0005_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_tag_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 10:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cards', '0006_normalize_tag_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewState',
+            fields=[
+                ('id', models.AutoField(db_column='ReviewStateId', primary_key=True, serialize=False)),
+                ('interval', models.PositiveIntegerField(db_column='Interval', default=0, verbose_name='Интервал, дней')),
+                ('ease', models.FloatField(db_column='Ease', default=2.5, verbose_name='Легкость')),
+                ('repetitions', models.PositiveIntegerField(db_column='Repetitions', default=0, verbose_name='Успешных повторений подряд')),
+                ('lapses', models.PositiveIntegerField(db_column='Lapses', default=0, verbose_name='Забываний')),
+                ('due', models.DateTimeField(db_column='Due', verbose_name='Следующее повторение')),
+                ('last_reviewed', models.DateTimeField(blank=True, db_column='LastReviewed', null=True, verbose_name='Последнее повторение')),
+                ('card', models.ForeignKey(db_column='CardId', on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='cards.card', verbose_name='Карточка')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Состояние изучения',
+                'verbose_name_plural': 'Состояния изучения',
+                'db_table': 'ReviewStates',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reviewstate',
+            index=models.Index(fields=['user', 'due'], name='review_user_due_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewstate',
+            unique_together={('user', 'card')},
+        ),
+    ]
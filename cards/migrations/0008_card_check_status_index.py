@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0007_review_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['check_status', 'id'], name='cards_check_status_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0008_card_check_status_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cardtag',
+            index=models.Index(fields=['tag', 'card'], name='cardtags_tag_card_idx'),
+        ),
+    ]
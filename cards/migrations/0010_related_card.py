@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0009_cardtag_tag_card_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedCard',
+            fields=[
+                ('id', models.AutoField(db_column='RelatedCardLinkId', primary_key=True, serialize=False)),
+                ('score', models.FloatField(db_column='Score', verbose_name='Сходство')),
+                ('card', models.ForeignKey(db_column='CardId', on_delete=django.db.models.deletion.CASCADE, related_name='related_cards', to='cards.card', verbose_name='Карточка')),
+                ('related', models.ForeignKey(db_column='RelatedCardId', on_delete=django.db.models.deletion.CASCADE, related_name='related_to', to='cards.card', verbose_name='Похожая карточка')),
+            ],
+            options={
+                'verbose_name': 'Похожая карточка',
+                'verbose_name_plural': 'Похожие карточки',
+                'db_table': 'RelatedCards',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='relatedcard',
+            index=models.Index(fields=['card', '-score'], name='related_card_score_idx'),
+        ),
+    ]
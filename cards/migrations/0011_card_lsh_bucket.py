@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 11:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0010_related_card'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardLshBucket',
+            fields=[
+                ('id', models.AutoField(db_column='CardLshBucketId', primary_key=True, serialize=False)),
+                ('bucket', models.BigIntegerField(db_column='Bucket', verbose_name='Корзина')),
+                ('card', models.ForeignKey(db_column='CardId', on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='cards.card', verbose_name='Карточка')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+                'db_table': 'CardLshBuckets',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cardlshbucket',
+            index=models.Index(fields=['bucket', 'card'], name='lsh_bucket_card_idx'),
+        ),
+    ]
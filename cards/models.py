@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 
 class Card(models.Model):
@@ -26,15 +27,63 @@ class Card(models.Model):
         db_table = 'Cards'  # имя таблицы в базе данных
         verbose_name = 'Карточка'  # имя модели в единственном числе
         verbose_name_plural = 'Карточки'  # имя модели во множественном числе
+        # Составные индексы для курсорной пагинации каталога (поле сортировки + id)
+        indexes = [
+            models.Index(fields=['upload_date', 'id'], name='cards_upload_date_id_idx'),
+            models.Index(fields=['views', 'id'], name='cards_views_id_idx'),
+            models.Index(fields=['adds', 'id'], name='cards_adds_id_idx'),
+            # Фильтр админки по статусу проверки с сортировкой по id
+            models.Index(fields=['check_status', 'id'], name='cards_check_status_id_idx'),
+        ]
 
     def get_absolute_url(self):
         return f'/cards/{self.id}/detail/'
 
 
+class TagManager(models.Manager):
+
+    @staticmethod
+    def normalize(name):
+        # Имена тегов храним в нижнем регистре и с одиночными пробелами,
+        # чтобы "Python", "python " и "PYTHON" были одним тегом
+        return ' '.join(name.split()).lower()
+
+    def resolve(self, names):
+        """
+        Возвращает теги для списка имен (в порядке первого упоминания, без повторов),
+        создавая недостающие. Не больше трех запросов на любое число имен
+        """
+        names = list(dict.fromkeys(name for name in map(self.normalize, names) if name))
+        if not names:
+            return []
+        found = {tag.name: tag for tag in self.filter(name__in=names)}
+        missing = [name for name in names if name not in found]
+        if missing:
+            # ignore_conflicts: тот же тег мог одновременно создать другой запрос,
+            # поэтому после вставки перечитываем теги из БД
+            self.bulk_create([self.model(name=name) for name in missing], ignore_conflicts=True)
+            found.update((tag.name, tag) for tag in self.filter(name__in=missing))
+            # bulk_create не отправляет post_save, поэтому индекс автодополнения обновляем здесь
+            from .tag_index import bump
+            bump()
+        return [found[name] for name in names]
+
+    def attach(self, card, names):
+        """
+        Добавляет карточке теги по именам одной вставкой в CardTags
+        """
+        tags = self.resolve(names)
+        if tags:
+            card.tags.add(*tags)
+        return tags
+
+
 class Tag(models.Model):
     id = models.AutoField(primary_key=True, db_column='TagId')
     name = models.CharField(max_length=100, unique=True, db_column='Name')
 
+    objects = TagManager()
+
     class Meta:
         db_table = 'Tags'
         verbose_name = 'Тег'
@@ -43,6 +92,14 @@ class Tag(models.Model):
     def __str__(self):
         return f'Тег {self.name}'
 
+    def clean(self):
+        # До проверки уникальности, чтобы "Python" считался дублем "python"
+        self.name = Tag.objects.normalize(self.name)
+
+    def save(self, *args, **kwargs):
+        self.name = Tag.objects.normalize(self.name)
+        super().save(*args, **kwargs)
+
 
 class Categories(models.Model):
     id = models.AutoField(primary_key=True, db_column='CategoryId')
@@ -68,6 +125,118 @@ class CardTag(models.Model):
         verbose_name_plural = 'Теги карточек'
 
         unique_together = ('card', 'tag')
+        indexes = [
+            # Списки карточек тега по возрастанию id (см. cards.tag_postings) читаются только из индекса
+            models.Index(fields=['tag', 'card'], name='cardtags_tag_card_idx'),
+        ]
+
+    def __str__(self):
+        return f'Тег {self.tag.name} к карточке {self.card.question}'
+
+
+class Notification(models.Model):
+    """
+    Исходящее уведомление администратору (transactional outbox).
+    Пишется в той же транзакции, что и изменение данных, а отправляет его
+    воркер send_notifications
+    """
+    id = models.AutoField(primary_key=True, db_column='NotificationId')
+    message = models.TextField(db_column='Message', verbose_name='Сообщение')
+    created_at = models.DateTimeField(auto_now_add=True, db_column='CreatedAt', verbose_name='Создано')
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_column='NextAttemptAt',
+                                           verbose_name='Следующая попытка')
+    attempts = models.PositiveIntegerField(default=0, db_column='Attempts', verbose_name='Попытки')
+    last_error = models.TextField(blank=True, default='', db_column='LastError', verbose_name='Последняя ошибка')
+    sent_at = models.DateTimeField(null=True, blank=True, db_column='SentAt', verbose_name='Отправлено')
+
+    class Meta:
+        db_table = 'NotificationOutbox'
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        # Очередь воркера: неотправленные, у которых подошло время попытки
+        indexes = [
+            models.Index(fields=['sent_at', 'next_attempt_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'Уведомление {self.message[:50]}'
+
+
+class ReviewState(models.Model):
+    """
+    Состояние изучения карточки пользователем для интервального повторения (SM-2)
+    """
+    id = models.AutoField(primary_key=True, db_column='ReviewStateId')
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='review_states',
+                             verbose_name='Пользователь')
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, db_column='CardId', related_name='review_states',
+                             verbose_name='Карточка')
+    interval = models.PositiveIntegerField(default=0, db_column='Interval', verbose_name='Интервал, дней')
+    ease = models.FloatField(default=2.5, db_column='Ease', verbose_name='Легкость')
+    repetitions = models.PositiveIntegerField(default=0, db_column='Repetitions',
+                                              verbose_name='Успешных повторений подряд')
+    lapses = models.PositiveIntegerField(default=0, db_column='Lapses', verbose_name='Забываний')
+    due = models.DateTimeField(db_column='Due', verbose_name='Следующее повторение')
+    last_reviewed = models.DateTimeField(null=True, blank=True, db_column='LastReviewed',
+                                         verbose_name='Последнее повторение')
+
+    class Meta:
+        db_table = 'ReviewStates'
+        verbose_name = 'Состояние изучения'
+        verbose_name_plural = 'Состояния изучения'
+        unique_together = ('user', 'card')
+        # Очередь повторения пользователя: WHERE user = ? AND due <= ? ORDER BY due
+        indexes = [
+            models.Index(fields=['user', 'due'], name='review_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'Изучение карточки {self.card_id} пользователем {self.user_id}'
+
+
+class RelatedCard(models.Model):
+    """
+    Похожая карточка: top-K соседей карточки по общим тегам и категории.
+    Строится командой build_related_cards (см. cards.related)
+    """
+    id = models.AutoField(primary_key=True, db_column='RelatedCardLinkId')
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, db_column='CardId', related_name='related_cards',
+                             verbose_name='Карточка')
+    related = models.ForeignKey(Card, on_delete=models.CASCADE, db_column='RelatedCardId', related_name='related_to',
+                                verbose_name='Похожая карточка')
+    score = models.FloatField(db_column='Score', verbose_name='Сходство')
+
+    class Meta:
+        db_table = 'RelatedCards'
+        verbose_name = 'Похожая карточка'
+        verbose_name_plural = 'Похожие карточки'
+        # Панель на странице карточки: WHERE card = ? ORDER BY score DESC
+        indexes = [
+            models.Index(fields=['card', '-score'], name='related_card_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'Карточка {self.related_id} похожа на {self.card_id}'
+
+
+class CardLshBucket(models.Model):
+    """
+    Корзина LSH (locality-sensitive hashing) для поиска похожих вопросов:
+    по одной строке на полосу MinHash-подписи вопроса (см. cards.duplicates)
+    """
+    id = models.AutoField(primary_key=True, db_column='CardLshBucketId')
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, db_column='CardId', related_name='lsh_buckets',
+                             verbose_name='Карточка')
+    bucket = models.BigIntegerField(db_column='Bucket', verbose_name='Корзина')
+
+    class Meta:
+        db_table = 'CardLshBuckets'
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        # Кандидаты в дубли: WHERE bucket IN (...) - читаются только из индекса
+        indexes = [
+            models.Index(fields=['bucket', 'card'], name='lsh_bucket_card_idx'),
+        ]
 
     def __str__(self):
-        return f'Тег {self.tag.name} к карточке {self.card.question}'
\ No newline at end of file
+        return f'Корзина {self.bucket} карточки {self.card_id}'
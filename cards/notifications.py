@@ -0,0 +1,104 @@
+"""
+Очередь уведомлений администратору в Telegram.
+
+Сигналы только добавляют запись в таблицу NotificationOutbox (в той же
+транзакции, что и карточка). Отправкой занимается команда send_notifications:
+она забирает накопившиеся уведомления пачкой, объединяет их в одно
+сообщение-дайджест и при ошибке откладывает повторную попытку с
+экспоненциальной задержкой.
+
+Пачка отправляется через асинхронный ORM (adrain_outbox): воркер работает
+в одном цикле событий с асинхронным ботом Telegram.
+"""
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Ограничение Telegram на длину одного сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+# Задержка перед повторной отправкой: 30 с, 1 мин, 2 мин ... но не больше часа
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+def enqueue(message):
+    """
+    Ставит уведомление в очередь
+    """
+    return Notification.objects.create(message=message)
+
+
+def retry_delay(attempts):
+    """
+    Задержка перед следующей попыткой после attempts неудачных
+    """
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def build_digest(messages):
+    """
+    Объединяет несколько уведомлений в одно сообщение
+    """
+    if len(messages) == 1:
+        text = messages[0]
+    else:
+        text = f'Новых уведомлений: {len(messages)}\n' + '\n'.join(f'• {message}' for message in messages)
+    if len(text) > MAX_MESSAGE_LENGTH:
+        text = text[:MAX_MESSAGE_LENGTH - 1] + '…'
+    return text
+
+
+def ready_notifications(now, batch_size):
+    return Notification.objects.filter(sent_at__isnull=True, next_attempt_at__lte=now).order_by('id')[:batch_size]
+
+
+def fit_digest(batch):
+    """
+    Берем в дайджест столько уведомлений, сколько помещается в одно сообщение,
+    остальные уйдут следующей пачкой
+    """
+    length = 0
+    for count, notification in enumerate(batch):
+        length += len(notification.message) + 3
+        if count and length > MAX_MESSAGE_LENGTH - 100:
+            return batch[:count]
+    return batch
+
+
+def mark_failed(batch, error, now):
+    logger.warning('Не удалось отправить уведомления %s: %s', [notification.id for notification in batch], error)
+    for notification in batch:
+        notification.attempts += 1
+        notification.last_error = str(error)[:1000]
+        notification.next_attempt_at = now + retry_delay(notification.attempts)
+
+
+FAILED_FIELDS = ['attempts', 'last_error', 'next_attempt_at']
+
+
+async def adrain_outbox(notifier, batch_size=50, now=None):
+    """
+    Отправляет одну пачку готовых к отправке уведомлений одним сообщением.
+    notifier - объект с методом async send(text), например AsyncTelegramNotifier.
+    Возвращает число отправленных уведомлений
+    """
+    now = now or timezone.now()
+    batch = fit_digest([notification async for notification in ready_notifications(now, batch_size)])
+    if not batch:
+        return 0
+    try:
+        await notifier.send(build_digest([notification.message for notification in batch]))
+    except Exception as error:
+        mark_failed(batch, error, now)
+        # bulk_update сам выполняется в транзакции
+        await Notification.objects.abulk_update(batch, FAILED_FIELDS)
+        return 0
+
+    await Notification.objects.filter(id__in=[notification.id for notification in batch]).aupdate(sent_at=now)
+    return len(batch)
@@ -0,0 +1,197 @@
+"""
+Кеш целых страниц для анонимных посетителей с ETag и Last-Modified.
+
+Все закешированные страницы зависят от одного поколения контента: записи
+карточек, тегов и категорий (см. cards.signals, импорт) меняют поколение,
+и старые страницы перестают находиться по ключу. Ключ страницы строится из
+имени представления, пути, нормализованных GET-параметров и поколения,
+ETag - хеш ключа, Last-Modified - время смены поколения. Поэтому
+условный запрос получает 304, а попадание в кеш - готовый HTML без
+обращений к ORM.
+
+Кешируются только GET/HEAD без сессионной cookie: у вошедшего пользователя
+страница другая (меню, профиль), а проверка сессии - это запрос к БД.
+PAGE_CACHE_TIMEOUT = 0 отключает кеш. Просмотры карточек пишутся через
+update() и поколение не меняют, поэтому к поколению добавляется окно
+времени длиной PAGE_CACHE_TIMEOUT: с началом нового окна меняются ключ и
+ETag, и счетчики просмотров и сортировка по ним отстают от БД не больше
+чем на PAGE_CACHE_TIMEOUT.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, urlencode
+
+from anki import metrics
+
+GENERATION_KEY = 'page_cache:generation'
+DEFAULT_TIMEOUT = 10 * 60
+
+
+def get_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def current_window():
+    """
+    Начало текущего окна времени длиной PAGE_CACHE_TIMEOUT (unix time).
+    API проверяет ETag и с отключенным кешем - тогда окно стандартной длины
+    """
+    timeout = get_timeout() or DEFAULT_TIMEOUT
+    return int(time.time()) // timeout * timeout
+
+
+def get_generation():
+    """
+    Текущее поколение (метка, время смены). Если его нет в кеше, создается новое
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, (uuid.uuid4().hex, int(time.time())), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def aget_generation():
+    """
+    То же, что get_generation, через асинхронный API кеша
+    """
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, (uuid.uuid4().hex, int(time.time())), None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def bump():
+    """
+    Меняет поколение после фиксации транзакции
+    """
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, (uuid.uuid4().hex, int(time.time())), None))
+
+
+def normalize_query(query_dict, params):
+    """
+    Строка запроса из разрешенных параметров: без пустых значений, в фиксированном порядке
+    """
+    items = []
+    for name in sorted(params):
+        for value in query_dict.getlist(name):
+            value = value.strip()
+            if value:
+                items.append((name, value))
+    return urlencode(items)
+
+
+class PageCacheMixin:
+    """
+    Кеширует ответы представления для анонимных GET-запросов.
+    page_cache_params - GET-параметры, от которых зависит страница, остальные не учитываются
+    """
+    page_cache_params = ()
+
+    def is_page_cacheable(self, request):
+        # PAGE_CACHE_TIMEOUT = 0 отключает кеш страниц
+        return (get_timeout() and request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+    def get_page_cache_key(self, request, token):
+        query = normalize_query(request.GET, self.page_cache_params)
+        raw = f'{type(self).__name__}:{request.path}:{query}:{token}'
+        return 'page_cache:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def page_cache_hit(self, request, *args, **kwargs):
+        """
+        Вызывается, когда ответ отдан из кеша или как 304 без выполнения представления
+        """
+
+    def _conditional_response(self, request, generation):
+        """
+        Ключ страницы, ETag, время изменения и ответ 304, если у клиента актуальная версия
+        """
+        token, modified = generation
+        # Просмотры поколение не меняют - страница живет не дольше окна времени
+        window = current_window()
+        key = self.get_page_cache_key(request, f'{token}:{window}')
+        modified = max(modified, window)
+        etag = f'"{key.rsplit(":", 1)[-1]}"'
+        return key, etag, modified, get_conditional_response(request, etag=etag, last_modified=modified)
+
+    @staticmethod
+    def _cached_response(cached):
+        if cached is None:
+            return None
+        return HttpResponse(cached['content'], content_type=cached['content_type'])
+
+    @staticmethod
+    def _cache_entry(response):
+        """
+        Что положить в кеш для ответа представления (None - не кешировать)
+        """
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        if response.status_code != 200:
+            return None
+        return {'content': response.content, 'content_type': response['Content-Type']}
+
+    @staticmethod
+    def _finalize(response, etag, modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        # Браузер и прокси перепроверяют страницу при каждом показе, а вошедшим нужна своя версия
+        patch_cache_control(response, max_age=0)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key, etag, modified, response = self._conditional_response(request, get_generation())
+        if response is None:
+            response = self._cached_response(cache.get(key))
+        metrics.record_cache('page', hit=response is not None)
+        if response is not None:
+            self.page_cache_hit(request, *args, **kwargs)
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+            entry = self._cache_entry(response)
+            if entry is None:
+                return response
+            cache.set(key, entry, get_timeout())
+        return self._finalize(response, etag, modified)
+
+
+class AsyncPageCacheMixin(PageCacheMixin):
+    """
+    PageCacheMixin для асинхронных представлений (все обработчики - async def)
+    """
+
+    async def page_cache_hit(self, request, *args, **kwargs):
+        pass
+
+    async def dispatch(self, request, *args, **kwargs):
+        # super(PageCacheMixin, ...) - обработчик представления в обход синхронного dispatch
+        handle = super(PageCacheMixin, self).dispatch
+        if not self.is_page_cacheable(request):
+            return await handle(request, *args, **kwargs)
+
+        key, etag, modified, response = self._conditional_response(request, await aget_generation())
+        if response is None:
+            response = self._cached_response(await cache.aget(key))
+        metrics.record_cache('page', hit=response is not None)
+        if response is not None:
+            await self.page_cache_hit(request, *args, **kwargs)
+        else:
+            response = await handle(request, *args, **kwargs)
+            entry = self._cache_entry(response)
+            if entry is None:
+                return response
+            await cache.aset(key, entry, get_timeout())
+        return self._finalize(response, etag, modified)
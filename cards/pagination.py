@@ -0,0 +1,233 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import models
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    """
+    Курсор не удалось разобрать (поврежден или подделан)
+    """
+
+
+# Целые вне диапазона INTEGER SQLite не передать параметром запроса
+MAX_INT = 2 ** 63 - 1
+
+
+def check_value(value, types):
+    # bool - подкласс int, но в курсоре его быть не может
+    return isinstance(value, types) and not isinstance(value, bool) and (
+        not isinstance(value, int) or -MAX_INT <= value <= MAX_INT)
+
+
+def encode_cursor(values, direction):
+    """
+    Упаковывает значения ключа сортировки в непрозрачную строку для URL
+    """
+    payload = [direction] + [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Распаковывает курсор, возвращает (direction, values)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(payload, list) or len(payload) < 2 or payload[0] not in ('next', 'prev'):
+        raise InvalidCursor(cursor)
+    return payload[0], payload[1:]
+
+
+class CursorPage:
+    """
+    Страница курсорной пагинации. Повторяет ту часть интерфейса Page,
+    которой пользуются шаблоны (has_next, has_previous, has_other_pages)
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорная (keyset) пагинация по полю сортировки и id как уточняющему ключу.
+
+    Вместо OFFSET и COUNT(*) следующая страница выбирается условием
+    (field, id) > (значение, id) последней записи, поэтому стоимость страницы
+    не зависит от того, насколько глубоко ушел пользователь.
+    """
+
+    def __init__(self, per_page, field, descending=True, datetime_fields=()):
+        self.per_page = per_page
+        self.field = field
+        self.descending = descending
+        self.datetime_fields = datetime_fields
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.field], obj['id']
+        return getattr(obj, self.field), obj.pk
+
+    def _value_types(self, model):
+        """
+        Допустимые типы значения поля сортировки в курсоре
+        """
+        try:
+            field = model._meta.get_field(self.field)
+        except FieldDoesNotExist:
+            # Аннотация: search_rank - релевантность полнотекстового поиска
+            return int, float
+        if isinstance(field, models.IntegerField):
+            return (int,)
+        if isinstance(field, (models.FloatField, models.DecimalField)):
+            return int, float
+        return (str,)
+
+    def _parse_values(self, values, model):
+        if len(values) != 2:
+            raise InvalidCursor(values)
+        value, pk = values
+        if not check_value(pk, int):
+            raise InvalidCursor(values)
+        if self.field in self.datetime_fields:
+            try:
+                return datetime.fromisoformat(value), pk
+            except (TypeError, ValueError):
+                raise InvalidCursor(values)
+        if not check_value(value, self._value_types(model)):
+            raise InvalidCursor(values)
+        return value, pk
+
+    def _seek(self, value, pk, forward):
+        # Для убывающей сортировки "вперед" означает меньшие значения
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return (Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': pk}))
+
+    def _ordering(self, forward):
+        prefix = '-' if forward == self.descending else ''
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def _prepare(self, queryset, cursor):
+        # Запрос страницы (per_page + 1 записей) и направление движения
+        direction = 'next'
+        if cursor:
+            direction, values = decode_cursor(cursor)
+            value, pk = self._parse_values(values, queryset.model)
+            queryset = queryset.filter(self._seek(value, pk, forward=direction == 'next'))
+        forward = direction == 'next'
+        return queryset.order_by(*self._ordering(forward))[:self.per_page + 1], forward
+
+    def _make_page(self, rows, forward, cursor):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows, None, None)
+
+        # Есть ли еще записи в направлении движения, и есть ли куда вернуться
+        has_next = has_more if forward else True
+        has_previous = bool(cursor) if forward else has_more
+
+        next_cursor = encode_cursor(self._key(rows[-1]), 'next') if has_next else None
+        previous_cursor = encode_cursor(self._key(rows[0]), 'prev') if has_previous else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Возвращает CursorPage для переданного курсора (None - первая страница).
+        Выполняет один запрос на per_page + 1 записей
+        """
+        queryset, forward = self._prepare(queryset, cursor)
+        return self._make_page(list(queryset), forward, cursor)
+
+    async def apaginate(self, queryset, cursor=None):
+        """
+        То же, что paginate, через асинхронный ORM
+        """
+        queryset, forward = self._prepare(queryset, cursor)
+        return self._make_page([row async for row in queryset], forward, cursor)
+
+
+class IdListPaginator:
+    """
+    Курсорная пагинация по готовому списку id, отсортированному по возрастанию.
+    Страницы идут от новых карточек к старым (по убыванию id), курсор - id
+    крайней карточки, позиция находится двоичным поиском
+    """
+
+    def __init__(self, per_page):
+        self.per_page = per_page
+
+    def paginate(self, ids, cursor=None):
+        """
+        Возвращает CursorPage со списком id страницы
+        """
+        direction = 'next'
+        if cursor:
+            direction, values = decode_cursor(cursor)
+            if len(values) != 1 or not isinstance(values[0], int):
+                raise InvalidCursor(cursor)
+
+        if direction == 'next':
+            end = bisect_left(ids, values[0]) if cursor else len(ids)
+            start = max(0, end - self.per_page)
+            has_next, has_previous = start > 0, bool(cursor)
+        else:
+            start = bisect_right(ids, values[0])
+            end = start + self.per_page
+            has_next, has_previous = True, end < len(ids)
+        page_ids = list(reversed(ids[start:end]))
+
+        if not page_ids:
+            return CursorPage(page_ids, None, None)
+        next_cursor = encode_cursor([page_ids[-1]], 'next') if has_next else None
+        previous_cursor = encode_cursor([page_ids[0]], 'prev') if has_previous else None
+        return CursorPage(page_ids, next_cursor, previous_cursor)
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator для больших таблиц (админка): без фильтров число берется из
+    счетчика в кеше (count_without_filters), с фильтрами считается не дальше
+    max_count строк, т.е. COUNT(*) по подзапросу с LIMIT
+    """
+    max_count = 10000
+    count_without_filters = None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if self.count_without_filters is not None and not queryset.query.where:
+            return self.count_without_filters()
+        return queryset.order_by()[:self.max_count].count()
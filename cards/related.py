@@ -0,0 +1,163 @@
+"""
+Похожие карточки по общим тегам и категории.
+
+Сходство двух карточек - коэффициент Жаккара по их тегам
+(общие теги / все теги обеих карточек) плюс CATEGORY_BONUS, если
+категория совпадает. Соседи считаются без self-join: для карточки
+перебираются списки карточек ее тегов (cards.tag_postings), и число
+общих тегов каждой карточки-кандидата накапливается в Counter - это то же
+умножение разреженной матрицы карточки x теги на транспонированную, только
+по строкам. Для каждой карточки сохраняются top-K соседей в таблицу
+RelatedCards, и страница карточки читает их одним запросом по индексу.
+
+Популярные теги (больше MAX_TAG_CARDS карточек) дают кандидатов только из
+своих последних MAX_TAG_CARDS карточек, иначе каждая карточка сравнивалась бы
+с половиной каталога. Общий популярный тег при этом все равно учитывается
+в сходстве: принадлежность кандидата к тегу проверяется по множеству.
+"""
+import heapq
+import logging
+from collections import Counter
+from itertools import islice
+
+from django.db.models import Count
+
+from anki.sqlite_setup import retry_on_busy
+from . import page_cache, tag_postings
+from .models import Card, CardTag, RelatedCard
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+MAX_TAG_CARDS = 200
+CATEGORY_BONUS = 0.2
+CHUNK_SIZE = 500
+# Сколько похожих карточек показывать на странице карточки
+SHOWN = 5
+
+
+def load_profiles():
+    """
+    {id карточки: (число тегов, id категории)} для всех карточек
+    """
+    tag_counts = dict(CardTag.objects.values('card_id').annotate(count=Count('id')).values_list('card_id', 'count'))
+    return {pk: (tag_counts.get(pk, 0), category_id)
+            for pk, category_id in Card.objects.values_list('id', 'category_id').iterator(chunk_size=10000)}
+
+
+def find_neighbours(card_id, tag_ids, postings, profiles, top_k=TOP_K, max_tag_cards=MAX_TAG_CARDS,
+                    tag_sets=None):
+    """
+    [(сходство, id карточки)] - top_k самых похожих карточек по убыванию сходства.
+    tag_sets - кеш множеств карточек популярных тегов между вызовами
+    """
+    if not tag_ids or card_id not in profiles:
+        return []
+    tag_sets = {} if tag_sets is None else tag_sets
+    overlap = Counter()
+    popular = []
+    for tag_id in tag_ids:
+        ids = postings[tag_id]
+        if len(ids) <= max_tag_cards:
+            overlap.update(ids)
+        else:
+            # Кандидаты только из последних карточек тега, остальным общий тег досчитаем ниже
+            overlap.update(ids[-max_tag_cards:])
+            if tag_id not in tag_sets:
+                tag_sets[tag_id] = set(ids)
+            popular.append((ids[-max_tag_cards], tag_sets[tag_id]))
+    for window_start, members in popular:
+        for candidate in overlap:
+            if candidate < window_start and candidate in members:
+                overlap[candidate] += 1
+    overlap.pop(card_id, None)
+
+    size, category_id = len(tag_ids), profiles[card_id][1]
+    scored = []
+    for candidate, common in overlap.items():
+        candidate_profile = profiles.get(candidate)
+        if candidate_profile is None:
+            continue
+        score = common / (size + candidate_profile[0] - common)
+        if candidate_profile[1] == category_id:
+            score += CATEGORY_BONUS
+        scored.append((score, candidate))
+    # При равном сходстве выше новые карточки
+    return [(round(score, 6), candidate) for score, candidate in heapq.nlargest(top_k, scored)]
+
+
+@retry_on_busy
+def _replace(card_ids, links):
+    RelatedCard.objects.filter(card_id__in=card_ids).delete()
+    RelatedCard.objects.bulk_create(links)
+
+
+def build(card_ids=None, top_k=TOP_K, chunk_size=CHUNK_SIZE, max_tag_cards=MAX_TAG_CARDS):
+    """
+    Пересчитывает похожие карточки для card_ids (None - для всех карточек),
+    возвращает число обработанных карточек
+    """
+    profiles = load_profiles()
+    card_ids = sorted(profiles) if card_ids is None else sorted(set(card_ids) & profiles.keys())
+    iterator = iter(card_ids)
+    tag_sets = {}
+    processed = 0
+    while chunk := list(islice(iterator, chunk_size)):
+        card_tags = {pk: [] for pk in chunk}
+        for card_id, tag_id in CardTag.objects.filter(card_id__in=chunk).values_list('card_id', 'tag_id'):
+            card_tags[card_id].append(tag_id)
+        postings = tag_postings.get_postings({tag_id for tag_ids in card_tags.values() for tag_id in tag_ids})
+
+        links = []
+        for card_id, tag_ids in card_tags.items():
+            for score, related_id in find_neighbours(card_id, tag_ids, postings, profiles, top_k, max_tag_cards,
+                                                     tag_sets):
+                links.append(RelatedCard(card_id=card_id, related_id=related_id, score=score))
+        _replace(chunk, links)
+        processed += len(chunk)
+        logger.info('Похожие карточки: обработано %s из %s', processed, len(card_ids))
+    if processed:
+        page_cache.bump()
+    return processed
+
+
+def stale_card_ids():
+    """
+    Карточки с тегами, для которых похожие еще не посчитаны (например, добавленные после build)
+    """
+    return (Card.objects.filter(cardtag__isnull=False, related_cards__isnull=True)
+            .values_list('id', flat=True).distinct())
+
+
+def affected_card_ids(card_ids, max_tag_cards=MAX_TAG_CARDS):
+    """
+    card_ids и карточки с общими с ними тегами: измененная карточка может
+    войти в их top-K соседей или выпасть из него, поэтому пересчитывать нужно и их.
+    У популярных тегов берутся только последние max_tag_cards карточек, как и
+    кандидаты в find_neighbours, - иначе один такой тег превращал бы
+    инкрементальный пересчет в полный. Остальные обновятся при полном build
+    """
+    affected = set(card_ids)
+    tag_ids = set()
+    iterator = iter(sorted(affected))
+    while chunk := list(islice(iterator, CHUNK_SIZE)):
+        tag_ids.update(CardTag.objects.filter(card_id__in=chunk).values_list('tag_id', flat=True))
+    for ids in tag_postings.get_postings(tag_ids).values():
+        affected.update(ids[-max_tag_cards:])
+    return affected
+
+
+def _related_queryset(card, limit):
+    return (Card.objects.filter(related_to__card=card).select_related('category')
+            .only('id', 'question', 'category__name').order_by('-related_to__score', '-id')[:limit])
+
+
+def get_related(card, limit=SHOWN):
+    """
+    Похожие карточки для страницы карточки - один запрос по индексу (card, -score)
+    """
+    return list(_related_queryset(card, limit))
+
+
+async def aget_related(card, limit=SHOWN):
+    return [related async for related in _related_queryset(card, limit).aiterator()]
@@ -0,0 +1,114 @@
+"""
+Планировщик интервального повторения по алгоритму SM-2.
+
+Оценка ответа (grade) от 0 до 5: меньше 3 - карточка забыта и
+возвращается на повторение через RELEARN_DELAY, иначе интервал растет
+(1 день, 6 дней, дальше умножается на коэффициент легкости).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from anki.sqlite_setup import retry_on_busy
+
+from .models import Card, ReviewState
+from .search import MAX_ID
+
+MIN_EASE = 1.3
+RELEARN_DELAY = timedelta(minutes=10)
+MAX_GRADE = 5
+PASSING_GRADE = 3
+
+# Ограничения на размер очереди и пачки оценок за один запрос
+MAX_DUE_LIMIT = 200
+MAX_REVIEWS_PER_SUBMIT = 500
+
+
+def schedule(state, grade, now):
+    """
+    Применяет оценку к состоянию (меняет его на месте) и возвращает его
+    """
+    if grade < PASSING_GRADE:
+        if state.repetitions:
+            state.lapses += 1
+        state.repetitions = 0
+        state.interval = 0
+        state.due = now + RELEARN_DELAY
+    else:
+        state.repetitions += 1
+        if state.repetitions == 1:
+            state.interval = 1
+        elif state.repetitions == 2:
+            state.interval = 6
+        else:
+            state.interval = round(state.interval * state.ease)
+        state.due = now + timedelta(days=state.interval)
+    state.ease = max(MIN_EASE, state.ease + 0.1 - (MAX_GRADE - grade) * (0.08 + (MAX_GRADE - grade) * 0.02))
+    state.last_reviewed = now
+    return state
+
+
+def due_cards(user, limit, new_limit=0, now=None):
+    """
+    Карточки к повторению: сначала те, у которых подошел срок (по индексу (user, due)),
+    затем до new_limit еще не изученных. Возвращает список (card, state или None)
+    """
+    now = now or timezone.now()
+    limit = min(limit, MAX_DUE_LIMIT)
+    states = list(ReviewState.objects.filter(user=user, due__lte=now).order_by('due')
+                  .select_related('card')[:limit])
+    result = [(state.card, state) for state in states]
+
+    new_limit = min(new_limit, limit - len(result))
+    if new_limit > 0:
+        new_cards = Card.objects.exclude(review_states__user=user).order_by('id')[:new_limit]
+        result.extend((card, None) for card in new_cards)
+    return result
+
+
+class InvalidReview(ValueError):
+    """
+    Оценка ссылается на несуществующую карточку или вне диапазона 0..5
+    """
+
+
+def submit_reviews(user, reviews, now=None):
+    """
+    Применяет пачку оценок [(card_id, grade), ...] фиксированным числом запросов:
+    выборка состояний, проверка новых карточек, bulk_update и bulk_create
+    в одной транзакции (повторяется, если SQLite занят).
+    Возвращает список обновленных состояний
+    """
+    now = now or timezone.now()
+    if len(reviews) > MAX_REVIEWS_PER_SUBMIT:
+        raise InvalidReview(f'Не больше {MAX_REVIEWS_PER_SUBMIT} оценок за раз')
+    for card_id, grade in reviews:
+        # bool - подкласс int, а id вне INTEGER SQLite не передать в запрос
+        if not isinstance(card_id, int) or isinstance(card_id, bool) or not 1 <= card_id <= MAX_ID:
+            raise InvalidReview(f'Недопустимый id карточки {card_id!r}')
+        if not isinstance(grade, int) or isinstance(grade, bool) or not 0 <= grade <= MAX_GRADE:
+            raise InvalidReview(f'Недопустимая оценка {grade!r} для карточки {card_id}')
+
+    return _apply_reviews(user, reviews, now)
+
+
+@retry_on_busy
+def _apply_reviews(user, reviews, now):
+    card_ids = {card_id for card_id, _ in reviews}
+    states = {state.card_id: state for state in ReviewState.objects.filter(user=user, card_id__in=card_ids)}
+    new_ids = card_ids - states.keys()
+    if new_ids:
+        existing = set(Card.objects.filter(id__in=new_ids).values_list('id', flat=True))
+        if existing != new_ids:
+            raise InvalidReview(f'Карточки не найдены: {sorted(new_ids - existing)}')
+    created = {card_id: ReviewState(user=user, card_id=card_id, due=now) for card_id in new_ids}
+
+    for card_id, grade in reviews:
+        schedule(states.get(card_id) or created[card_id], grade, now)
+
+    fields = ['interval', 'ease', 'repetitions', 'lapses', 'due', 'last_reviewed']
+    if states:
+        ReviewState.objects.bulk_update(states.values(), fields, batch_size=MAX_REVIEWS_PER_SUBMIT)
+    if created:
+        ReviewState.objects.bulk_create(created.values(), batch_size=MAX_REVIEWS_PER_SUBMIT)
+    return list(states.values()) + list(created.values())
@@ -0,0 +1,192 @@
+"""
+Полнотекстовый поиск карточек на SQLite FTS5.
+
+Индекс - виртуальная таблица CardsSearch (rowid = id карточки) с колонками
+question, answer и tags (имена тегов через пробел). Таблица создается
+миграцией 0004_cards_search_index и поддерживается сигналами из cards.signals.
+На других СУБД функции индексации ничего не делают, а каталог использует
+обычный поиск через icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_TABLE = 'CardsSearch'
+
+# Маркеры начала и конца совпадения в сниппете, заменяются на <mark> после экранирования
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+# Веса колонок для bm25: совпадение в вопросе важнее совпадения в тегах и ответе
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Пачка id для IN (...), чтобы не упереться в лимит параметров SQLite
+CHUNK_SIZE = 500
+# Больше не помещается в INTEGER SQLite - такой id из запроса дал бы OverflowError
+MAX_ID = 2 ** 63 - 1
+
+_INDEX_SELECT = f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, question, answer, tags)
+    SELECT c.CardId, c.Question, c.Answer,
+           COALESCE((SELECT group_concat(t.Name, ' ')
+                     FROM CardTags ct JOIN Tags t ON t.TagId = ct.TagId
+                     WHERE ct.CardId = c.CardId), '')
+    FROM Cards c
+'''
+
+
+def is_available():
+    """
+    Индекс есть только на SQLite
+    """
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Превращает пользовательский ввод в безопасное выражение MATCH:
+    каждое слово берется в кавычки и ищется по префиксу. Пустая строка
+    означает, что искать нечего
+    """
+    tokens = re.findall(r'\w+', text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def index_cards(card_ids):
+    """
+    Переиндексирует карточки с указанными id (удаленные просто пропадут из индекса)
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(card_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(f'{_INDEX_SELECT} WHERE c.CardId IN ({placeholders})', chunk)
+
+
+def remove_cards(card_ids):
+    """
+    Удаляет карточки из индекса
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(card_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', chunk)
+
+
+def rebuild():
+    """
+    Полностью перестраивает индекс, возвращает число проиндексированных карточек
+    """
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(_INDEX_SELECT)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search(queryset, text, ranked=True):
+    """
+    Оставляет в queryset карточки, найденные по тексту, и добавляет аннотацию
+    search_rank - релевантность (чем больше, тем лучше). Сниппеты для
+    найденных карточек страницы отдельно дает snippets.
+    С ranked=False только фильтрует, без аннотаций.
+    Стоимость зависит от числа совпадений, а не от размера таблицы
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    queryset = queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', (match,)),
+    )
+    if not ranked:
+        return queryset
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    # bm25 возвращает отрицательные значения, лучшим совпадениям - меньшие
+    return queryset.annotate(search_rank=_match_value(f'-bm25({SEARCH_TABLE}, {weights})', match))
+
+
+def snippets(queryset, card_ids, text):
+    """
+    Запрос (id, сниппет) для карточек card_ids - фрагменты текста с отмеченными
+    совпадениями. snippet дорогой, поэтому считается только для карточек страницы,
+    а не для всех совпадений
+    """
+    expression = f"snippet({SEARCH_TABLE}, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16)"
+    return queryset.filter(id__in=card_ids).annotate(
+        search_snippet=_match_value(expression, build_match_query(text), card_ids),
+    ).values_list('id', 'search_snippet')
+
+
+def _match_value(expression, match, card_ids=()):
+    """
+    Значение expression (bm25, snippet) для текущей карточки.
+    Коррелированный подзапрос с MATCH заново искал бы по индексу для каждой строки,
+    поэтому совпадения (только card_ids, если заданы) один раз материализуются
+    в CTE и ищутся в нем по id
+    """
+    only_ids = f' AND rowid IN ({", ".join(["%s"] * len(card_ids))})' if card_ids else ''
+    return RawSQL(
+        f'WITH matches AS MATERIALIZED (SELECT rowid AS id, {expression} AS value '
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{only_ids}) '
+        f'SELECT value FROM matches WHERE id = "Cards"."CardId"',
+        (match, *card_ids),
+    )
+
+
+def filter_cards(queryset, search_query='', category=None, tag=None, ranked=True):
+    """
+    Фильтры каталога: поиск по тексту, категория и тег (id).
+    На SQLite поиск идет через индекс FTS5, на других СУБД - через icontains
+    """
+    if category:
+        queryset = queryset.filter(category_id=category)
+    if tag:
+        queryset = queryset.filter(tags__id=tag)
+    search_query = search_query.strip()
+    if search_query and is_available():
+        queryset = search(queryset, search_query, ranked=ranked)
+    elif search_query:
+        queryset = queryset.filter(
+            Q(question__icontains=search_query) |
+            Q(answer__icontains=search_query) |
+            Q(tags__name__icontains=search_query)
+        ).distinct()
+    return queryset
+
+
+def parse_id(value):
+    """
+    id из GET-параметра или None, если параметр пустой, не число или вне 1..MAX_ID
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 1 <= value <= MAX_ID else None
+
+
+def highlight(snippet):
+    """
+    Экранирует сниппет и заменяет маркеры совпадений на <mark>
+    """
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+    return mark_safe(html)
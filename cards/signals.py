@@ -1,15 +1,206 @@
-from django.db.models.signals import post_save
+from collections import defaultdict
+
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-import asyncio
 
-from anki.settings import TELEGRAM_BOT_TOKEN, YOUR_PERSONAL_CHAT_ID
-from .models import Card
-from .telegram_bot import send_telegram_message
-import os
+from . import counters, duplicates, fragment_cache, notifications, page_cache, search, tag_index, tag_postings
+from .models import Card, CardTag, Categories, Tag
 
 
 @receiver(post_save, sender=Card)
 def notify_admin(sender, instance, created, **kwargs):
+    # Уведомление только ставится в очередь, отправит его команда send_notifications
     if created:
-        message = f'Новая карточка: {instance.question} была добавлена.'
-        asyncio.run(send_telegram_message(TELEGRAM_BOT_TOKEN, YOUR_PERSONAL_CHAT_ID, message))
\ No newline at end of file
+        notifications.enqueue(f'Новая карточка: {instance.question} была добавлена.')
+
+
+# Синхронизация полнотекстового индекса (см. cards.search)
+
+@receiver(post_save, sender=Card)
+def index_card(sender, instance, **kwargs):
+    search.index_cards([instance.pk])
+
+
+@receiver(post_delete, sender=Card)
+def unindex_card(sender, instance, **kwargs):
+    search.remove_cards([instance.pk])
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def index_card_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # add() вставляет CardTag через bulk_create без post_save, поэтому ловим post_add.
+    # remove() и clear() удаляют строки с post_delete - их обработает reindex_card_tag
+    if action != 'post_add' or not pk_set:
+        return
+    search.index_cards(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=CardTag)
+@receiver(post_delete, sender=CardTag)
+def reindex_card_tag(sender, instance, **kwargs):
+    search.index_cards([instance.card_id])
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_cards(sender, instance, created, **kwargs):
+    # При переименовании тега обновляем все его карточки
+    if not created:
+        search.index_cards(CardTag.objects.filter(tag=instance).values_list('card_id', flat=True))
+
+
+# Счетчики карточек (см. cards.counters)
+
+def _counted_state(instance):
+    # Читаем из __dict__, чтобы не подгружать отложенные поля
+    return instance.__dict__.get('category_id'), instance.__dict__.get('check_status')
+
+
+@receiver(post_init, sender=Card)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._counted_state = _counted_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Card)
+def count_card(sender, instance, created, **kwargs):
+    category_id, check_status = _counted_state(instance)
+    deltas = defaultdict(int)
+    if created:
+        deltas[counters.TOTAL_KEY] += 1
+    elif instance._counted_state is None:
+        # Прежнее состояние неизвестно - расхождение исправит reconcile_card_counters
+        return
+    else:
+        old_category_id, old_check_status = instance._counted_state
+        deltas[counters.category_key(old_category_id)] -= 1
+        deltas[counters.status_key(old_check_status)] -= 1
+    deltas[counters.category_key(category_id)] += 1
+    deltas[counters.status_key(check_status)] += 1
+    counters.adjust(deltas)
+    instance._counted_state = (category_id, check_status)
+
+
+@receiver(post_delete, sender=Card)
+def uncount_card(sender, instance, **kwargs):
+    category_id, check_status = _counted_state(instance)
+    counters.adjust({
+        counters.TOTAL_KEY: -1,
+        counters.category_key(category_id): -1,
+        counters.status_key(check_status): -1,
+    })
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def count_card_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # Как и для поиска: удаление связей приходит через post_delete CardTag
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        counters.adjust({counters.tag_key(instance.pk): len(pk_set)})
+    else:
+        counters.adjust({counters.tag_key(tag_id): 1 for tag_id in pk_set})
+
+
+@receiver(post_save, sender=CardTag)
+def count_card_tag(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust({counters.tag_key(instance.tag_id): 1})
+
+
+@receiver(post_delete, sender=CardTag)
+def uncount_card_tag(sender, instance, **kwargs):
+    counters.adjust({counters.tag_key(instance.tag_id): -1})
+
+
+@receiver(post_delete, sender=Tag)
+def forget_tag_count(sender, instance, **kwargs):
+    counters.forget([counters.tag_key(instance.pk)])
+
+
+@receiver(post_delete, sender=Categories)
+def forget_category_count(sender, instance, **kwargs):
+    counters.forget([counters.category_key(instance.pk)])
+
+
+# Версии кеша превью карточек (см. cards.fragment_cache).
+# Переименование категории отдельно не обрабатывается: имя категории входит в ключ фрагмента
+
+@receiver(post_save, sender=Card)
+def bump_card_preview(sender, instance, **kwargs):
+    fragment_cache.bump([instance.pk])
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def bump_card_tags_preview(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    fragment_cache.bump(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=CardTag)
+@receiver(post_delete, sender=CardTag)
+def bump_card_tag_preview(sender, instance, **kwargs):
+    fragment_cache.bump([instance.card_id])
+
+
+@receiver(post_save, sender=Tag)
+def bump_tag_cards_preview(sender, instance, created, **kwargs):
+    if not created:
+        fragment_cache.bump(CardTag.objects.filter(tag=instance).values_list('card_id', flat=True))
+
+
+# Поколение кеша страниц (см. cards.page_cache): любая запись контента делает страницы устаревшими
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Categories)
+@receiver(post_delete, sender=Categories)
+@receiver(post_save, sender=CardTag)
+@receiver(post_delete, sender=CardTag)
+def bump_page_cache(sender, **kwargs):
+    page_cache.bump()
+
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def bump_page_cache_tags(sender, action, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        page_cache.bump()
+
+
+# Индекс автодополнения тегов (см. cards.tag_index)
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_index(sender, **kwargs):
+    tag_index.bump()
+
+
+# Списки карточек тегов (см. cards.tag_postings): сбрасываем только затронутые теги
+
+@receiver(m2m_changed, sender=Card.tags.through)
+def invalidate_tag_postings(sender, instance, action, reverse, pk_set, **kwargs):
+    # Удаление связей приходит через post_delete CardTag
+    if action != 'post_add' or not pk_set:
+        return
+    tag_postings.invalidate([instance.pk] if reverse else pk_set)
+
+
+@receiver(post_save, sender=CardTag)
+@receiver(post_delete, sender=CardTag)
+def invalidate_card_tag_postings(sender, instance, **kwargs):
+    tag_postings.invalidate([instance.tag_id])
+
+
+# Корзины LSH для поиска дублей вопросов (см. cards.duplicates)
+
+@receiver(post_init, sender=Card)
+def remember_indexed_question(sender, instance, **kwargs):
+    instance._indexed_question = instance.__dict__.get('question') if instance.pk else None
+
+
+@receiver(post_save, sender=Card)
+def index_card_question(sender, instance, created, **kwargs):
+    if created or instance.question != instance._indexed_question:
+        duplicates.index_cards([instance], created=created)
+        instance._indexed_question = instance.question
@@ -0,0 +1,116 @@
+"""
+Индекс имен тегов в памяти процесса для автодополнения.
+
+Имена хранятся в отсортированном списке, поиск по префиксу - двоичный
+(bisect), подсказки упорядочены по числу карточек с тегом. Для коротких
+префиксов (до PRECOMPUTED_PREFIX_LENGTH символов) лучшие подсказки
+посчитаны заранее, иначе пришлось бы перебирать тысячи совпадений.
+
+Индекс перестраивается лениво, при следующем запросе: когда меняется
+поколение тегов в кеше (создание, переименование и удаление тегов) или
+когда индекс старше TAG_INDEX_MAX_AGE секунд (так обновляется число
+карточек, которое меняется при каждом добавлении тега). Память
+ограничена TAG_INDEX_MAX_TAGS самыми используемыми тегами.
+"""
+import heapq
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Tag
+
+GENERATION_KEY = 'tag_index:generation'
+PRECOMPUTED_PREFIX_LENGTH = 2
+MAX_SUGGESTIONS = 20
+
+Suggestion = namedtuple('Suggestion', 'name id cards')
+Snapshot = namedtuple('Snapshot', 'generation built_at names suggestions top')
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump():
+    """
+    Новое поколение тегов после фиксации транзакции: индексы всех процессов перестроятся
+    """
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, None))
+
+
+class TagIndex:
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_max_tags():
+        return getattr(settings, 'TAG_INDEX_MAX_TAGS', 100_000)
+
+    @staticmethod
+    def get_max_age():
+        return getattr(settings, 'TAG_INDEX_MAX_AGE', 5 * 60)
+
+    def build(self, generation):
+        rows = (Tag.objects.annotate(usage=Count('cardtag')).order_by('-usage', 'name')
+                .values_list('name', 'id', 'usage')[:self.get_max_tags()])
+        by_usage = [Suggestion(*row) for row in rows]
+
+        top = {}
+        for suggestion in by_usage:
+            for length in range(PRECOMPUTED_PREFIX_LENGTH + 1):
+                prefix = suggestion.name[:length]
+                best = top.setdefault(prefix, [])
+                if len(best) < MAX_SUGGESTIONS:
+                    best.append(suggestion)
+
+        suggestions = sorted(by_usage)
+        names = [suggestion.name for suggestion in suggestions]
+        return Snapshot(generation, time.monotonic(), names, suggestions, top)
+
+    def is_stale(self, snapshot, generation):
+        return (snapshot is None or snapshot.generation != generation
+                or time.monotonic() - snapshot.built_at > self.get_max_age())
+
+    def get_snapshot(self):
+        generation = get_generation()
+        snapshot = self._snapshot
+        if self.is_stale(snapshot, generation):
+            with self._lock:
+                # Пока ждали блокировку, индекс мог перестроить другой поток
+                snapshot = self._snapshot
+                if self.is_stale(snapshot, generation):
+                    snapshot = self._snapshot = self.build(generation)
+        return snapshot
+
+    def complete(self, prefix, limit=10):
+        """
+        До limit подсказок [Suggestion(name, id, cards)] для префикса, самые используемые первыми
+        """
+        prefix = Tag.objects.normalize(prefix)
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        snapshot = self.get_snapshot()
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            return snapshot.top.get(prefix, [])[:limit]
+        start = bisect_left(snapshot.names, prefix)
+        end = bisect_left(snapshot.names, prefix + '\U0010ffff', start)
+        return heapq.nsmallest(limit, snapshot.suggestions[start:end],
+                               key=lambda suggestion: (-suggestion.cards, suggestion.name))
+
+    def clear(self):
+        self._snapshot = None
+
+
+tag_index = TagIndex()
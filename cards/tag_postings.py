@@ -0,0 +1,113 @@
+"""
+Отсортированные списки id карточек тегов (posting lists) в кеше.
+
+Для каждого тега в кеше лежит массив id его карточек по возрастанию.
+Просмотр по нескольким тегам (И / ИЛИ) пересекает или объединяет эти
+массивы в памяти, вместо запроса с JOIN на каждый тег, а страница
+выбирается по id (см. IdListPaginator), так что из БД читаются только
+карточки текущей страницы.
+
+Списки сбрасываются по одному тегу: при добавлении и удалении связей
+CardTag (cards.signals) и при импорте. Отсутствующий список строится
+при первом чтении одним запросом по индексу (tag_id, card_id).
+TAG_POSTINGS_TIMEOUT - страховочный срок жизни списков в секундах.
+"""
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import CardTag
+
+MODE_AND = 'and'
+MODE_OR = 'or'
+
+
+def postings_key(tag_id):
+    return f'tag_postings:{tag_id}'
+
+
+def _postings_rows(tag_ids):
+    return CardTag.objects.filter(tag_id__in=tag_ids).order_by('tag_id', 'card_id').values_list('tag_id', 'card_id')
+
+
+def _get_timeout():
+    return getattr(settings, 'TAG_POSTINGS_TIMEOUT', 24 * 60 * 60)
+
+
+def get_postings(tag_ids):
+    """
+    {id тега: array id карточек по возрастанию}
+    """
+    keys = {postings_key(tag_id): tag_id for tag_id in tag_ids}
+    result = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [tag_id for tag_id in tag_ids if tag_id not in result]
+    if missing:
+        loaded = defaultdict(lambda: array('q'))
+        for tag_id, card_id in _postings_rows(missing).iterator(chunk_size=10000):
+            loaded[tag_id].append(card_id)
+        computed = {tag_id: loaded[tag_id] for tag_id in missing}
+        cache.set_many({postings_key(tag_id): value for tag_id, value in computed.items()}, _get_timeout())
+        result.update(computed)
+    return result
+
+
+async def aget_postings(tag_ids):
+    """
+    get_postings для асинхронных представлений
+    """
+    keys = {postings_key(tag_id): tag_id for tag_id in tag_ids}
+    result = {keys[key]: value for key, value in (await cache.aget_many(keys)).items()}
+    missing = [tag_id for tag_id in tag_ids if tag_id not in result]
+    if missing:
+        loaded = defaultdict(lambda: array('q'))
+        # values_list().aiterator() в Django 4.2.0 выполняет SQL вне sync_to_async,
+        # поэтому строки читаются целиком через async for по queryset
+        async for tag_id, card_id in _postings_rows(missing):
+            loaded[tag_id].append(card_id)
+        computed = {tag_id: loaded[tag_id] for tag_id in missing}
+        await cache.aset_many({postings_key(tag_id): value for tag_id, value in computed.items()}, _get_timeout())
+        result.update(computed)
+    return result
+
+
+def invalidate(tag_ids):
+    """
+    Сбрасывает списки тегов после фиксации транзакции
+    """
+    keys = [postings_key(tag_id) for tag_id in set(tag_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def combine(postings, mode=MODE_AND):
+    """
+    Пересечение (MODE_AND) или объединение (MODE_OR) списков id, результат по возрастанию
+    """
+    postings = sorted(postings, key=len)
+    if not postings:
+        return array('q')
+    if len(postings) == 1:
+        return postings[0]
+    if mode == MODE_OR:
+        return array('q', sorted(set().union(*postings)))
+    # Начинаем с самого короткого списка: результат не длиннее него
+    found = set(postings[0])
+    for ids in postings[1:]:
+        if not found:
+            break
+        found.intersection_update(ids)
+    return array('q', sorted(found))
+
+
+def find_cards(tag_ids, mode=MODE_AND):
+    """
+    id карточек по возрастанию: со всеми тегами (MODE_AND) или хотя бы с одним (MODE_OR)
+    """
+    return combine(get_postings(tag_ids).values(), mode) if tag_ids else array('q')
+
+
+async def afind_cards(tag_ids, mode=MODE_AND):
+    return combine((await aget_postings(tag_ids)).values(), mode) if tag_ids else array('q')
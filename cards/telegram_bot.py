@@ -19,3 +19,28 @@ async def send_telegram_message(token, chat_id, message, parse_mode="Markdown"):
         logging.info(f'Сообщение "{message}" отправлено в чат {chat_id}')
     except Exception as e:
         logging.error(f'Ошибка отправки сообщения в чат {chat_id}: {e}')
+
+
+class AsyncTelegramNotifier:
+    """
+    Отправитель сообщений для воркера очереди уведомлений (см. notifications.adrain_outbox).
+    Один бот и одно HTTP-соединение на все время работы воркера, отправка идет
+    в цикле событий воркера. Ошибки отправки пробрасываются наружу, чтобы
+    очередь повторила попытку
+    """
+
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, chat_id=YOUR_PERSONAL_CHAT_ID):
+        self.chat_id = chat_id
+        self.bot = telegram.Bot(token=token)
+
+    async def __aenter__(self):
+        await self.bot.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.bot.shutdown()
+
+    async def send(self, text):
+        # Без parse_mode: текст карточек может содержать символы разметки
+        await self.bot.send_message(chat_id=self.chat_id, text=text)
+        logging.info(f'Сообщение "{text}" отправлено в чат {self.chat_id}')
@@ -0,0 +1,18 @@
+from django import template
+from django.template.loader import get_template
+
+from cards import fragment_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def card_preview(context, card):
+    """
+    Превью карточки из кеша фрагментов (см. cards.fragment_cache).
+    Результаты поиска со сниппетом рендерятся без кеша: сниппет зависит от запроса
+    """
+    preview = get_template('include/card_preview.html')
+    if getattr(card, 'search_snippet', None):
+        return preview.render({'card': card}, context.request)
+    return fragment_cache.get_or_render(card, lambda: preview.render({'card': card}))
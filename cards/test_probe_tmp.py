@@ -0,0 +1,43 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from cards.models import Card, Categories, Tag
+
+
+class Probe(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('u', password='p')
+        self.client.force_login(self.user)
+        c = Categories.objects.create(name='c')
+        self.card = Card.objects.create(question='q1 test', answer='a', category=c)
+
+    def test_submit_huge_card(self):
+        r = self.client.post(reverse('review_submit'), json.dumps({'reviews': [{'card': 10**30, 'grade': 4}]}),
+                             content_type='application/json')
+        print('huge card', r.status_code)
+
+    def test_api_tag_path_and_get(self):
+        t = Tag.objects.create(name='x')
+        r = self.client.get(reverse('api_tag_cards', kwargs={'tag_id': t.id}), {'tag': 999})
+        print('api tag', r.status_code, r.json())
+
+    def test_catalog_category_huge(self):
+        r = self.client.get(reverse('catalog'), {'category': str(10**30)})
+        print('catalog huge category', r.status_code)
+
+    def test_tags_huge(self):
+        r = self.client.get(reverse('cards_by_tags'), {'tag': str(10**30)})
+        print('tags huge', r.status_code)
+
+    def test_review_due_huge_new(self):
+        r = self.client.get(reverse('review_due'), {'limit': '5', 'new': str(10**30)})
+        print('due huge new', r.status_code)
+
+    def test_export_huge(self):
+        r = self.client.get(reverse('export_cards'), {'category': str(10**30)})
+        print('export huge', r.status_code, b''.join(r.streaming_content)[:50])
+
+    def test_api_huge_cat(self):
+        r = self.client.get(reverse('api_cards'), {'category': str(10**30)})
+        print('api huge category', r.status_code)
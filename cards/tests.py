@@ -1,7 +1,81 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import patch
 
+from asgiref.sync import async_to_sync, sync_to_async
 
+from anki import db_router, metrics
+from anki.sqlite_setup import retry_on_busy
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.templatetags.static import static
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import async_views, counters, duplicates, fragment_cache, page_cache, related, search, tag_postings
+from .admin import CardAdmin, CardPaginator, update_check_status
+from .benchmark import generate_dataset, run_scenarios
+from .forms import CardAdminForm, CardForm
+from .exporters import iter_export
+from .importers import CardImporter, read_anki, read_csv, read_jsonl
+from .pagination import encode_cursor
+from .models import Card, CardLshBucket, Categories, Notification, RelatedCard, ReviewState, Tag
+from .notifications import adrain_outbox
+from .scheduler import schedule
+from .tag_index import tag_index
+from .view_counter import view_counter
+from .views import TagCardsView
+
+
+class QueryBudgetMixin:
+    """
+    Проверка бюджета SQL-запросов для TestCase.
+
+    Бюджет фиксирует число запросов представления, чтобы N+1 и другие
+    регрессии валили тесты, а не продакшен.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using='default'):
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        executed = len(captured)
+        if executed != budget:
+            queries = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(captured.captured_queries, 1))
+            self.fail(f'Ожидалось {budget} SQL-запросов, выполнено {executed}:\n{queries}')
+
+    def assertViewQueryBudget(self, url, budget, data=None, using='default'):
+        """Выполняет GET-запрос к url и сверяет число SQL-запросов с бюджетом."""
+        with self.assertQueryBudget(budget, using=using):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+def create_cards(count, category=None, author=None, tags=()):
+    """Создает count карточек с тегами для тестов."""
+    category = category or Categories.objects.get_or_create(name='Python')[0]
+    cards = Card.objects.bulk_create(
+        Card(question=f'Вопрос {i}', answer=f'Ответ {i}', category=category, author=author)
+        for i in range(count)
+    )
+    for card in cards:
+        card.tags.add(*tags)
+    return cards
+
+
+@override_settings(CARD_VIEWS_FLUSH_INTERVAL=0)
 class CardsAppTests(TestCase):
     """Тестирование приложения Cards."""
 
@@ -17,14 +91,1450 @@ class CardsAppTests(TestCase):
 
     def test_card_route(self):
         """Проверка маршрута для получения карточки по ID."""
+        card = create_cards(1)[0]
+
+        response = self.client.get(f'/cards/{card.id}/detail/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"Карточка № {card.id}")
+
+    def test_tag_route(self):
+        """Проверка маршрута для получения карточек по тегу."""
+        tag = Tag.objects.create(name='django')
+        create_cards(2, tags=[tag])
+
+        response = self.client.get(f'/cards/tags/{tag.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Вопрос 1")
+
+
+@override_settings(CARD_VIEWS_FLUSH_INTERVAL=0)
+class CardQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов при выводе карточек не зависит от их количества."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user('author', password='password')
+        cls.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        create_cards(30, author=cls.author, tags=cls.tags)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog(self):
+        # count карточек для меню, страница карточек с категорией и автором, теги
+        self.assertViewQueryBudget(reverse('catalog'), 3)
+
+    def test_catalog_search(self):
+        # как у каталога и сниппеты карточек страницы
+        self.assertViewQueryBudget(reverse('catalog'), 4, {'search_query': 'Вопрос'})
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_cards_by_tag(self):
+        # список карточек тега (пустой кеш), теги, карточки страницы с категорией и автором, теги карточек
+        self.assertViewQueryBudget(reverse('cards_by_tag', kwargs={'tag_id': self.tags[0].id}), 4)
+        # список первого тега уже в кеше, из БД читаются только списки остальных
+        self.assertViewQueryBudget(reverse('cards_by_tags'), 4, {'tag': [tag.id for tag in self.tags]})
+        self.assertViewQueryBudget(reverse('cards_by_tags'), 3, {'tag': [tag.id for tag in self.tags]})
+
+    def test_card_detail(self):
+        card = Card.objects.first()
+        # карточка с категорией, теги, обновление счетчика просмотров, count для меню, похожие карточки
+        self.assertViewQueryBudget(reverse('detail_card_by_id', kwargs={'pk': card.pk}), 5)
+
+
+class CatalogCursorPaginationTests(TestCase):
+    """Тестирование курсорной пагинации каталога."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name='Python')
+        # Одинаковые просмотры у соседних карточек проверяют уточнение по id
+        Card.objects.bulk_create(
+            Card(question=f'Вопрос {i}', answer='Ответ', category=category, views=i // 2)
+            for i in range(65)
+        )
+
+    def walk(self, params):
+        """Проходит каталог по курсорам вперед до конца, возвращает страницы id."""
+        pages = []
+        cursor = None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            page = self.client.get(reverse('catalog'), query).context['page_obj']
+            pages.append([card.id for card in page])
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_pages_cover_catalog_in_sort_order(self):
+        pages, _ = self.walk({'sort': 'views', 'order': 'desc'})
+        self.assertEqual([len(page) for page in pages], [30, 30, 5])
+        ids = [pk for page in pages for pk in page]
+        expected = list(Card.objects.order_by('-views', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        pages, last_page = self.walk({'sort': 'adds', 'order': 'asc'})
+        response = self.client.get(reverse('catalog'), {'sort': 'adds', 'order': 'asc',
+                                                        'cursor': last_page.previous_cursor})
+        self.assertEqual([card.id for card in response.context['page_obj']], pages[-2])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('catalog'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_cursor_with_wrong_value_type_falls_back_to_first_page(self):
+        sorts = [{'sort': 'views'}, {'sort': 'adds'}, {'sort': 'upload_date'},
+                 {'sort': 'relevance', 'search_query': 'Вопрос'}]
+        # bulk_create не вызывает сигналы индексации
+        search.rebuild()
+        for params in sorts:
+            for value in ('abc', {'a': 1}, [1], True, 10 ** 30):
+                with self.subTest(params=params, value=value):
+                    cursor = encode_cursor((value, 1), 'next')
+                    response = self.client.get(reverse('catalog'), dict(params, cursor=cursor))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertFalse(response.context['page_obj'].has_previous())
+                    self.assertTrue(response.context['cards'])
+
+    def test_unknown_sort_field_is_ignored(self):
+        response = self.client.get(reverse('catalog'), {'sort': 'answer; DROP'})
+        self.assertEqual(response.context['sort'], 'upload_date')
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class CardFullTextSearchTests(TestCase):
+    """Тестирование полнотекстового поиска (SQLite FTS5)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(name='Python')
+        cls.decorator = Card.objects.create(question='Что такое декоратор?', answer='Функция-обертка',
+                                            category=category)
+        cls.generator = Card.objects.create(question='Что такое генератор?',
+                                            answer='Функция с yield, не путать с декоратором',
+                                            category=category)
+        cls.tagged = Card.objects.create(question='Как работает GIL?', answer='Блокировка', category=category)
+        cls.tagged.tags.add(Tag.objects.create(name='многопоточность'))
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('catalog'), dict(params, search_query=query))
+        return response, [card.id for card in response.context['cards']]
+
+    def test_ranks_question_matches_first(self):
+        _, ids = self.search('декоратор')
+        self.assertEqual(ids, [self.decorator.id, self.generator.id])
+
+    def test_prefix_and_tag_match(self):
+        _, ids = self.search('многопот')
+        self.assertEqual(ids, [self.tagged.id])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        self.decorator.question = '<script>декоратор</script>'
+        self.decorator.save()
+        response, _ = self.search('декоратор')
+        self.assertContains(response, '<mark>декоратор</mark>')
+        self.assertNotContains(response, '<script>')
+
+    def test_index_follows_updates_and_deletes(self):
+        self.generator.question = 'Что такое итератор?'
+        self.generator.answer = 'Объект с __next__'
+        self.generator.save()
+        self.decorator.delete()
+        self.assertEqual(self.search('декоратор')[1], [])
+        self.assertEqual(self.search('итератор')[1], [self.generator.id])
+
+    def test_tag_rename_reindexes_cards(self):
+        Tag.objects.filter(name='многопоточность').update(name='x')
+        tag = Tag.objects.get(name='x')
+        tag.name = 'конкурентность'
+        tag.save()
+        self.assertEqual(self.search('конкурентность')[1], [self.tagged.id])
+
+    def test_syntax_characters_are_safe(self):
+        response, _ = self.search('"AND (OR* ^')
+        self.assertEqual(response.status_code, 200)
+
+    def test_explicit_sort_is_kept(self):
+        response, ids = self.search('декоратор', sort='upload_date', order='asc')
+        self.assertEqual(ids, [self.decorator.id, self.generator.id])
+        self.assertEqual(response.context['sort'], 'upload_date')
+
+
+@override_settings(CARD_VIEWS_FLUSH_INTERVAL=60)
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ViewCounterTests(QueryBudgetMixin, TestCase):
+    """Тестирование буферизованного счетчика просмотров."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = create_cards(2)
+
+    def tearDown(self):
+        view_counter.discard()
+
+    def test_detail_does_not_write_and_shows_pending_views(self):
+        url = reverse('detail_card_by_id', kwargs={'pk': self.first.pk})
+        self.client.get(url)
+        # карточка с категорией, теги, похожие карточки (count для меню уже в кеше) - без UPDATE
+        response = self.assertViewQueryBudget(url, 3)
+        self.assertEqual(response.context['card'].views, 2)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views, 0)
+
+    def test_flush_writes_all_cards_in_one_update(self):
+        for _ in range(3):
+            view_counter.increment(self.first.pk)
+        view_counter.increment(self.second.pk)
+        # один UPDATE, обернутый в SAVEPOINT / RELEASE транзакции теста
+        with self.assertQueryBudget(3) as captured:
+            self.assertEqual(view_counter.flush(), 2)
+        self.assertTrue(captured[1]['sql'].startswith('UPDATE'))
+        self.assertEqual(list(Card.objects.order_by('id').values_list('views', flat=True)), [3, 1])
+        self.assertEqual(view_counter.pending(self.first.pk), 0)
+
+    def test_catalog_merges_pending_views(self):
+        view_counter.increment(self.second.pk, 5)
+        response = self.client.get(reverse('catalog'))
+        views = {card.pk: card.views for card in response.context['cards']}
+        self.assertEqual(views[self.second.pk], 5)
+
+
+class StubNotifier:
+    """Заглушка вместо Telegram: запоминает сообщения или падает по требованию."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, text):
+        if self.fail:
+            raise ConnectionError('Telegram недоступен')
+        self.sent.append(text)
+
+
+# Воркер асинхронный, а тесты очереди работают в синхронной транзакции TestCase
+drain_outbox = async_to_sync(adrain_outbox)
+
+
+class NotificationOutboxTests(TestCase):
+    """Тестирование очереди уведомлений о новых карточках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categories.objects.create(name='Python')
+
+    def add_card(self, question):
+        form = CardForm({'question': question, 'answer': 'Ответ', 'category': self.category.pk, 'tags': 'a, b'})
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def test_card_creation_only_enqueues(self):
+        self.add_card('Что такое GIL?')
+        notification = Notification.objects.get()
+        self.assertIn('Что такое GIL?', notification.message)
+        self.assertIsNone(notification.sent_at)
+
+    def test_burst_is_sent_as_one_digest(self):
+        for i in range(3):
+            self.add_card(f'Вопрос {i}')
+        notifier = StubNotifier()
+        self.assertEqual(drain_outbox(notifier), 3)
+        self.assertEqual(len(notifier.sent), 1)
+        self.assertIn('Вопрос 2', notifier.sent[0])
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(drain_outbox(notifier), 0)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.add_card('Вопрос')
+        self.assertEqual(drain_outbox(StubNotifier(fail=True)), 0)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertIn('недоступен', notification.last_error)
+        # до наступления времени повтора уведомление не отправляется
+        notifier = StubNotifier()
+        self.assertEqual(drain_outbox(notifier), 0)
+        self.assertEqual(drain_outbox(notifier, now=notification.next_attempt_at), 1)
+        self.assertEqual(len(notifier.sent), 1)
+
+
+class CardCountersTests(TestCase):
+    """Тестирование счетчиков карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Categories.objects.create(name='Python')
+        cls.django = Categories.objects.create(name='Django')
+        cls.tag = Tag.objects.create(name='orm')
+
+    def setUp(self):
+        cache.clear()
+        # прогреваем счетчики, дальше они должны меняться без COUNT(*)
+        counters.reconcile()
+
+    def assertCounters(self, total, checked, python, django, tag):
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.total(), total)
+            self.assertEqual(counters.checked(), checked)
+            self.assertEqual(counters.unchecked(), total - checked)
+            self.assertEqual(counters.category_counts([self.python.id, self.django.id]),
+                             {self.python.id: python, self.django.id: django})
+            self.assertEqual(counters.tag_counts([self.tag.id]), {self.tag.id: tag})
+
+    def test_counters_follow_card_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            card = Card.objects.create(question='Вопрос', answer='Ответ', category=self.python)
+            card.tags.add(self.tag)
+        self.assertCounters(total=1, checked=0, python=1, django=0, tag=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card = Card.objects.get(pk=card.pk)
+            card.category = self.django
+            card.check_status = True
+            card.save()
+        self.assertCounters(total=1, checked=1, python=0, django=1, tag=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card.delete()
+        self.assertCounters(total=0, checked=0, python=0, django=0, tag=0)
+
+    def test_admin_bulk_actions_update_status_counters(self):
+        # bulk_create не отправляет сигналы - пересчитываем счетчики явно
+        ids = [card.pk for card in create_cards(3, category=self.python)]
+        counters.reconcile()
+        admin = CardAdmin(Card, None)
+        admin.message_user = lambda *args: None
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.make_checked(None, Card.objects.all())
+            # повторная отметка не должна менять счетчики
+            admin.make_checked(None, Card.objects.filter(pk__in=ids[:2]))
+            admin.make_unchecked(None, Card.objects.filter(pk=ids[0]))
+        self.assertCounters(total=3, checked=2, python=3, django=0, tag=0)
+
+    def test_reconcile_repairs_drift(self):
+        create_cards(2, category=self.python)
+        cache.set(counters.TOTAL_KEY, 100)
+        drift = counters.reconcile()
+        self.assertEqual(drift[counters.TOTAL_KEY], (100, 2))
+        self.assertCounters(total=2, checked=0, python=2, django=0, tag=0)
+
+    def test_zero_count_is_cached(self):
+        cache.clear()
+        self.assertEqual(counters.total(), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.total(), 0)
+
+
+class CardImportTests(TestCase):
+    """Тестирование потокового импорта карточек."""
+
+    def setUp(self):
+        cache.clear()
+
+    def run_import(self, rows, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            importer = CardImporter(chunk_size=2, **kwargs)
+            importer.run(rows)
+        return importer
+
+    def test_csv(self):
+        data = io.StringIO('question,answer,category,tags\n'
+                           'Что такое GIL?,Блокировка,Python,"потоки, cpython"\n'
+                           'Пустой ответ,,Python,\n'
+                           'Что такое ORM?,Отображение,Django,"orm"\n')
+        importer = self.run_import(read_csv(data))
+        self.assertEqual((importer.imported, importer.skipped), (2, 1))
+        card = Card.objects.get(question='Что такое GIL?')
+        self.assertEqual(card.category.name, 'Python')
+        self.assertEqual(sorted(card.tags.values_list('name', flat=True)), ['cpython', 'потоки'])
+
+    def test_jsonl_reuses_categories_and_tags_across_chunks(self):
+        lines = [f'{{"question": "Вопрос {i}", "answer": "Ответ", "category": "Python", "tags": ["a", "b"]}}'
+                 for i in range(5)]
+        importer = self.run_import(read_jsonl(lines))
+        self.assertEqual(importer.imported, 5)
+        self.assertEqual(Categories.objects.count(), 1)
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(Card.objects.filter(tags__name='a').count(), 5)
+
+    def test_anki_text_export(self):
+        lines = ['#separator:tab', '#html:false', '#tags column:3',
+                 'Столица Франции\tПариж\tгеография европа', 'Без ответа']
+        importer = self.run_import(read_anki(lines), default_category='Общее')
+        self.assertEqual(importer.imported, 1)
+        card = Card.objects.get()
+        self.assertEqual((card.answer, card.category.name), ('Париж', 'Общее'))
+        self.assertEqual(sorted(card.tags.values_list('name', flat=True)), ['география', 'европа'])
+
+    def test_side_effects_are_applied_per_chunk(self):
+        counters.reconcile()
+        lines = [f'{{"question": "Импорт {i}", "answer": "Ответ", "category": "Python", "tags": "x"}}'
+                 for i in range(3)]
+        self.run_import(read_jsonl(lines))
+        # одно уведомление на импорт, а не на каждую карточку
+        self.assertEqual(Notification.objects.count(), 1)
+        tag = Tag.objects.get(name='x')
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.total(), 3)
+        self.assertEqual(counters.tag_counts([tag.id]), {tag.id: 3})
+        response = self.client.get(reverse('catalog'), {'search_query': 'Импорт'})
+        self.assertEqual(len(response.context['cards']), 3)
+
+
+class TagResolutionTests(QueryBudgetMixin, TestCase):
+    """Тестирование пакетного поиска и создания тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categories.objects.create(name='Python')
+        cls.existing = Tag.objects.create(name='django')
+
+    def test_resolve_is_case_insensitive_and_batched(self):
+        # поиск существующих, вставка новых, перечитывание новых
+        with self.assertQueryBudget(3):
+            tags = Tag.objects.resolve(['Django', ' New  Tag ', 'new tag', 'ORM', ''])
+        self.assertEqual([tag.name for tag in tags], ['django', 'new tag', 'orm'])
+        self.assertEqual(tags[0], self.existing)
+        with self.assertQueryBudget(1):
+            self.assertEqual(Tag.objects.resolve(['NEW TAG', 'orm']), tags[1:])
+
+    def test_resolve_survives_concurrently_created_tag(self):
+        # тег появился в БД между выборкой и вставкой
+        original_filter = Tag.objects.filter
+        calls = []
+
+        def racing_filter(*args, **kwargs):
+            if not calls:
+                calls.append(1)
+                result = list(original_filter(*args, **kwargs))
+                Tag.objects.create(name='race')
+                return result
+            return original_filter(*args, **kwargs)
+
+        Tag.objects.filter = racing_filter
+        try:
+            tags = Tag.objects.resolve(['race'])
+        finally:
+            del Tag.objects.filter
+        self.assertEqual(tags, [Tag.objects.get(name='race')])
+
+    def test_card_form_saves_tags_with_fixed_query_count(self):
+        form = CardForm({'question': 'Вопрос', 'answer': 'Ответ', 'category': self.category.pk,
+                         'tags': 'Django, a, b, c, d, e, A'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['tags'], ['django', 'a', 'b', 'c', 'd', 'e'])
+        with CaptureQueriesContext(connections['default']) as captured:
+            card = form.save()
+        inserts = [query['sql'] for query in captured if query['sql'].startswith('INSERT INTO "CardTags"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(card.tags.count(), 6)
+
+    def test_admin_form_replaces_tags(self):
+        author = get_user_model().objects.create_user('author', password='password')
+        card = create_cards(1, category=self.category, author=author, tags=[self.existing])[0]
+        form = CardAdminForm(instance=card)
+        self.assertEqual(form['tag_names'].initial, 'django')
+        data = {'question': card.question, 'answer': card.answer, 'category': self.category.pk,
+                'check_status': False, 'author': author.pk, 'views': 0, 'adds': 0, 'tag_names': 'ORM, Python'}
+        form = CardAdminForm(data, instance=card)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        form.save_tags()
+        self.assertEqual(sorted(card.tags.values_list('name', flat=True)), ['orm', 'python'])
+
+    def test_tag_names_are_normalized_on_save(self):
+        tag = Tag.objects.create(name='  Machine   Learning ')
+        self.assertEqual(tag.name, 'machine learning')
+
+
+class CardExportTests(QueryBudgetMixin, TestCase):
+    """Тестирование потоковой выгрузки карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('user', password='password')
+        cls.python = Categories.objects.create(name='Python')
+        cls.django = Categories.objects.create(name='Django')
+        cls.tag = Tag.objects.create(name='orm')
+        create_cards(5, category=cls.python, tags=[cls.tag])
+        Card.objects.create(question='Многострочный\tвопрос', answer='Строка 1\nСтрока 2', category=cls.django)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_cards'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('export_cards')).status_code, 302)
+
+    def test_jsonl_with_filters(self):
+        rows = [json.loads(line) for line in self.export(format='jsonl', tag=self.tag.id).decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['tags'], ['orm'])
+        rows = self.export(format='jsonl', category=self.django.id, search_query='Многострочный').splitlines()
+        self.assertEqual(len(rows), 1)
+
+    def test_gzip_csv(self):
+        data = gzip.decompress(self.export(format='csv', gzip='1')).decode()
+        self.assertTrue(data.startswith('question,answer,category,tags'))
+        self.assertIn('Вопрос 4,Ответ 4,Python,orm', data)
+
+    def test_query_count_does_not_grow_with_deck(self):
+        # один запрос карточек с категорией (читается курсором по пачкам)
+        # и по запросу тегов на пачку, а не на каждую карточку
+        with self.assertQueryBudget(2):
+            b''.join(iter_export(Card.objects.all(), 'jsonl'))
+        with self.assertQueryBudget(4):
+            b''.join(iter_export(Card.objects.all(), 'jsonl', chunk_size=2))
+
+    def test_oversized_ids_are_ignored(self):
+        huge = str(2 ** 63)
+        self.assertEqual(len(self.export(format='jsonl', category=huge).splitlines()), 6)
+        for url, params in ((reverse('catalog'), {'category': huge}), (reverse('api_cards'), {'category': huge}),
+                            (reverse('catalog'), {'tag': '-1'})):
+            with self.subTest(url=url, params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+        # без допустимых тегов страница тегов - 404, а не ошибка сервера
+        self.assertEqual(self.client.get(reverse('cards_by_tags'), {'tag': huge}).status_code, 404)
+
+    def test_tsv_round_trips_through_anki_import(self):
+        data = self.export(format='tsv', category=self.django.id).decode()
+        Card.objects.all().delete()
+        importer = CardImporter(default_category='Импорт')
+        importer.run(read_anki(io.StringIO(data)))
+        card = Card.objects.get()
+        self.assertEqual((card.question, card.answer), ('Многострочный\tвопрос', 'Строка 1\nСтрока 2'))
+
+
+class ReviewSchedulerTests(QueryBudgetMixin, TestCase):
+    """Тестирование интервального повторения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('student', password='password')
+        cls.cards = create_cards(30)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def submit(self, reviews):
+        return self.client.post(reverse('review_submit'), json.dumps({'reviews': reviews}),
+                                content_type='application/json')
+
+    def test_sm2_intervals(self):
+        now = timezone.now()
+        state = ReviewState(due=now)
+        self.assertEqual([schedule(state, 5, now).interval for _ in range(4)], [1, 6, 16, 45])
+        schedule(state, 1, now)
+        self.assertEqual((state.interval, state.repetitions, state.lapses), (0, 0, 1))
+        self.assertGreaterEqual(state.ease, 1.3)
+
+    def test_submit_and_due_queue_have_constant_query_count(self):
+        reviews = [{'card': card.id, 'grade': 4} for card in self.cards]
+        # сессия, пользователь, SAVEPOINT, состояния, проверка карточек, bulk_create, RELEASE
+        with self.assertQueryBudget(7):
+            self.assertEqual(self.submit(reviews).status_code, 200)
+        # повторная пачка: вместо проверки карточек и вставки - один bulk_update
+        with self.assertQueryBudget(6):
+            self.assertEqual(self.submit(reviews).status_code, 200)
+        self.assertEqual(ReviewState.objects.filter(user=self.user, repetitions=2).count(), 30)
+
+        ReviewState.objects.filter(card__in=self.cards[:5]).update(due=timezone.now() - timedelta(days=1))
+        # сессия, пользователь, очередь по индексу (user, due)
+        response = self.assertViewQueryBudget(reverse('review_due'), 3, {'limit': 10})
+        self.assertEqual([row['card'] for row in response.json()['cards']],
+                         [card.id for card in self.cards[:5]])
+
+    def test_due_queue_is_filled_with_new_cards(self):
+        self.submit([{'card': self.cards[0].id, 'grade': 1}])
+        ReviewState.objects.update(due=timezone.now())
+        response = self.client.get(reverse('review_due'), {'limit': 3, 'new': 5})
+        self.assertEqual([row['card'] for row in response.json()['cards']],
+                         [card.id for card in self.cards[:3]])
+        self.assertEqual(response.json()['cards'][0]['lapses'], 0)
+
+    def test_due_queue_clamps_negative_limits(self):
+        for params in ({'limit': -1}, {'new': -1}, {'limit': -5, 'new': -5}, {'limit': 10 ** 30}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('review_due'), params)
+                self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('review_due'), {'limit': 1, 'new': 5})
+        self.assertEqual([row['card'] for row in response.json()['cards']], [self.cards[0].id])
+
+    def test_invalid_submission(self):
+        self.assertEqual(self.submit([{'card': 999999, 'grade': 4}]).status_code, 400)
+        self.assertEqual(self.submit([{'card': self.cards[0].id, 'grade': 9}]).status_code, 400)
+        for card in (10 ** 30, True, 1.5, str(self.cards[0].id), None):
+            with self.subTest(card=card):
+                self.assertEqual(self.submit([{'card': card, 'grade': 4}]).status_code, 400)
+        self.assertFalse(ReviewState.objects.exists())
+
+    def test_due_queue_uses_user_due_index(self):
+        with connections['default'].cursor() as cursor:
+            sql, params = ReviewState.objects.filter(user=self.user, due__lte=timezone.now()) \
+                .order_by('due').query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('review_user_due_idx', plan)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class CardPreviewCacheTests(TestCase):
+    """Тестирование кеша превью карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categories.objects.create(name='Python')
+        cls.tag = Tag.objects.create(name='orm')
+        cls.cards = create_cards(5, category=cls.category, tags=[cls.tag])
+
+    def setUp(self):
+        cache.clear()
+        fragment_cache.stats.reset()
+
+    def get_catalog(self):
+        return self.client.get(reverse('catalog')).content.decode()
+
+    def test_second_render_is_served_from_cache(self):
+        self.get_catalog()
+        self.assertEqual(fragment_cache.stats.as_dict()['misses'], 5)
+        self.get_catalog()
+        self.assertEqual(fragment_cache.stats.hits, 5)
+        self.assertEqual(fragment_cache.stats.misses, 5)
+
+    def test_card_save_invalidates_preview(self):
+        self.get_catalog()
+        card = Card.objects.get(pk=self.cards[0].pk)
+        card.question = 'Новый вопрос'
+        with self.captureOnCommitCallbacks(execute=True):
+            card.save()
+        self.assertIn('Новый вопрос', self.get_catalog())
+        self.assertEqual(fragment_cache.stats.misses, 6)
+
+    def test_tag_changes_invalidate_preview(self):
+        self.get_catalog()
+        card = Card.objects.get(pk=self.cards[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            card.tags.add(Tag.objects.create(name='queryset'))
+        self.assertIn('queryset', self.get_catalog())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'django-orm'
+            self.tag.save()
+        self.assertEqual(self.get_catalog().count('django-orm'), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card.tags.clear()
+        self.assertEqual(self.get_catalog().count('django-orm'), 4)
+
+    def test_category_rename_changes_key(self):
+        self.get_catalog()
+        Categories.objects.filter(pk=self.category.pk).update(name='Python 3')
+        self.assertEqual(self.get_catalog().count('Python 3'), 5)
+
+    def test_view_count_changes_key(self):
+        self.get_catalog()
+        Card.objects.filter(pk=self.cards[0].pk).update(views=42)
+        self.assertIn('Просмотры: 42', self.get_catalog())
+
+    def test_search_results_are_not_cached(self):
+        self.client.get(reverse('catalog'), {'search_query': 'Вопрос'})
+        self.assertEqual(fragment_cache.stats.as_dict(), {'hits': 0, 'misses': 0, 'hit_ratio': 0.0})
+
+
+class PageCacheTests(TestCase):
+    """Тестирование кеша страниц для анонимных посетителей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categories.objects.create(name='Python')
+        cls.cards = create_cards(3, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_request_does_not_touch_db(self):
+        url = reverse('catalog')
+        first = self.client.get(url, {'sort': 'views', 'order': 'asc'})
+        self.assertTrue(first.has_header('ETag'))
+        self.assertTrue(first.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            # порядок и пустые параметры не влияют на ключ
+            second = self.client.get(url, {'order': 'asc', 'sort': 'views', 'search_query': ' '})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
 
-        response = self.client.get('/cards/catalog/1/')
+    def test_conditional_requests_get_304(self):
+        response = self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            self.assertEqual(self.client.get(reverse('about'),
+                                             HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_content_write_changes_generation(self):
+        url = reverse('catalog')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Card.objects.create(question='Новая карточка', answer='Ответ', category=self.category)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Новая карточка')
+
+    def test_flushed_views_show_up_in_next_time_window(self):
+        url = reverse('catalog')
+        response = self.client.get(url, {'sort': 'views'})
+        Card.objects.filter(pk=self.cards[0].pk).update(views=100)
+        window = page_cache.current_window() + page_cache.get_timeout()
+        with patch('cards.page_cache.current_window', return_value=window):
+            fresh = self.client.get(url, {'sort': 'views'}, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(self.client.get(url, {'sort': 'views'},
+                                             HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.context['cards'][0], self.cards[0])
+
+    @override_settings(CARD_VIEWS_FLUSH_INTERVAL=60)
+    def test_cached_detail_still_counts_views(self):
+        url = reverse('detail_card_by_id', kwargs={'pk': self.cards[0].pk})
+        try:
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.client.get(url)
+            self.assertEqual(view_counter.pending(self.cards[0].pk), 2)
+        finally:
+            view_counter.discard()
+
+    def test_logged_in_users_are_not_cached(self):
+        user = get_user_model().objects.create_user('reader', password='password')
+        self.client.get(reverse('index'))
+        self.client.force_login(user)
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'reader')
+
+
+class CardApiTests(QueryBudgetMixin, TestCase):
+    """Тестирование JSON API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user('author', password='password')
+        cls.python = Categories.objects.create(name='Python')
+        cls.django = Categories.objects.create(name='Django')
+        cls.tags = [Tag.objects.create(name=name) for name in ('orm', 'views')]
+        cls.cards = create_cards(25, category=cls.python, author=cls.author, tags=cls.tags)
+        create_cards(5, category=cls.django)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sparse_fields_and_cursor_pages(self):
+        url = reverse('api_cards')
+        # страница карточек и теги страницы
+        with self.assertQueryBudget(2):
+            response = self.client.get(url, {'fields': 'id,question,tags', 'limit': 20, 'category': self.python.id})
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(set(data['results'][0]), {'id', 'question', 'tags'})
+        self.assertEqual(data['results'][0]['tags'], ['orm', 'views'])
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(url, {'fields': 'id', 'limit': 20, 'category': self.python.id,
+                                     'cursor': data['next']}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+        self.assertLessEqual({row['id'] for row in data['results']}, {card.id for card in self.cards})
+
+    def test_filters_match_catalog(self):
+        data = self.client.get(reverse('api_tag_cards', kwargs={'tag_id': self.tags[0].id}),
+                               {'fields': 'id', 'sort': 'views', 'order': 'asc', 'limit': 100}).json()
+        self.assertEqual(sorted(row['id'] for row in data['results']), [card.id for card in self.cards])
+
+        data = self.client.get(reverse('api_cards'), {'fields': 'id,category_name,author',
+                                                      'search_query': 'Вопрос 1'}).json()
+        self.assertTrue(data['results'])
+        self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_path_tag_wins_over_query_tag(self):
+        other = Tag.objects.create(name='other')
+        extra = create_cards(1, category=self.django, tags=[other])
+        url = reverse('api_tag_cards', kwargs={'tag_id': self.tags[0].id})
+        data = self.client.get(url, {'fields': 'id', 'tag': other.id, 'limit': 100}).json()
+        self.assertEqual(sorted(row['id'] for row in data['results']), [card.id for card in self.cards])
+        self.assertNotIn(extra[0].id, {row['id'] for row in data['results']})
+
+    def test_tags_and_categories(self):
+        data = self.client.get(reverse('api_tags')).json()
+        self.assertEqual(data['results'], [{'id': self.tags[0].id, 'name': 'orm', 'cards': 25},
+                                           {'id': self.tags[1].id, 'name': 'views', 'cards': 25}])
+        data = self.client.get(reverse('api_categories'), {'fields': 'name,cards'}).json()
+        self.assertEqual(data['results'], [{'name': 'Django', 'cards': 5}, {'name': 'Python', 'cards': 25}])
+
+    def test_etag_and_errors(self):
+        response = self.client.get(reverse('api_cards'), {'fields': 'id'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('api_cards'), {'fields': 'id'},
+                                             HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('api_cards'), {'fields': 'id,password'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_cards'), {'cursor': 'broken'}).status_code, 400)
+
+    def test_cursor_with_wrong_value_type_is_rejected(self):
+        for sort, value in (('views', 'abc'), ('adds', {'a': 1}), ('upload_date', 1), ('name', 1)):
+            with self.subTest(sort=sort, value=value):
+                url = reverse('api_tags') if sort == 'name' else reverse('api_cards')
+                response = self.client.get(url, {'sort': sort, 'cursor': encode_cursor((value, 1), 'next')})
+                self.assertEqual(response.status_code, 400)
+
+
+class TagAutocompleteTests(TestCase):
+    """Тестирование автодополнения тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        popular = Tag.objects.create(name='python')
+        rare = Tag.objects.create(name='pytest')
+        Tag.objects.create(name='pyramid')
+        Tag.objects.create(name='django')
+        create_cards(3, tags=[popular])
+        create_cards(1, tags=[rare])
+
+    def setUp(self):
+        cache.clear()
+        tag_index.clear()
+
+    def complete(self, prefix, **params):
+        response = self.client.get(reverse('tag_autocomplete'), {'q': prefix, **params})
+        return [row['name'] for row in response.json()['results']]
+
+    def test_ranked_by_usage(self):
+        self.assertEqual(self.complete('Py'), ['python', 'pytest', 'pyramid'])
+        self.assertEqual(self.complete('pyt'), ['python', 'pytest'])
+        self.assertEqual(self.complete('pyth', limit=1), ['python'])
+        self.assertEqual(self.complete('rust'), [])
+
+    def test_answers_from_memory(self):
+        self.complete('py')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('dj'), ['django'])
+            self.assertEqual(self.complete('pyr'), ['pyramid'])
+
+    def test_rebuilds_after_tag_changes(self):
+        self.complete('py')
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.resolve(['PyPI'])
+        self.assertIn('pypi', self.complete('pyp'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(name='pyramid').delete()
+        self.assertEqual(self.complete('pyr'), [])
+
+    @override_settings(TAG_INDEX_MAX_TAGS=2)
+    def test_memory_is_bounded(self):
+        self.assertEqual(self.complete(''), ['python', 'pytest'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], PAGE_CACHE_TIMEOUT=0)
+class ReplicaRouterTests(TestCase):
+    """Тестирование маршрутизации чтения на реплики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('author', password='password')
+        cls.category = Categories.objects.create(name='Python')
+
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        # Все тесты класса идут в одной транзакции TestCase - забываем записи предыдущих
+        token = db_router._written_transaction.set(None)
+        self.addCleanup(db_router._written_transaction.reset, token)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Card), 'replica')
+        self.assertEqual(self.router.db_for_read(Tag), 'replica')
+        self.assertIsNone(self.router.db_for_read(get_user_model()))
+        self.assertEqual(self.router.db_for_write(Card), 'default')
+        with db_router.use_primary():
+            self.assertIsNone(self.router.db_for_read(Card))
+        self.assertFalse(self.router.allow_migrate('replica', 'cards'))
+
+    def test_write_makes_browser_stick_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('add_card'), {
+            'question': 'Вопрос', 'answer': 'Ответ', 'category': self.category.id, 'tags': 'orm',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(db_router.STICKY_COOKIE, response.cookies)
+
+        # Реплики 'replica' в DATABASES нет: страница открывается только потому, что читаем с основной БД
+        card = Card.objects.using('default').get()
+        self.assertContains(self.client.get(reverse('detail_card_by_id', kwargs={'pk': card.pk})), 'Вопрос')
+        self.assertEqual(self.client.get(reverse('catalog')).status_code, 200)
+
+    def test_reads_after_write_in_transaction_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Tag), 'replica')
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Tag), 'replica')
+            self.router.db_for_write(Tag)
+            self.assertIsNone(self.router.db_for_read(Tag))
+            self.assertIsNone(self.router.db_for_read(Card))
+
+    def test_importer_rereads_created_rows_from_primary(self):
+        routed = []
+        db_for_read = db_router.ReplicaRouter.db_for_read
+
+        def record_read(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            routed.append((model, alias))
+            # Реплики 'replica' в DATABASES нет - читаем ту же тестовую БД
+            return 'default' if alias else alias
+
+        with patch.object(db_router.ReplicaRouter, 'db_for_read', record_read):
+            CardImporter().run([{'question': 'Вопрос', 'answer': 'Ответ', 'category': 'Новая',
+                                 'tags': ['newtag']}])
+        self.assertTrue(Card.objects.filter(tags__name='newtag', category__name='Новая').exists())
+        # Первые чтения пачки - до записи, перечитывание созданных категорий и тегов - с основной БД
+        self.assertEqual(routed[0], (Categories, 'replica'))
+        self.assertEqual([alias for model, alias in routed if model is Tag][-1], None)
+        self.assertEqual([alias for model, alias in routed if model is Categories][-1], None)
+
+    def test_sticky_window_expires(self):
+        self.client.cookies[db_router.STICKY_COOKIE] = '0'
+        state = {}
+
+        def remember_state(request):
+            state['replica'] = db_router.reads_from_replica()
+            return HttpResponse()
+
+        db_router.ReplicaStickinessMiddleware(remember_state)(RequestFactory().get('/'))
+        self.assertTrue(state['replica'])
+        request = RequestFactory().get('/')
+        request.COOKIES[db_router.STICKY_COOKIE] = str(time.time() + 60)
+        db_router.ReplicaStickinessMiddleware(remember_state)(request)
+        self.assertFalse(state['replica'])
+
+
+class SqliteSetupTests(TestCase):
+    """Тестирование настройки соединений SQLite."""
+
+    def test_pragmas_are_applied(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            # 1 - NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    @override_settings(SQLITE_BUSY_RETRY_DELAY=0)
+    def test_busy_transaction_is_retried(self):
+        attempts = []
+
+        @retry_on_busy(atomic=False)
+        def write():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(write(), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+        @retry_on_busy(atomic=False, attempts=2)
+        def always_locked():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            always_locked()
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class BenchmarkTests(TestCase):
+    """Тестирование генератора данных и сценариев команды bench."""
+
+    def test_dataset_and_scenarios(self):
+        dataset = generate_dataset(users=3, categories=2, tags=20, cards=60)
+        self.assertEqual(dataset['cards'], 60)
+        self.assertEqual(Card.objects.count(), 60)
+        # степенной закон: самый популярный тег встречается чаще, чем в среднем
+        usage = sorted(counters.tag_counts(list(Tag.objects.values_list('id', flat=True))).values())
+        self.assertGreater(usage[-1], sum(usage) / len(usage))
+
+        results = run_scenarios(iterations=2, names=['catalog_views_desc', 'catalog_search', 'add_card'])
+        self.assertEqual(set(results), {'catalog_views_desc', 'catalog_search', 'add_card'})
+        self.assertEqual(results['catalog_views_desc']['iterations'], 2)
+        self.assertGreater(results['add_card']['queries_per_request'], 0)
+
+
+class MetricsTests(TestCase):
+    """Тестирование метрик запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_cards(5)
+        cls.staff = get_user_model().objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def scrape(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.client.logout()
+        return response
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_request_is_measured_by_view_name(self):
+        self.client.get(reverse('catalog'))
+        self.client.get(reverse('catalog'))
+        text = self.scrape().content.decode()
+        self.assertIn('django_request_seconds_count{view="catalog"} 2', text)
+        self.assertIn('django_request_sql_queries_bucket{view="catalog",le="+Inf"} 2', text)
+        self.assertIn('django_request_template_seconds_count{view="catalog"} 2', text)
+        self.assertIn('django_responses_total{view="catalog",status="200"} 2', text)
+        self.assertIn('django_cache_misses_total{view="catalog",cache="card_preview"} 5', text)
+        self.assertIn('django_cache_hits_total{view="catalog",cache="card_preview"} 5', text)
+
+    def test_sql_time_and_templates(self):
+        self.client.get(reverse('about'))
+        histograms = metrics.registry.histograms
+        labels = (('view', 'about'),)
+        # единственный запрос - COUNT для меню (кеш очищен)
+        self.assertEqual(histograms['django_request_sql_queries'][labels].sum, 1)
+        self.assertGreater(histograms['django_request_template_seconds'][labels].sum, 0)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        self.client.get(reverse('about'))
+        self.assertFalse(metrics.registry.histograms['django_request_seconds'])
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0.001, PAGE_CACHE_TIMEOUT=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('anki.metrics', 'WARNING') as logs:
+            self.client.get(reverse('catalog'))
+        self.assertIn('SELECT', logs.output[0])
+
+
+class CardAdminLargeTableTests(QueryBudgetMixin, TestCase):
+    """Тестирование режима больших таблиц в админке карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_cards(5)
+        cls.admin = get_user_model().objects.create_superuser('admin', password='password')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_without_filters_uses_counter(self):
+        counters.reconcile()
+        paginator = CardPaginator(Card.objects.order_by('pk'), 10)
+        with self.assertQueryBudget(0):
+            self.assertEqual(paginator.count, 5)
+
+    def test_filtered_count_is_capped(self):
+        paginator = CardPaginator(Card.objects.filter(check_status=False).order_by('pk'), 2)
+        paginator.max_count = 3
+        self.assertEqual(paginator.count, 3)
+
+    def test_update_check_status_in_chunks(self):
+        counters.reconcile()
+        # 5 карточек пачками по 2: три пачки, в каждой выборка id и UPDATE в транзакции
+        with self.captureOnCommitCallbacks(execute=True), self.assertQueryBudget(3 * 4 + 1):
+            updated = update_check_status(Card.objects.all(), True, chunk_size=2)
+        self.assertEqual(updated, 5)
+        self.assertEqual(Card.objects.filter(check_status=True).count(), 5)
+        self.assertEqual(counters.checked(), 5)
+        self.assertEqual(counters.unchecked(), 0)
+
+    def test_update_check_status_bumps_caches(self):
+        card = Card.objects.order_by('pk').first()
+        generation = page_cache.get_generation()
+        version = fragment_cache.get_versions([card.pk])[card.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            update_check_status(Card.objects.all(), True, chunk_size=2)
+        self.assertNotEqual(page_cache.get_generation(), generation)
+        self.assertNotEqual(fragment_cache.get_versions([card.pk])[card.pk], version)
+
+    def test_changelist_filters_by_check_status(self):
+        Card.objects.filter(pk=Card.objects.first().pk).update(check_status=True)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:cards_card_changelist'), {'status_check': 'check'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(reverse('admin:cards_card_changelist'), {'status_check': 'not check'})
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    def test_check_status_filter_shows_counters(self):
+        counters.reconcile()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:cards_card_changelist'))
+        self.assertContains(response, 'Проверено (0)')
+        self.assertContains(response, 'Не проверено (5)')
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class TagBrowsingTests(QueryBudgetMixin, TestCase):
+    """Тестирование просмотра карточек по нескольким тегам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python, cls.django, cls.sql = [Tag.objects.create(name=name) for name in ('python', 'django', 'sql')]
+        cls.both = create_cards(3, tags=[cls.python, cls.django])
+        cls.only_python = create_cards(2, tags=[cls.python])
+        cls.only_sql = create_cards(1, tags=[cls.sql])
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, cards):
+        return sorted(card.pk for card in cards)
+
+    def test_find_cards_and_or(self):
+        self.assertEqual(list(tag_postings.find_cards([self.python.id, self.django.id])), self.ids(self.both))
+        self.assertEqual(list(tag_postings.find_cards([self.django.id, self.sql.id], 'or')),
+                         self.ids(self.both + self.only_sql))
+        self.assertEqual(list(tag_postings.find_cards([self.django.id, self.sql.id])), [])
+
+    def test_postings_are_cached(self):
+        tag_postings.find_cards([self.python.id, self.django.id])
+        with self.assertQueryBudget(0):
+            tag_postings.find_cards([self.python.id, self.django.id])
+
+    def test_card_tag_changes_invalidate_only_their_tag(self):
+        tag_postings.get_postings([self.python.id, self.sql.id])
+        card = self.only_python[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            card.tags.add(self.django)
+        self.assertIsNone(cache.get(tag_postings.postings_key(self.django.id)))
+        self.assertIsNotNone(cache.get(tag_postings.postings_key(self.python.id)))
+        self.assertIn(card.pk, tag_postings.find_cards([self.python.id, self.django.id]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card.tags.remove(self.django)
+        self.assertNotIn(card.pk, tag_postings.find_cards([self.python.id, self.django.id]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card.delete()
+        self.assertNotIn(card.pk, tag_postings.find_cards([self.python.id]))
+        self.assertIsNotNone(cache.get(tag_postings.postings_key(self.sql.id)))
+
+    @override_settings(CARD_PREVIEW_CACHE_TIMEOUT=0)
+    def test_view_paginates_newest_first(self):
+        url = reverse('cards_by_tag', kwargs={'tag_id': self.python.id})
+        with patch.object(TagCardsView, 'paginate_by', 2):
+            response = self.client.get(url)
+            self.assertEqual([card.pk for card in response.context['cards']],
+                             self.ids(self.both + self.only_python)[::-1][:2])
+            self.assertEqual(response.context['found_count'], 5)
+            pages = [response.context['cards']]
+            while response.context['page_obj'].has_next():
+                response = self.client.get(url, {'cursor': response.context['page_obj'].next_cursor})
+                pages.append(response.context['cards'])
+            self.assertEqual(sorted(card.pk for page in pages for card in page), self.ids(self.both + self.only_python))
+
+            response = self.client.get(url, {'cursor': response.context['page_obj'].previous_cursor})
+            self.assertEqual(response.context['cards'], pages[-2])
+
+    def test_view_combines_tags(self):
+        response = self.client.get(reverse('cards_by_tags'), {'tag': [self.django.id, self.sql.id], 'mode': 'or'})
+        self.assertEqual(self.ids(response.context['cards']), self.ids(self.both + self.only_sql))
+        self.assertEqual(response.context['tags'], [self.django, self.sql])
+        self.assertContains(response, 'со всеми тегами')
+
+    def test_view_without_tags(self):
+        self.assertEqual(self.client.get(reverse('cards_by_tags')).status_code, 404)
+        self.assertEqual(self.client.get(reverse('cards_by_tags'), {'tag': 'abc'}).status_code, 404)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class RelatedCardsTests(QueryBudgetMixin, TestCase):
+    """Тестирование похожих карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Categories.objects.create(name='Python')
+        cls.sql = Categories.objects.create(name='SQL')
+        cls.a, cls.b, cls.c, cls.d = [Tag.objects.create(name=name) for name in 'abcd']
+        cls.card = create_cards(1, category=cls.python, tags=[cls.a, cls.b])[0]
+        # тот же набор тегов, но другая категория
+        cls.same_tags = create_cards(1, category=cls.sql, tags=[cls.a, cls.b])[0]
+        # один общий тег из трех и та же категория
+        cls.same_category = create_cards(1, category=cls.python, tags=[cls.a, cls.c, cls.d])[0]
+        cls.unrelated = create_cards(1, category=cls.python, tags=[cls.d])[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_neighbours_ranked_by_jaccard_and_category(self):
+        related.build()
+        links = list(RelatedCard.objects.filter(card=self.card).order_by('-score').values_list('related_id', 'score'))
+        self.assertEqual([pk for pk, _ in links], [self.same_tags.pk, self.same_category.pk])
+        self.assertAlmostEqual(links[0][1], 1)
+        self.assertAlmostEqual(links[1][1], 1 / 4 + related.CATEGORY_BONUS)
+
+    def test_popular_tags_still_count_in_score(self):
+        profiles = related.load_profiles()
+        postings = tag_postings.get_postings([self.a.id, self.b.id])
+        neighbours = related.find_neighbours(self.card.pk, [self.a.id, self.b.id], postings, profiles, max_tag_cards=1)
+        # тег a длиннее лимита: кандидаты только из его последней карточки, но общий тег a учтен
+        self.assertEqual(neighbours[0], (1.0, self.same_tags.pk))
+
+    def test_rebuild_replaces_links(self):
+        related.build(top_k=1)
+        self.assertEqual(RelatedCard.objects.filter(card=self.card).count(), 1)
+        self.card.tags.remove(self.a)
+        related.build([self.card.pk])
+        self.assertEqual(list(RelatedCard.objects.filter(card=self.card).values_list('related_id', flat=True)),
+                         [self.same_tags.pk])
+
+    def test_incremental_command_builds_only_stale_cards(self):
+        related.build([self.card.pk])
+        self.assertEqual(set(related.stale_card_ids()), {self.same_tags.pk, self.same_category.pk, self.unrelated.pk})
+        call_command('build_related_cards', '--incremental', stdout=io.StringIO())
+        self.assertEqual(set(related.stale_card_ids()), set())
+
+    def test_incremental_command_updates_neighbours_of_new_card(self):
+        related.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            new_card = create_cards(1, category=self.python, tags=[self.a, self.b])[0]
+        call_command('build_related_cards', '--incremental', stdout=io.StringIO())
+        # новая карточка с теми же тегами и категорией - самая похожая на card
+        self.assertEqual(related.get_related(self.card)[0], new_card)
+        self.assertEqual(related.affected_card_ids([self.unrelated.pk]),
+                         {self.unrelated.pk, self.same_category.pk})
+
+    def test_incremental_expansion_is_bounded_for_popular_tags(self):
+        popular = Tag.objects.create(name='popular')
+        cards = create_cards(5, category=self.python, tags=[popular])
+        # у тега больше max_tag_cards карточек - пересчитываются только две последние
+        self.assertEqual(related.affected_card_ids([cards[0].pk], max_tag_cards=2),
+                         {cards[0].pk, cards[3].pk, cards[4].pk})
+        self.assertEqual(related.affected_card_ids([self.unrelated.pk], max_tag_cards=2),
+                         {self.unrelated.pk, self.same_category.pk})
+
+    def test_detail_page_shows_related_cards(self):
+        related.build()
+        with self.assertQueryBudget(1):
+            cards = related.get_related(self.card)
+        self.assertEqual(cards, [self.same_tags, self.same_category])
+        response = self.client.get(reverse('detail_card_by_id', kwargs={'pk': self.card.pk}))
+        self.assertContains(response, 'Похожие карточки')
+        self.assertEqual(response.context['related_cards'], cards)
+
+
+class DuplicateDetectionTests(QueryBudgetMixin, TestCase):
+    """Тестирование поиска похожих вопросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categories.objects.create(name='Python')
+        cls.card = Card.objects.create(question='Что такое декоратор в Python?', answer='Ответ', category=cls.category)
+        cls.other = Card.objects.create(question='Как работает сборщик мусора?', answer='Ответ', category=cls.category)
+
+    def card_form(self, question, **data):
+        return CardForm({'question': question, 'answer': 'Ответ', 'category': self.category.pk, **data})
+
+    def test_similar_question_found_by_buckets(self):
+        self.assertEqual(CardLshBucket.objects.filter(card=self.card).count(), duplicates.BANDS)
+        with self.assertQueryBudget(1):
+            similar = duplicates.find_similar('что такое декораторы в python')
+        self.assertEqual(similar, [self.card])
+        self.assertGreater(similar[0].similarity, duplicates.THRESHOLD)
+        self.assertEqual(duplicates.find_similar('Что такое генератор?'), [])
+
+    def test_candidates_with_more_shared_buckets_come_first(self):
+        # карточки, совпавшие с вопросом только в одной полосе, не вытесняют настоящий дубль
+        decoys = create_cards(3, category=self.category)
+        card = Card.objects.create(question='Как устроен итератор в Python?', answer='Ответ', category=self.category)
+        bucket = CardLshBucket.objects.filter(card=card).order_by('bucket').values_list('bucket', flat=True)[0]
+        CardLshBucket.objects.bulk_create(CardLshBucket(card=decoy, bucket=bucket) for decoy in decoys)
+        with patch('cards.duplicates.MAX_CANDIDATES', 1):
+            self.assertEqual(duplicates.find_similar('Как устроен итератор в Python?'), [card])
+
+    def test_buckets_follow_question_changes(self):
+        self.card.question = 'Зачем нужен GIL?'
+        self.card.save()
+        self.assertEqual(duplicates.find_similar('Что такое декоратор в Python?'), [])
+        self.assertEqual(duplicates.find_similar('Зачем нужен GIL'), [self.card])
+
+        # без изменения вопроса корзины не переписываются
+        card = Card.objects.get(pk=self.other.pk)
+        card.views = 10
+        with CaptureQueriesContext(connections['default']) as captured:
+            card.save()
+        self.assertFalse([query for query in captured if 'CardLshBuckets' in query['sql']])
+
+    def test_form_warns_and_accepts_confirmation(self):
+        form = self.card_form('Что такое декоратор в Python')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['question'][0].code, 'duplicate')
+        self.assertEqual(form.duplicates, [self.card])
+        self.assertIn('type="checkbox"', str(form['confirm_duplicate']))
+
+        form = self.card_form('Что такое декоратор в Python', confirm_duplicate='on')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertTrue(self.card_form('Что такое итератор и генератор?').is_valid())
+
+    def test_add_card_page_lists_duplicates(self):
+        user = get_user_model().objects.create_user('author', password='password')
+        self.client.force_login(user)
+        response = self.client.post(reverse('add_card'), {
+            'question': 'Что такое декоратор в Python?!', 'answer': 'Ответ', 'category': self.category.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('detail_card_by_id', kwargs={'pk': self.card.pk}))
+
+    def test_import_indexes_cards(self):
+        CardImporter().run([{'question': 'Что такое декоратор в Python', 'answer': 'a', 'category': 'Python',
+                             'tags': []}])
+        imported = Card.objects.get(question='Что такое декоратор в Python')
+        self.assertEqual(CardLshBucket.objects.filter(card=imported).count(), duplicates.BANDS)
+
+    def test_command_clusters_duplicates(self):
+        copy = Card.objects.create(question='Что такое декоратор в python', answer='Ответ', category=self.category)
+        Card.objects.create(question='Как работает сборщик мусора', answer='Ответ', category=self.category)
+        CardLshBucket.objects.all().delete()
+        out = io.StringIO()
+        call_command('find_duplicate_cards', '--rebuild', stdout=out)
+        self.assertIn('Найдено групп дублей: 2', out.getvalue())
+        self.assertIn([self.card.pk, copy.pk], duplicates.find_clusters())
+
+
+@override_settings(ROOT_URLCONF='anki.async_urls', PAGE_CACHE_TIMEOUT=0, CARD_VIEWS_FLUSH_INTERVAL=0)
+class AsyncViewsTests(TestCase):
+    """Тестирование асинхронных представлений (маршруты anki.async_urls)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python, cls.django = Tag.objects.create(name='python'), Tag.objects.create(name='django')
+        cls.both = create_cards(3, tags=[cls.python, cls.django])
+        cls.only_python = create_cards(2, tags=[cls.python])
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def test_async_urlconf_routes_hot_paths_to_async_views(self):
+        self.assertIs(resolve('/cards/catalog/').func.view_class, async_views.AsyncCatalogView)
+        self.assertIs(resolve('/cards/api/cards/').func.view_class, async_views.AsyncCardListApiView)
+        # Остальные страницы - прежние синхронные представления
+        self.assertEqual(resolve('/cards/add_card/').url_name, 'add_card')
+
+    async def test_catalog_matches_sync_view(self):
+        response = await self.async_client.get(reverse('catalog'), {'sort': 'upload_date', 'order': 'asc'})
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, "Карточка 1")
+        ids = [card.pk for card in response.context['cards']]
+        self.assertEqual(ids, [card.pk for card in self.both + self.only_python])
+        self.assertEqual(response.context['cards_count'], 5)
+        self.assertEqual(response.context['sort'], 'upload_date')
+
+    async def test_catalog_search_highlights_page_snippets(self):
+        response = await self.async_client.get(reverse('catalog'), {'search_query': 'Ответ'})
+        self.assertEqual(len(response.context['cards']), 5)
+        self.assertContains(response, '<mark>Ответ</mark>', count=5)
+
+    async def test_card_detail_counts_view(self):
+        card = self.both[0]
+        response = await self.async_client.get(reverse('detail_card_by_id', kwargs={'pk': card.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['card'], card)
+        self.assertEqual((await Card.objects.aget(pk=card.pk)).views, 1)
+        missing = await self.async_client.get(reverse('detail_card_by_id', kwargs={'pk': 10 ** 6}))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_tag_cards_and_mode(self):
+        response = await self.async_client.get(reverse('cards_by_tags'),
+                                               {'tag': [self.python.id, self.django.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(card.pk for card in response.context['cards']), [card.pk for card in self.both])
+        self.assertEqual(response.context['found_count'], 3)
+
+    async def test_card_api_matches_sync_view(self):
+        params = {'fields': 'id,question,tags', 'limit': 2, 'order': 'asc'}
+        response = await self.async_client.get(reverse('api_cards'), params)
+        with override_settings(ROOT_URLCONF='anki.urls'):
+            expected = (await sync_to_async(self.client.get)(reverse('api_cards'), params)).json()
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(response.json()['results'][0]['tags'], ['django', 'python'])
+        bad = await self.async_client.get(reverse('api_tags'), {'fields': 'nope'})
+        self.assertEqual(bad.status_code, 400)
+        bad = await self.async_client.get(reverse('api_cards'), {'sort': 'views',
+                                                                 'cursor': encode_cursor(('abc', 1), 'next')})
+        self.assertEqual(bad.status_code, 400)
+
+    async def test_metrics_count_sql_of_async_view(self):
+        await self.async_client.get(reverse('catalog'))
+        histogram = metrics.registry.histograms['django_request_sql_queries'][(('view', 'catalog'),)]
+        self.assertEqual(histogram.count, 1)
+        self.assertGreater(histogram.sum, 0)
+
+    async def test_async_outbox_drain(self):
+        await Notification.objects.acreate(message='Вопрос 1')
+        self.assertEqual(await adrain_outbox(StubNotifier(fail=True)), 0)
+        notification = await Notification.objects.aget()
+        self.assertEqual(notification.attempts, 1)
 
-    def test_category_route(self):
-        """Проверка маршрута для получения карточек по категории."""
+        notifier = StubNotifier()
+        self.assertEqual(await adrain_outbox(notifier, now=notification.next_attempt_at), 1)
+        self.assertEqual(notifier.sent, ['Вопрос 1'])
+        self.assertFalse(await Notification.objects.filter(sent_at__isnull=True).aexists())
 
-        response = self.client.get('/cards/catalog/some-category-slug/')
+
+class StaticFilesTests(TestCase):
+    """Тестирование сборки статики с хешами и сжатыми копиями."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        override = override_settings(STATIC_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        url = static('admin/css/base.css')
+        self.assertRegex(url, r'^/static/admin/css/base\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, url.removeprefix('/static/'))
+        with open(path, 'rb') as file, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), file.read())
+        # Пустой файл не сжимается
+        main_js = os.path.join(self.root, static('cards/js/main.js').removeprefix('/static/'))
+        self.assertFalse(os.path.exists(main_js + '.gz'))
+
+    def test_serve_picks_precompressed_variant(self):
+        url = static('admin/css/base.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+
+        plain = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(plain.streaming_content), body)
+
+    def test_serve_unhashed_and_missing_files(self):
+        response = self.client.get('/static/admin/css/base.css')
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, "Категория some-category-slug")
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/static/admin/css/nope.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get(static('admin/css/base.css') + '.gz').status_code, 404)
+
+    def test_pages_link_hashed_assets(self):
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, static('cards/css/style.css'))
+        self.assertNotContains(response, '/static/cards/css/style.css"')
+
@@ -1,10 +1,19 @@
 from django.contrib import admin
 from django.urls import path
-from cards import views
+from cards import api, views
 
 urlpatterns = [
     path('catalog/', views.CatalogView.as_view(), name='catalog'),
     path('<int:pk>/detail/', views.CardDetailView.as_view(), name='detail_card_by_id'),
-    path('tags/<int:tag_id>/', views.get_cards_by_tag, name='cards_by_tag'),
+    path('tags/', views.TagCardsView.as_view(), name='cards_by_tags'),
+    path('tags/<int:tag_id>/', views.TagCardsView.as_view(), name='cards_by_tag'),
     path('add_card/', views.AddCardCreateView.as_view(), name='add_card'),
+    path('export/', views.export_cards, name='export_cards'),
+    path('review/due/', views.ReviewDueView.as_view(), name='review_due'),
+    path('review/submit/', views.ReviewSubmitView.as_view(), name='review_submit'),
+    path('api/cards/', api.CardListApiView.as_view(), name='api_cards'),
+    path('api/tags/', api.TagListApiView.as_view(), name='api_tags'),
+    path('api/tags/autocomplete/', api.TagAutocompleteView.as_view(), name='tag_autocomplete'),
+    path('api/tags/<int:tag_id>/cards/', api.CardListApiView.as_view(), name='api_tag_cards'),
+    path('api/categories/', api.CategoryListApiView.as_view(), name='api_categories'),
 ]
@@ -0,0 +1,133 @@
+"""
+Буферизованный счетчик просмотров карточек.
+
+Вместо UPDATE на каждый просмотр приращения копятся в памяти процесса и
+раз в CARD_VIEWS_FLUSH_INTERVAL секунд записываются одним UPDATE фоновым
+потоком. При штатном завершении процесса остаток сбрасывается через atexit.
+Если интервал равен 0, буфер отключен и каждый просмотр пишется сразу.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+from anki.sqlite_setup import retry_on_busy
+from .models import Card
+
+logger = logging.getLogger(__name__)
+
+# Сколько карточек обновлять одним UPDATE (ограничение числа параметров SQLite)
+FLUSH_CHUNK_SIZE = 500
+
+
+@retry_on_busy
+def write_views(items):
+    """
+    Прибавляет просмотры [(id карточки, приращение), ...] одним UPDATE на пачку.
+    Транзакция повторяется, если SQLite занят другим писателем
+    """
+    for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+        chunk = items[start:start + FLUSH_CHUNK_SIZE]
+        delta = Case(*(When(pk=card_id, then=Value(amount)) for card_id, amount in chunk),
+                     output_field=IntegerField())
+        Card.objects.filter(pk__in=[card_id for card_id, _ in chunk]).update(views=F('views') + delta)
+
+
+class ViewCounter:
+    """
+    Накопитель приращений просмотров {id карточки: число просмотров}
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def get_interval():
+        return getattr(settings, 'CARD_VIEWS_FLUSH_INTERVAL', 5)
+
+    def increment(self, card_id, amount=1):
+        if not self.get_interval():
+            # Одиночный UPDATE вне транзакции: блокировку дождется busy_timeout
+            Card.objects.filter(pk=card_id).update(views=F('views') + amount)
+            return
+        with self._lock:
+            self._pending[card_id] = self._pending.get(card_id, 0) + amount
+        self._ensure_flusher()
+
+    async def aincrement(self, card_id, amount=1):
+        """
+        increment для асинхронных представлений: без буфера UPDATE идет через асинхронный ORM
+        """
+        if not self.get_interval():
+            await Card.objects.filter(pk=card_id).aupdate(views=F('views') + amount)
+            return
+        self.increment(card_id, amount)
+
+    def pending(self, card_id):
+        return self._pending.get(card_id, 0)
+
+    def apply_pending(self, cards):
+        """
+        Добавляет к просмотрам карточек еще не записанные приращения
+        """
+        if not self._pending:
+            return cards
+        for card in cards:
+            card.views += self._pending.get(card.pk, 0)
+        return cards
+
+    def flush(self):
+        """
+        Записывает накопленные приращения, возвращает число обновленных карточек.
+        При ошибке приращения возвращаются в буфер и будут записаны позже
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        items = list(pending.items())
+        try:
+            write_views(items)
+        except Exception:
+            logger.exception('Не удалось записать просмотры карточек, повторим позже')
+            with self._lock:
+                for card_id, amount in items:
+                    self._pending[card_id] = self._pending.get(card_id, 0) + amount
+            return 0
+        return len(items)
+
+    def discard(self):
+        with self._lock:
+            self._pending.clear()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name='card-views-flusher', daemon=True)
+            self._flusher.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.wait(self.get_interval() or 1):
+            self.flush()
+            # У потока свое подключение к БД, не держим его открытым между сбросами
+            connection.close()
+
+    def shutdown(self):
+        """
+        Останавливает фоновый поток и записывает остаток буфера
+        """
+        self._stopped.set()
+        self.flush()
+
+
+view_counter = ViewCounter()
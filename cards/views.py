@@ -1,15 +1,21 @@
+import json
 from datetime import datetime
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.postgres.search import SearchVector
-from django.core.cache import cache
-from django.db.models import Q, F
-from django.http import HttpResponse, Http404
+from django.db.models import Q, F, prefetch_related_objects
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.http import urlencode
 from django.views import View
+from anki import db_router
+from . import counters, exporters, related, scheduler, search, tag_postings
 from .models import Card, Tag
+from .page_cache import PageCacheMixin
 from .forms import CardForm, SearchForm
+from .pagination import CursorPaginator, IdListPaginator, InvalidCursor
+from .view_counter import view_counter
 from django.views.generic import TemplateView, ListView, DetailView, CreateView
 
 info = {
@@ -36,120 +42,238 @@ class MenuMixin:
 
     @staticmethod
     def get_cards_count():
-        cards_count = cache.get('cards_count')
-        if not cards_count:
-            cards_count = Card.objects.count()
-            cache.set('cards_count', cards_count)
+        # Счетчик поддерживается сигналами, COUNT(*) выполняется только при пустом кеше
+        return counters.total()
 
-        return cards_count
 
-
-class IndexView(MenuMixin, TemplateView):
+class IndexView(PageCacheMixin, MenuMixin, TemplateView):
     """
     Класс для главной страницы
     """
     template_name = 'main.html'
 
 
-class AboutView(MenuMixin, TemplateView):
+class AboutView(PageCacheMixin, MenuMixin, TemplateView):
     """
     Класс страницы "О проекте"
     """
     template_name = 'about.html'
 
 
-class CatalogView(MenuMixin, ListView):
+class CatalogQueryMixin:
+    """
+    Параметры каталога и запрос карточек, общие для синхронного и асинхронного
+    (cards.async_views) представлений
+    """
+    paginate_by = 30  # Количество объектов на странице
+    # Допустимые поля сортировки (значение параметра sort -> поле модели)
+    sort_fields = {
+        'upload_date': 'upload_date',
+        'views': 'views',
+        'adds': 'adds',
+        'favorites': 'adds',
+    }
+    # GET-параметры, от которых зависит страница (ключ кеша страниц)
+    page_cache_params = ('sort', 'order', 'search_query', 'cursor', 'category', 'tag')
+
+    def get_search_query(self):
+        return self.request.GET.get('search_query', '').strip()
+
+    def use_full_text_search(self):
+        return bool(self.get_search_query()) and search.is_available()
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort')
+        # При полнотекстовом поиске по умолчанию сортируем по релевантности
+        if self.use_full_text_search() and sort in (None, 'relevance'):
+            return 'relevance'
+        # Неизвестное поле сортировки заменяем сортировкой по дате загрузки
+        return sort if sort in self.sort_fields else 'upload_date'
+
+    def get_sort_field(self):
+        sort = self.get_sort()
+        if sort == 'relevance':
+            return 'search_rank'
+        return self.sort_fields[sort]
+
+    def get_order(self):
+        return 'asc' if self.request.GET.get('order') == 'asc' else 'desc'
+
+    # Метод для модификации начального запроса к БД
+    def get_queryset(self):
+        # Фильтрация карточек по поисковому запросу (на SQLite - через индекс FTS5),
+        # категории и тегу. Сортировку выполняет курсорный пагинатор (см. paginate_queryset)
+        queryset = search.filter_cards(
+            Card.objects.all(),
+            search_query=self.get_search_query(),
+            category=search.parse_id(self.request.GET.get('category')),
+            tag=search.parse_id(self.request.GET.get('tag')),
+        )
+        # Категория, автор и теги нужны шаблону превью - забираем их заранее,
+        # чтобы не делать по запросу на каждую карточку
+        return queryset.select_related('category', 'author').prefetch_related('tags')
+
+    def get_cursor_paginator(self, page_size):
+        return CursorPaginator(page_size, self.get_sort_field(), descending=self.get_order() == 'desc',
+                               datetime_fields=('upload_date',))
+
+    def get_snippets(self, cards):
+        # Запрос (id, сниппет) для карточек страницы, без полнотекстового поиска - пустой
+        if not (self.use_full_text_search() and cards):
+            return Card.objects.none()
+        return search.snippets(Card.objects.all(), [card.pk for card in cards], self.get_search_query())
+
+    def prepare_page(self, page, snippets=()):
+        view_counter.apply_pending(page.object_list)
+        snippets = dict(snippets)
+        for card in page.object_list:
+            if card.pk in snippets:
+                card.search_snippet = search.highlight(snippets[card.pk])
+
+    def get_catalog_context(self):
+        return {
+            'sort': self.get_sort(),
+            'order': self.get_order(),
+            'search_query': self.get_search_query(),
+            'full_text_search': self.use_full_text_search(),
+        }
+
+
+class CatalogView(CatalogQueryMixin, PageCacheMixin, MenuMixin, ListView):
     """
     Класс для каталога карточек
     """
     model = Card  # Указываем модель, данные которой мы хотим отобразить
     template_name = 'cards/catalog.html'  # Путь к шаблону, который будет использоваться для отображения страницы
     context_object_name = 'cards'  # Имя переменной контекста, которую будем использовать в шаблоне
-    paginate_by = 30  # Количество объектов на странице
 
-    # Метод для модификации начального запроса к БД
-    def get_queryset(self):
-        # Получение параметров сортировки из GET-запроса
-        sort = self.request.GET.get('sort', 'upload_date')
-        order = self.request.GET.get('order', 'desc')
-        search_query = self.request.GET.get('search_query', '')
-
-        # Определение направления сортировки
-        if order == 'asc':
-            order_by = sort
-        else:
-            order_by = f'-{sort}'
-
-        # Фильтрация карточек по поисковому запросу и сортировка
-        if search_query:
-            queryset = Card.objects.filter(
-                Q(question__icontains=search_query) |
-                Q(answer__icontains=search_query) |
-                Q(tags__name__icontains=search_query)
-            ).distinct().order_by(order_by)
-        else:
-            queryset = Card.objects.all().order_by(order_by)
-        return queryset
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Курсорная пагинация вместо OFFSET + COUNT(*): страница выбирается
+        по значению (sort, id) последней карточки предыдущей страницы
+        """
+        paginator = self.get_cursor_paginator(page_size)
+        try:
+            page = paginator.paginate(queryset, self.request.GET.get('cursor'))
+        except InvalidCursor:
+            # Поврежденный курсор - показываем первую страницу
+            page = paginator.paginate(queryset)
+        self.prepare_page(page, self.get_snippets(page.object_list))
+        return paginator, page, page.object_list, page.has_other_pages()
 
     # Метод для добавления дополнительного контекста
     def get_context_data(self, **kwargs):
         # Получение существующего контекста из базового класса
         context = super().get_context_data(**kwargs)
         # Добавление дополнительных данных в контекст
-        context['sort'] = self.request.GET.get('sort', 'upload_date')
-        context['order'] = self.request.GET.get('order', 'desc')
-        context['search_query'] = self.request.GET.get('search_query', '')
-        context['cards_count'] = self.get_cards_count()
+        context.update(self.get_catalog_context())
         return context
 
-    @staticmethod
-    def get_cards_count():
-        cards_count = cache.get('cards_count')
-        if not cards_count:
-            cards_count = Card.objects.count()
-            cache.set('cards_count', cards_count)
-
-        return cards_count
 
-
-class CardDetailView(MenuMixin, DetailView):
+class CardDetailView(PageCacheMixin, MenuMixin, DetailView):
     """
     Класс для детального отображения карточек
     """
     model = Card  # Указываем, что моделью для этого представления является Card
     template_name = 'cards/card_detail.html'  # Указываем путь к шаблону для детального отображения карточки
     context_object_name = 'card'  # Переопределяем имя переменной в контексте шаблона на 'card'
+    queryset = Card.objects.select_related('category').prefetch_related('tags')
 
     # Метод для добавления дополнительных данных в контекст шаблона
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)  # Получаем исходный контекст от базового класса
         context['menu'] = info['menu']  # Добавляем в контекст информацию о меню
         context['title'] = f'Карточка: {context["card"].question}'  # Добавляем заголовок страницы
+        # Похожие карточки посчитаны заранее командой build_related_cards
+        context['related_cards'] = related.get_related(context['card'])
         return context
 
     # Метод для обновления счетчика просмотров при каждом отображении детальной страницы карточки
     def get_object(self, queryset=None):
         # Получаем объект с учетом переданных в URL параметров (в данном случае, pk или id карточки)
-        obj = super().get_object(queryset=queryset)
-        # Увеличиваем счетчик просмотров на 1 с помощью F-выражения для избежания гонки условий
-        Card.objects.filter(pk=obj.pk).update(views=F('views') + 1)
+        try:
+            obj = super().get_object(queryset=queryset)
+        except Http404:
+            # Новая карточка могла еще не дойти до реплики - проверяем основную БД
+            if not db_router.reads_from_replica():
+                raise
+            with db_router.use_primary():
+                obj = super().get_object(queryset=queryset)
+        # Просмотр попадает в буфер и будет записан в БД пачкой (см. cards.view_counter),
+        # а на странице показываем число просмотров с учетом еще не записанных
+        view_counter.increment(obj.pk)
+        view_counter.apply_pending([obj])
         return obj
 
+    def page_cache_hit(self, request, *args, **kwargs):
+        # Страница отдана из кеша, но просмотр все равно считаем
+        view_counter.increment(kwargs['pk'])
+
 
-def get_cards_by_tag(request, tag_id):
+class TagBrowseMixin:
     """
-    Возвращает карточки по тегу для представления в каталоге
+    Разбор тегов и режима, пагинация и контекст страницы карточек по тегам,
+    общие для синхронного и асинхронного (cards.async_views) представлений
+    """
+    template_name = 'cards/tag_cards.html'
+    paginate_by = 30
+    max_tags = 10
+    page_cache_params = ('tag', 'mode', 'cursor')
+    queryset = Card.objects.select_related('category', 'author')
+
+    def get_tag_ids(self):
+        values = self.request.GET.getlist('tag')
+        if 'tag_id' in self.kwargs:
+            values.insert(0, self.kwargs['tag_id'])
+        tag_ids = list(dict.fromkeys(pk for pk in map(search.parse_id, values) if pk is not None))
+        if not tag_ids:
+            raise Http404('Не выбран ни один тег')
+        return tag_ids[:self.max_tags]
+
+    def get_mode(self):
+        return tag_postings.MODE_OR if self.request.GET.get('mode') == 'or' else tag_postings.MODE_AND
+
+    def paginate_ids(self, found):
+        paginator = IdListPaginator(self.paginate_by)
+        try:
+            return paginator.paginate(found, self.request.GET.get('cursor'))
+        except InvalidCursor:
+            return paginator.paginate(found)
+
+    def get_tag_context(self, found, page, cards, tags, tag_ids, mode):
+        # Карточки страницы в порядке списка id
+        cards = [cards[pk] for pk in page.object_list if pk in cards]
+        view_counter.apply_pending(cards)
+        page.object_list = cards
+        return {
+            'menu': info['menu'],
+            'cards': cards,
+            'page_obj': page,
+            'tags': [tags[pk] for pk in tag_ids if pk in tags],
+            'mode': mode,
+            'found_count': len(found),
+            'tag_query': urlencode([('tag', pk) for pk in tag_ids]),
+        }
+
+
+class TagCardsView(TagBrowseMixin, PageCacheMixin, TemplateView):
+    """
+    Карточки с несколькими тегами (mode=and) или хотя бы с одним из них (mode=or).
+    Теги берутся из URL (tag_id) и GET-параметров tag
     """
-    # Добываем карточки из БД по тегу
-    cards = Card.objects.filter(tags__id=tag_id)
-
-    # Подготавливаем контекст и отображаем шаблон
-    context = {
-        'cards': cards,
-        'menu': info['menu'],
-    }
 
-    return render(request, 'cards/catalog.html', context)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tag_ids = self.get_tag_ids()
+        mode = self.get_mode()
+        # Пересечение/объединение списков карточек тегов из кеша, без JOIN по тегам
+        found = tag_postings.find_cards(tag_ids, mode)
+        page = self.paginate_ids(found)
+        # Из БД читаем только карточки страницы
+        cards = self.queryset.in_bulk(page.object_list)
+        prefetch_related_objects(list(cards.values()), 'tags')
+        context.update(self.get_tag_context(found, page, cards, Tag.objects.in_bulk(tag_ids), tag_ids, mode))
+        return context
 
 
 class AddCardCreateView(MenuMixin, LoginRequiredMixin, CreateView):
@@ -176,6 +300,81 @@ class AddCardCreateView(MenuMixin, LoginRequiredMixin, CreateView):
         return context
 
 
+@login_required
+def export_cards(request):
+    """
+    Потоковая выгрузка карточек с теми же фильтрами, что и в каталоге.
+    Параметры: format (csv, jsonl, tsv), search_query, category, tag, gzip=1
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exporters.FORMATS:
+        raise Http404('Неизвестный формат выгрузки')
+    content_type, extension = exporters.FORMATS[export_format]
+
+    queryset = search.filter_cards(
+        Card.objects.all(),
+        search_query=request.GET.get('search_query', ''),
+        category=search.parse_id(request.GET.get('category')),
+        tag=search.parse_id(request.GET.get('tag')),
+        ranked=False,
+    )
+    content = exporters.iter_export(queryset, export_format)
+    filename = f'cards.{extension}'
+    if request.GET.get('gzip') == '1':
+        content = exporters.gzip_stream(content)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def review_state_json(card, state):
+    return {
+        'card': card.id,
+        'question': card.question,
+        'answer': card.answer,
+        'due': state.due.isoformat() if state else None,
+        'interval': state.interval if state else 0,
+        'ease': state.ease if state else None,
+        'lapses': state.lapses if state else 0,
+    }
+
+
+class ReviewDueView(LoginRequiredMixin, View):
+    """
+    Очередь повторения пользователя: ?limit=N карточек с подошедшим сроком
+    и ?new=M еще не изученных, если очередь короче limit
+    """
+
+    def get(self, request):
+        limit = search.parse_id(request.GET.get('limit')) or 20
+        limit = max(1, min(limit, scheduler.MAX_DUE_LIMIT))
+        new_limit = max(0, min(search.parse_id(request.GET.get('new')) or 0, limit))
+        cards = scheduler.due_cards(request.user, limit, new_limit)
+        return JsonResponse({'cards': [review_state_json(card, state) for card, state in cards]})
+
+
+class ReviewSubmitView(LoginRequiredMixin, View):
+    """
+    Прием пачки оценок: {"reviews": [{"card": id, "grade": 0..5}, ...]}
+    """
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body)
+            reviews = [(review['card'], review['grade']) for review in payload['reviews']]
+            states = scheduler.submit_reviews(request.user, reviews)
+        except (ValueError, KeyError, TypeError) as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse({'reviews': [
+            {'card': state.card_id, 'due': state.due.isoformat(), 'interval': state.interval,
+             'ease': state.ease, 'lapses': state.lapses}
+            for state in states
+        ]})
+
+
 def add_card(request):
     if request.method == 'POST':
         form = CardForm(request.POST)
@@ -0,0 +1,123 @@
+"""
+Уменьшенные копии фотографий пользователей (User.photo).
+
+Оригинал загружается как есть, а копии нужных размеров в WebP и JPEG
+(для браузеров без WebP) делает Pillow в фоновом потоке после фиксации
+транзакции - ответ формы профиля не ждет обработки изображения.
+
+Имена копий детерминированы: users/thumbs/<хеш имени оригинала>/<размер>.<формат>,
+поэтому готовую копию можно найти без запроса к БД, а повторный запуск
+не создает файл заново. Пока копии нет, шаблон показывает оригинал
+(см. тег user_avatar в users.templatetags.user_avatars).
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Имя размера -> сторона квадратной копии в пикселях
+SIZES = {'small': 64, 'medium': 256}
+# Формат -> (расширение, параметры Image.save)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'users/thumbs'
+
+# Один рабочий поток: копии делаются по очереди и не отнимают потоки у запросов
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatars')
+
+
+def variant_name(name, size, image_format):
+    digest = hashlib.sha1(name.encode()).hexdigest()[:16]
+    return posixpath.join(VARIANTS_DIR, digest, f'{SIZES[size]}.{FORMATS[image_format][0]}')
+
+
+def render_variant(image, side, image_format):
+    """
+    Квадратная копия со стороной side (обрезка по центру) в байтах
+    """
+    thumbnail = ImageOps.fit(image, (side, side), Image.LANCZOS)
+    if image_format == 'jpeg' and thumbnail.mode != 'RGB':
+        # У JPEG нет прозрачности: подкладываем белый фон
+        background = Image.new('RGB', thumbnail.size, 'white')
+        background.paste(thumbnail, mask=thumbnail.getchannel('A') if 'A' in thumbnail.getbands() else None)
+        thumbnail = background
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, **FORMATS[image_format][1])
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage):
+    """
+    Создает недостающие копии фотографии name, возвращает имена созданных файлов
+    """
+    missing = [(size, image_format) for size in SIZES for image_format in FORMATS
+               if not storage.exists(variant_name(name, size, image_format))]
+    if not missing:
+        return []
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        # Фото с телефона может быть повернуто только тегом EXIF
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    created = []
+    for size, image_format in missing:
+        target = variant_name(name, size, image_format)
+        created.append(storage.save(target, ContentFile(render_variant(image, SIZES[size], image_format))))
+    return created
+
+
+def delete_variants(name, storage=default_storage):
+    for size in SIZES:
+        for image_format in FORMATS:
+            storage.delete(variant_name(name, size, image_format))
+
+
+def _run(function, name):
+    try:
+        function(name)
+    except Exception:
+        logger.exception('Не удалось обработать фотографию %s', name)
+
+
+def schedule(name, old_name=None):
+    """
+    После фиксации транзакции ставит в фоновую очередь создание копий name
+    и удаление копий прежней фотографии old_name
+    """
+    def submit():
+        if old_name:
+            _executor.submit(_run, delete_variants, old_name)
+        if name:
+            _executor.submit(_run, generate_variants, name)
+    transaction.on_commit(submit)
+
+
+def wait():
+    """
+    Ждет, пока фоновый поток обработает все поставленные задачи (для тестов и команд)
+    """
+    _executor.submit(lambda: None).result()
+
+
+def get_avatar(photo, size='medium'):
+    """
+    {'url', 'webp_url', 'width', 'height'} для показа фотографии размера size.
+    Пока копий нет - оригинал без WebP, а размер задается атрибутами тега img
+    """
+    side = SIZES[size]
+    webp, jpeg = (variant_name(photo.name, size, image_format) for image_format in ('webp', 'jpeg'))
+    if default_storage.exists(jpeg):
+        return {'url': default_storage.url(jpeg),
+                'webp_url': default_storage.url(webp) if default_storage.exists(webp) else None,
+                'width': side, 'height': side}
+    return {'url': photo.url, 'webp_url': None, 'width': side, 'height': side}
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users import avatars
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие уменьшенные копии фотографий пользователей (WebP и JPEG)'
+
+    def handle(self, *args, **options):
+        created = 0
+        names = get_user_model().objects.exclude(photo='').exclude(photo__isnull=True).values_list('photo', flat=True)
+        for name in names.iterator():
+            try:
+                created += len(avatars.generate_variants(name))
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Создано копий: {created}'))
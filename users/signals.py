@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from . import avatars
+
+User = get_user_model()
+
+
+# Уменьшенные копии фотографии (см. users.avatars)
+
+@receiver(post_init, sender=User)
+def remember_photo(sender, instance, **kwargs):
+    instance._saved_photo = (instance.__dict__.get('photo') or '') if instance.pk else ''
+
+
+@receiver(post_save, sender=User)
+def schedule_photo_variants(sender, instance, update_fields=None, **kwargs):
+    # Например, вход обновляет только last_login
+    if update_fields is not None and 'photo' not in update_fields:
+        return
+    name = instance.photo.name if instance.photo else ''
+    if name != instance._saved_photo:
+        avatars.schedule(name, old_name=instance._saved_photo)
+        instance._saved_photo = name
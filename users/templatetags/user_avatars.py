@@ -0,0 +1,17 @@
+from django import template
+
+from users import avatars
+
+register = template.Library()
+
+
+@register.inclusion_tag('users/include/avatar.html')
+def user_avatar(user, size='medium', css_class=''):
+    """
+    Фотография пользователя нужного размера: WebP с запасным JPEG (см. users.avatars)
+    """
+    return {
+        'avatar': avatars.get_avatar(user.photo, size) if user.photo else None,
+        'username': user.username,
+        'css_class': css_class,
+    }
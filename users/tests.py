@@ -1,3 +1,133 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from users import avatars
+
+from cards.models import Tag
+from cards.tests import QueryBudgetMixin, create_cards
+
+
+class UserCardsViewTests(QueryBudgetMixin, TestCase):
+    """Тестирование страницы "Мои карточки"."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('author', password='password')
+        tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        create_cards(20, author=cls.user, tags=tags)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('users:profile_cards'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_query_budget(self):
+        # сессия, пользователь, карточки с категорией и автором, теги
+        response = self.assertViewQueryBudget(reverse('users:profile_cards'), 4)
+        self.assertContains(response, 'Вопрос 19')
+
+
+def make_photo(name='photo.png', size=(600, 400), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class UserPhotoVariantsTests(TestCase):
+    """Тестирование уменьшенных копий фотографии пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('photo_user', 'photo@example.com', 'password')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(MEDIA_ROOT=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+
+    def upload(self, photo):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('users:profile'), {'photo': photo})
+        self.assertRedirects(response, reverse('users:profile'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        return response
+
+    def test_upload_creates_variants_in_background(self):
+        self.upload(make_photo())
+        avatars.wait()
+        for size, side in avatars.SIZES.items():
+            for image_format in avatars.FORMATS:
+                with default_storage.open(avatars.variant_name(self.user.photo.name, size, image_format)) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.size, (side, side))
+                    self.assertEqual(image.format, avatars.FORMATS[image_format][1]['format'])
+
+        response = self.client.get(reverse('users:profile'))
+        webp = default_storage.url(avatars.variant_name(self.user.photo.name, 'medium', 'webp'))
+        self.assertContains(response, f'<source srcset="{webp}" type="image/webp">', html=True)
+        self.assertContains(response, 'width="256" height="256"')
+
+    def test_response_does_not_wait_for_processing(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_generate(name):
+            started.set()
+            release.wait(5)
+
+        with patch.object(avatars, 'generate_variants', slow_generate):
+            self.upload(make_photo())
+            # Ответ уже получен, а обработка еще идет в фоновом потоке
+            self.assertTrue(started.wait(5))
+            release.set()
+            avatars.wait()
+
+    def test_original_is_shown_until_variants_exist(self):
+        with patch.object(avatars, 'schedule'):
+            self.upload(make_photo())
+        response = self.client.get(reverse('users:profile'))
+        self.assertContains(response, f'src="{self.user.photo.url}"')
+        self.assertNotContains(response, 'image/webp')
+
+    def test_replacing_photo_removes_old_variants(self):
+        self.upload(make_photo('first.png'))
+        avatars.wait()
+        old_variant = avatars.variant_name(self.user.photo.name, 'small', 'jpeg')
+        self.assertTrue(default_storage.exists(old_variant))
+
+        self.upload(make_photo('second.png', size=(100, 300), color='blue'))
+        avatars.wait()
+        self.assertFalse(default_storage.exists(old_variant))
+        self.assertTrue(default_storage.exists(avatars.variant_name(self.user.photo.name, 'small', 'jpeg')))
+
+    def test_login_does_not_schedule_processing(self):
+        with patch.object(avatars, 'schedule') as schedule:
+            self.client.logout()
+            self.client.login(username='photo_user', password='password')
+        schedule.assert_not_called()
+
+    def test_command_builds_missing_variants(self):
+        with patch.object(avatars, 'schedule'):
+            self.upload(make_photo())
+        call_command('build_photo_variants', stdout=io.StringIO())
+        path = default_storage.path(avatars.variant_name(self.user.photo.name, 'medium', 'webp'))
+        self.assertTrue(os.path.exists(path))
 
-# Create your tests here.
@@ -7,6 +7,7 @@ from django.urls import reverse_lazy, reverse
 from django.views.generic import CreateView, TemplateView, UpdateView, ListView
 
 from cards.models import Card
+from cards.view_counter import view_counter
 from cards.views import MenuMixin
 from .forms import LoginUserForm, RegisterUserForm, ProfileUserForm, UserPasswordChangeForm
 
@@ -65,7 +66,7 @@ class UserPasswordChangeDone(TemplateView):
     extra_context = {'title': 'Пароль изменен успешно'}
 
 
-class UserCardsView(ListView):
+class UserCardsView(LoginRequiredMixin, ListView):
     model = Card
     template_name = 'users/profile_cards.html'
     context_object_name = 'cards'
@@ -73,4 +74,11 @@ class UserCardsView(ListView):
                      'active_tab': 'profile_cards'}
 
     def get_queryset(self):
-        return Card.objects.filter(author=self.request.user).order_by('-upload_date')
\ No newline at end of file
+        return (Card.objects.filter(author=self.request.user).order_by('-upload_date')
+                .select_related('category', 'author').prefetch_related('tags'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Показываем просмотры с учетом еще не записанных в БД
+        view_counter.apply_pending(context['cards'])
+        return context
\ No newline at end of file